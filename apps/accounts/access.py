@@ -0,0 +1,231 @@
+# apps/accounts/access.py
+"""
+Cached branch access snapshot per user.
+
+One snapshot holds a user's active branches, the role codes per
+branch and the module permissions (RolePermission) of those roles.
+It is built with four queries on a cache miss and shared through the
+Django cache; middleware and permission classes answer from it.
+
+Invalidation is by version stamp, the cache key embeds:
+
+- the user's version, bumped when a UserBranch / UserBranchRole /
+  UserRole row of that user changes
+- the global version, bumped when Role / RolePermission rows change
+
+so stale snapshots are never read and simply expire.
+
+Stamps only reach other workers through a shared cache; with a
+per-process cache (core.cache.shared_cache) the snapshot is rebuilt
+for every request instead.
+"""
+
+import uuid
+from typing import Any, Dict, Iterable, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import shared_cache
+
+
+SNAPSHOT_FORMAT = 1
+
+USER_VERSION_KEY = "access:version:user:{user_id}"
+GLOBAL_VERSION_KEY = "access:version:global"
+SNAPSHOT_KEY = "access:snapshot:{format}:{user_id}:{user_version}:{global_version}"
+
+DEFAULT_SNAPSHOT_TIMEOUT = 60 * 60
+
+PERMISSION_ACTIONS = ("view", "create", "edit", "delete", "approve", "export")
+
+
+# ======================================================
+# VERSION STAMPS
+# ======================================================
+
+def _new_version() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def invalidate_user_access(user_id):
+    cache.set(USER_VERSION_KEY.format(user_id=user_id), _new_version(), None)
+
+
+def invalidate_all_access():
+    cache.set(GLOBAL_VERSION_KEY, _new_version(), None)
+
+
+def _versions(user_id):
+    user_key = USER_VERSION_KEY.format(user_id=user_id)
+    versions = cache.get_many([user_key, GLOBAL_VERSION_KEY])
+
+    # A missing (evicted) stamp gets a fresh value, never a reused one
+    for key in (user_key, GLOBAL_VERSION_KEY):
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+
+    return versions[user_key], versions[GLOBAL_VERSION_KEY]
+
+
+# ======================================================
+# SNAPSHOT
+# ======================================================
+
+class AccessSnapshot:
+    """
+    Read-only view over the cached snapshot data.
+    Branch arguments accept a Branch instance or a branch id.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+
+    @staticmethod
+    def _branch_id(branch):
+        return getattr(branch, "pk", branch)
+
+    @property
+    def branch_ids(self) -> Set[int]:
+        return set(self.data["branches"])
+
+    def has_branch(self, branch=None) -> bool:
+        """
+        Active assignment to branch (or to any branch if None).
+        """
+        if branch is None:
+            return bool(self.data["branches"])
+        return self._branch_id(branch) in self.data["branches"]
+
+    def has_branch_role(self, branch) -> bool:
+        """
+        Any active role assignment in branch.
+        """
+        return self._branch_id(branch) in self.data["branch_roles"]
+
+    def role_codes(self, branch=None) -> Set[str]:
+        """
+        Active role codes in branch, or in any branch if None.
+        Global (UserRole) roles are always included.
+        """
+        codes = set(self.data["global_roles"])
+        if branch is None:
+            for branch_codes in self.data["branch_roles"].values():
+                codes.update(branch_codes)
+        else:
+            codes.update(self.data["branch_roles"].get(self._branch_id(branch), ()))
+        return codes
+
+    def has_role(self, role_code: str, branch=None) -> bool:
+        return role_code in self.role_codes(branch)
+
+    def has_any_role(self, role_codes: Iterable[str], branch=None) -> bool:
+        return not self.role_codes(branch).isdisjoint(role_codes)
+
+    def can(self, module: str, action: str, branch=None) -> bool:
+        """
+        RolePermission check; roles scoped to all branches apply
+        everywhere.
+        """
+        permissions = self.data["permissions"]
+        local_codes = self.role_codes(branch)
+
+        for code in self.role_codes():
+            grant = permissions.get(code, {}).get(module)
+            if not grant or action not in grant["actions"]:
+                continue
+            if code in local_codes or grant["all_branches"]:
+                return True
+        return False
+
+
+def build_snapshot_data(user_id) -> Dict[str, Any]:
+    from apps.accounts.models import UserBranch, UserBranchRole, UserRole
+    from apps.settings_core.models import RolePermission
+
+    branches = list(
+        UserBranch.objects
+        .filter(user_id=user_id, is_active=True)
+        .values_list("branch_id", flat=True)
+    )
+
+    branch_roles: Dict[int, list] = {}
+    role_ids = set()
+    for branch_id, role_id, code in (
+        UserBranchRole.objects
+        .filter(user_id=user_id, is_active=True)
+        .values_list("branch_id", "role_id", "role__code")
+    ):
+        branch_roles.setdefault(branch_id, []).append(code)
+        role_ids.add(role_id)
+
+    global_roles = []
+    for role_id, code in (
+        UserRole.objects
+        .filter(user_id=user_id, is_active=True)
+        .values_list("role_id", "role__code")
+    ):
+        global_roles.append(code)
+        role_ids.add(role_id)
+
+    permissions: Dict[str, Dict[str, Any]] = {}
+    if role_ids:
+        for grant in (
+            RolePermission.objects
+            .filter(role_id__in=role_ids)
+            .select_related("role")
+        ):
+            permissions.setdefault(grant.role.code, {})[grant.module] = {
+                "actions": [
+                    action for action in PERMISSION_ACTIONS
+                    if grant.has_permission(action)
+                ],
+                "all_branches": grant.scope_all_branches,
+            }
+
+    return {
+        "branches": branches,
+        "branch_roles": branch_roles,
+        "global_roles": global_roles,
+        "permissions": permissions,
+    }
+
+
+def get_access_snapshot(user) -> Optional[AccessSnapshot]:
+    """
+    Snapshot for user, memoized on the instance for the request.
+    None for anonymous users.
+    """
+    if user is None or not getattr(user, "is_authenticated", False):
+        return None
+
+    snapshot = getattr(user, "_access_snapshot", None)
+    if snapshot is not None:
+        return snapshot
+
+    if not shared_cache():
+        snapshot = AccessSnapshot(build_snapshot_data(user.pk))
+        user._access_snapshot = snapshot
+        return snapshot
+
+    user_version, global_version = _versions(user.pk)
+    key = SNAPSHOT_KEY.format(
+        format=SNAPSHOT_FORMAT,
+        user_id=user.pk,
+        user_version=user_version,
+        global_version=global_version,
+    )
+
+    data = cache.get(key)
+    if data is None:
+        data = build_snapshot_data(user.pk)
+        cache.set(
+            key,
+            data,
+            getattr(settings, "ACCESS_SNAPSHOT_TIMEOUT", DEFAULT_SNAPSHOT_TIMEOUT),
+        )
+
+    snapshot = AccessSnapshot(data)
+    user._access_snapshot = snapshot
+    return snapshot
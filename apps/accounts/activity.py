@@ -0,0 +1,130 @@
+# apps/accounts/activity.py
+"""
+Buffered last-seen tracking for authenticated requests.
+
+Authentication used to save the user (last_login_ip) on every API
+request. Activity is now collected in a per-process buffer:
+
+- a user's IP is buffered only when it differs from the stored value
+- a device's last_seen_at / ip_address is buffered at most once per
+  ACTIVITY_DEVICE_INTERVAL seconds
+
+The buffer is flushed in bulk (one UPDATE per table) from the request
+path once ACTIVITY_FLUSH_INTERVAL seconds have passed, and at process
+exit, so read-only traffic issues no per-request writes.
+"""
+
+import atexit
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+
+DEFAULT_FLUSH_INTERVAL = 60
+DEFAULT_DEVICE_INTERVAL = 60
+
+
+class ActivityBuffer:
+    """Thread-safe per-process buffer of user / device activity"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ips: Dict[int, str] = {}
+        self._devices: Dict[Tuple[int, str], Tuple[object, Optional[str]]] = {}
+        # Last value written / buffered, to skip unchanged activity
+        self._known_ips: Dict[int, Optional[str]] = {}
+        self._device_marks: Dict[Tuple[int, str], float] = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, user, ip_address: Optional[str], device_id: Optional[str] = None):
+        now = time.monotonic()
+        device_interval = getattr(settings, "ACTIVITY_DEVICE_INTERVAL", DEFAULT_DEVICE_INTERVAL)
+
+        with self._lock:
+            known_ip = self._known_ips.get(user.pk, user.last_login_ip)
+            if ip_address and ip_address != known_ip:
+                self._ips[user.pk] = ip_address
+                self._known_ips[user.pk] = ip_address
+
+            if device_id:
+                key = (user.pk, device_id)
+                if now - self._device_marks.get(key, float("-inf")) >= device_interval:
+                    self._devices[key] = (timezone.now(), ip_address)
+                    self._device_marks[key] = now
+
+            due = now - self._last_flush >= getattr(
+                settings, "ACTIVITY_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL
+            )
+
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write buffered activity; returns the number of rows updated.
+        """
+        with self._lock:
+            ips, self._ips = self._ips, {}
+            devices, self._devices = self._devices, {}
+            self._last_flush = time.monotonic()
+
+        if not ips and not devices:
+            return 0
+
+        from apps.accounts.authentication import invalidate_cached_user
+        from apps.accounts.models import User, UserDevice
+
+        updated = 0
+
+        if ips:
+            updated += User.objects.bulk_update(
+                [User(pk=user_id, last_login_ip=ip) for user_id, ip in ips.items()],
+                ["last_login_ip"],
+                batch_size=500,
+            )
+            for user_id in ips:
+                invalidate_cached_user(user_id)
+
+        if devices:
+            lookup = Q()
+            for user_id, device_id in devices:
+                lookup |= Q(user_id=user_id, device_id=device_id)
+
+            rows = []
+            devices_qs = UserDevice.objects.filter(lookup).only("id", "user_id", "device_id", "ip_address")
+            for device in devices_qs:
+                seen_at, ip_address = devices[(device.user_id, device.device_id)]
+                device.last_seen_at = seen_at
+                if ip_address:
+                    device.ip_address = ip_address
+                rows.append(device)
+
+            updated += UserDevice.objects.bulk_update(
+                rows, ["last_seen_at", "ip_address"], batch_size=500
+            )
+
+        return updated
+
+
+activity_buffer = ActivityBuffer()
+
+
+def record_activity(user, ip_address: Optional[str], device_id: Optional[str] = None):
+    activity_buffer.record(user, ip_address, device_id)
+
+
+def flush_activity() -> int:
+    return activity_buffer.flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        activity_buffer.flush()
+    except Exception:
+        # Database may already be gone at interpreter shutdown
+        pass
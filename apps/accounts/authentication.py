@@ -1,9 +1,26 @@
 # apps/accounts/authentication.py
 
+import time
+
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from django.conf import settings
+from django.core.cache import cache
 from django.utils.translation import gettext_lazy as _
 
+from apps.accounts.activity import record_activity
+from core.cache import shared_cache
+
+
+USER_CACHE_KEY = "auth:user:{user_id}"
+
+DEFAULT_USER_CACHE_TIMEOUT = 60
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(USER_CACHE_KEY.format(user_id=user_id))
+
 
 class CustomJWTAuthentication(JWTAuthentication):
     """
@@ -35,8 +52,36 @@ class CustomJWTAuthentication(JWTAuthentication):
         if token_device_id and device_id != token_device_id:
             raise AuthenticationFailed(_('Device mismatch. Please login from registered device.'))
 
-        # Update last login IP
-        user.last_login_ip = request.META.get('REMOTE_ADDR')
-        user.save(update_fields=['last_login_ip'])
+        # Last login IP / device activity, buffered and flushed in bulk
+        record_activity(user, request.META.get('REMOTE_ADDR'), device_id)
 
         return (user, validated_token)
+
+    def get_user(self, validated_token):
+        """
+        User cached for JWT_USER_CACHE_TIMEOUT seconds (at most the
+        token's remaining lifetime) in the shared cache; dropped whenever
+        the user row is saved or deleted. Changes made without save()
+        (queryset.update) apply once the entry expires. Not cached when
+        the cache is per-process, where invalidation would not reach
+        the other workers.
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        if not shared_cache():
+            return super().get_user(validated_token)
+
+        key = USER_CACHE_KEY.format(user_id=user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            timeout = min(
+                int(validated_token.get('exp', 0) - time.time()),
+                getattr(settings, "JWT_USER_CACHE_TIMEOUT", DEFAULT_USER_CACHE_TIMEOUT),
+            )
+            if timeout > 0:
+                cache.set(key, user, timeout)
+        return user
@@ -8,6 +8,7 @@ from django.contrib.auth.models import (
 )
 from core.mixins.audit_fields import AuditFieldsMixin
 from core.mixins.soft_delete import SoftDeleteMixin
+from core.mixins.tracked_state import TrackedStateMixin
 
 
 class RoleCode:
@@ -41,7 +42,7 @@ class UserManager(BaseUserManager):
         return user
 
 
-class User(AbstractBaseUser, PermissionsMixin, AuditFieldsMixin, SoftDeleteMixin):
+class User(AbstractBaseUser, PermissionsMixin, AuditFieldsMixin, SoftDeleteMixin, TrackedStateMixin):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=15, unique=True, blank=True, null=True)
     full_name = models.CharField(max_length=150)
@@ -83,12 +84,15 @@ class User(AbstractBaseUser, PermissionsMixin, AuditFieldsMixin, SoftDeleteMixin
             branch_roles__is_active=True
         )
     
+    @property
+    def access(self):
+        """Cached branch / role snapshot (apps.accounts.access)"""
+        from apps.accounts.access import get_access_snapshot
+        return get_access_snapshot(self)
+
     def has_role(self, role_code, branch):
-        return self.branch_roles.filter(
-            role__code=role_code,
-            branch=branch,
-            is_active=True
-        ).exists()
+        access = self.access
+        return bool(access) and access.has_role(role_code, branch)
     
     def is_patient(self, branch):
         return self.has_role(RoleCode.PATIENT, branch)
@@ -100,7 +104,8 @@ class User(AbstractBaseUser, PermissionsMixin, AuditFieldsMixin, SoftDeleteMixin
         return self.has_role(RoleCode.CASHIER, branch)
     
     def is_manager(self, branch):
-        return self.has_role(RoleCode.MANAGER, branch) or self.has_role(RoleCode.ADMIN, branch)
+        access = self.access
+        return bool(access) and access.has_any_role((RoleCode.MANAGER, RoleCode.ADMIN), branch)
     
     def is_admin(self, branch):
         return self.has_role(RoleCode.ADMIN, branch)
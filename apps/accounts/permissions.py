@@ -35,11 +35,11 @@ class HasRole(BasePermission):
 
     def has_permission(self, request, view):
         user = request.user
-        branch = getattr(request, "branch", None)
-        if not user.is_authenticated or not branch:
+        branch_id = getattr(request, "branch_id", None)
+        if not user.is_authenticated or not branch_id:
             return False
 
-        return any(user.has_role(role, branch) for role in self.required_roles)
+        return user.access.has_any_role(self.required_roles, branch_id)
 
 
 class IsAdmin(HasRole):
@@ -73,14 +73,14 @@ class IsPatient(HasRole):
 class HasBranchAccess(BasePermission):
     """
     Ensure user has access to branch resolved by middleware.
-    Middleware must set: request.branch
+    Middleware must set: request.branch_id
     """
     def has_permission(self, request, view):
         user = request.user
-        branch = getattr(request, "branch", None)
-        if not user.is_authenticated or not branch:
+        branch_id = getattr(request, "branch_id", None)
+        if not user.is_authenticated or not branch_id:
             return False
-        return user.branch_roles.filter(branch=branch, is_active=True).exists() or user.is_superuser
+        return user.is_superuser or user.access.has_branch_role(branch_id)
 
 
 class HasObjectBranchAccess(BasePermission):
@@ -94,7 +94,7 @@ class HasObjectBranchAccess(BasePermission):
             return True
         if not hasattr(obj, "branch"):
             return False
-        return obj.branch_id in [br.branch_id for br in user.branch_roles.filter(is_active=True)]
+        return user.access.has_branch_role(obj.branch_id)
 
 
 # =========================
@@ -128,12 +128,12 @@ class EODUnlockedRequired(BasePermission):
     message = "End-of-day is locked. Financial operations are disabled."
 
     def has_permission(self, request, view):
-        branch = getattr(request, "branch", None)
-        if not branch:
+        # request.branch is loaded lazily; only writes need the row
+        if not getattr(request, "branch_id", None):
             return False
         if request.method in SAFE_METHODS:
             return True
-        return not getattr(branch, "is_eod_locked", False)
+        return not getattr(request.branch, "is_eod_locked", False)
 
 
 # =========================
@@ -1,13 +1,17 @@
 #apps/accounts/signals.py
 
-from django.db.models.signals import post_save, pre_delete
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
+from apps.accounts.access import invalidate_all_access, invalidate_user_access
+from apps.accounts.authentication import invalidate_cached_user
 from apps.accounts.models import (
     User,
     Role,
     UserBranch,
     UserBranchRole,
+    UserRole,
     RoleCode,
 )
 
@@ -110,3 +114,46 @@ def protect_system_roles(sender, instance, **kwargs):
 
     if instance.code in protected and not instance.name:
         raise ValueError("System roles must have a name")
+
+
+
+@receiver(post_save, sender=UserBranch)
+@receiver(post_delete, sender=UserBranch)
+@receiver(post_save, sender=UserBranchRole)
+@receiver(post_delete, sender=UserBranchRole)
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_user_access_snapshot(sender, instance, **kwargs):
+    """
+    Branch assignments / roles changed: bump the user's access version.
+
+    Bumped after commit: a snapshot rebuilt before then would read the
+    old rows and be cached under the new version.
+    """
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_user_access(user_id))
+
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender="settings_core.RolePermission")
+@receiver(post_delete, sender="settings_core.RolePermission")
+def invalidate_role_access_snapshots(sender, instance, **kwargs):
+    """
+    Role codes / permissions changed: bump the global access version
+    (after commit, see above).
+    """
+    transaction.on_commit(invalidate_all_access)
+
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_auth_user(sender, instance, **kwargs):
+    """
+    Drop the user cached by CustomJWTAuthentication, after commit so
+    a concurrent request cannot re-cache the old row.
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
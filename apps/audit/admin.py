@@ -5,7 +5,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.http import HttpResponseForbidden
 
-from apps.audit.models import AuditLog
+from apps.audit.models import AuditLog, AuditArchive, AuditChainHead
 from apps.audit.filters import AuditLogFilter
 
 
@@ -132,6 +132,67 @@ class AuditLogAdmin(admin.ModelAdmin):
         return actions
 
 
+@admin.register(AuditChainHead)
+class AuditChainHeadAdmin(admin.ModelAdmin):
+    """
+    Read-only view of audit hash chain heads.
+    """
+
+    list_display = ("chain_key", "length", "last_log_id", "last_hash", "updated_at")
+    search_fields = ("chain_key",)
+    readonly_fields = ("chain_key", "length", "last_log_id", "last_hash", "updated_at")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AuditArchive)
+class AuditArchiveAdmin(admin.ModelAdmin):
+    """
+    Read-only view of cold audit archives.
+    """
+
+    list_display = (
+        "period_start",
+        "record_count",
+        "first_log_id",
+        "last_log_id",
+        "compression",
+        "file_path",
+        "created_at",
+    )
+    readonly_fields = (
+        "period_start",
+        "period_end",
+        "file_path",
+        "compression",
+        "content_hash",
+        "first_log_id",
+        "last_log_id",
+        "record_count",
+        "min_timestamp",
+        "max_timestamp",
+        "chain_anchors",
+        "created_at",
+    )
+    exclude = ("block_index",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 
 
 
@@ -0,0 +1,393 @@
+# apps/audit/archive.py
+"""
+Hot / cold tiering for the audit log.
+
+Closed months are rolled out of the AuditLog table into compressed
+JSON-lines archives:
+
+- Each archive covers a contiguous id range, so every chain's
+  archived part is a prefix and the hot rows continue from it
+- Records are written in blocks that are compressed independently;
+  AuditArchive.block_index stores each block's byte range and
+  AuditArchiveObject maps objects to blocks (sparse index)
+- zstd is used when `zstandard` is installed, gzip otherwise
+"""
+
+import gzip
+import hashlib
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.audit.models import AuditArchive, AuditArchiveObject, AuditChainHead, AuditLog
+from apps.audit.services import compute_record_hash
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+
+ARCHIVE_DIR = "audit_archive"
+
+DEFAULT_BLOCK_SIZE = 1000
+
+ARCHIVE_FIELDS = (
+    "id",
+    "chain_key",
+    "branch_id",
+    "user_id",
+    "device_id",
+    "ip_address",
+    "action",
+    "model_name",
+    "object_id",
+    "before",
+    "after",
+    "metadata",
+    "user_agent",
+    "object_repr",
+    "previous_hash",
+    "record_hash",
+    "timestamp",
+    "duration",
+)
+
+
+# ======================================================
+# BLOCK CODEC
+# ======================================================
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _record_from_log(values: Dict[str, Any]) -> Dict[str, Any]:
+    record = dict(values)
+    record["timestamp"] = record["timestamp"].isoformat()
+    duration = record["duration"]
+    record["duration"] = duration.total_seconds() if duration is not None else None
+    return record
+
+
+def log_from_record(record: Dict[str, Any]) -> AuditLog:
+    """
+    Rebuild a read-only AuditLog instance from an archived record.
+    """
+    fields = dict(record)
+    fields["timestamp"] = datetime.fromisoformat(fields["timestamp"])
+    duration = fields["duration"]
+    fields["duration"] = timedelta(seconds=duration) if duration is not None else None
+
+    log = AuditLog(**fields)
+    log._state.adding = False
+    return log
+
+
+# ======================================================
+# ARCHIVE WRITE (ROLLOVER)
+# ======================================================
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _next_month(value: date) -> date:
+    return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def archive_month(period_start: date, block_size: Optional[int] = None) -> Optional[AuditArchive]:
+    """
+    Move the hot records of one closed month into a cold archive.
+
+    The archived range starts after the previous archive and ends at
+    the last record timestamped before the month's end. Returns None
+    when there is nothing to archive.
+    """
+    period_start = _month_start(period_start)
+    period_end = _next_month(period_start)
+    block_size = block_size or getattr(settings, "AUDIT_ARCHIVE_BLOCK_SIZE", DEFAULT_BLOCK_SIZE)
+
+    if AuditArchive.objects.filter(period_start=period_start).exists():
+        return None
+
+    previous = AuditArchive.objects.order_by("-last_log_id").first()
+    start_id = previous.last_log_id + 1 if previous else 1
+
+    end_of_period = timezone.make_aware(datetime.combine(period_end, datetime.min.time()))
+    cutoff_id = (
+        AuditLog.objects
+        .filter(timestamp__lt=end_of_period)
+        .aggregate(last=Max("id"))["last"]
+    )
+    if cutoff_id is None or cutoff_id < start_id:
+        return None
+
+    codec = "zstd" if HAS_ZSTD else "gzip"
+    rows = (
+        AuditLog.objects
+        .filter(id__gte=start_id, id__lte=cutoff_id)
+        .order_by("id")
+        .values(*ARCHIVE_FIELDS)
+        .iterator(chunk_size=block_size)
+    )
+
+    output = tempfile.TemporaryFile()
+    digest = hashlib.sha256()
+    block_index: List[Dict[str, Any]] = []
+    chain_anchors: Dict[str, Dict[str, Any]] = {}
+    object_blocks: Dict[tuple, List[int]] = {}
+    stats = {"count": 0, "first_id": None, "last_id": None, "min_ts": None, "max_ts": None}
+    block: List[Dict[str, Any]] = []
+
+    def flush_block():
+        payload = "".join(
+            json.dumps(record, sort_keys=True, default=str) + "\n" for record in block
+        ).encode("utf-8")
+        data = _compress(payload, codec)
+        block_index.append({
+            "offset": output.tell(),
+            "length": len(data),
+            "first_id": block[0]["id"],
+            "last_id": block[-1]["id"],
+            "count": len(block),
+        })
+        output.write(data)
+        digest.update(data)
+
+    for values in rows:
+        record = _record_from_log(values)
+        block_number = len(block_index)
+
+        anchor = chain_anchors.get(record["chain_key"])
+        if anchor is None:
+            anchor = chain_anchors[record["chain_key"]] = {
+                "first_id": record["id"],
+                "first_previous_hash": record["previous_hash"],
+                "count": 0,
+            }
+        anchor["last_id"] = record["id"]
+        anchor["last_hash"] = record["record_hash"]
+        anchor["count"] += 1
+
+        blocks = object_blocks.setdefault((record["model_name"], record["object_id"]), [])
+        if not blocks or blocks[-1] != block_number:
+            blocks.append(block_number)
+
+        if stats["first_id"] is None:
+            stats["first_id"] = record["id"]
+        stats["last_id"] = record["id"]
+        stats["count"] += 1
+        timestamp = values["timestamp"]
+        stats["min_ts"] = min(stats["min_ts"] or timestamp, timestamp)
+        stats["max_ts"] = max(stats["max_ts"] or timestamp, timestamp)
+
+        block.append(record)
+        if len(block) >= block_size:
+            flush_block()
+            block = []
+
+    if block:
+        flush_block()
+
+    if not stats["count"]:
+        output.close()
+        return None
+
+    output.seek(0)
+    with output:
+        file_path = default_storage.save(
+            f"{ARCHIVE_DIR}/{period_start:%Y-%m}.jsonl.{'zst' if codec == 'zstd' else 'gz'}",
+            File(output),
+        )
+
+    with transaction.atomic():
+        archive = AuditArchive.objects.create(
+            period_start=period_start,
+            period_end=period_end,
+            file_path=file_path,
+            compression=codec,
+            content_hash=digest.hexdigest(),
+            first_log_id=stats["first_id"],
+            last_log_id=stats["last_id"],
+            record_count=stats["count"],
+            min_timestamp=stats["min_ts"],
+            max_timestamp=stats["max_ts"],
+            chain_anchors=chain_anchors,
+            block_index=block_index,
+        )
+        AuditArchiveObject.objects.bulk_create(
+            [
+                AuditArchiveObject(
+                    archive=archive,
+                    model_name=model_name,
+                    object_id=object_id,
+                    blocks=blocks,
+                )
+                for (model_name, object_id), blocks in object_blocks.items()
+            ],
+            batch_size=1000,
+        )
+
+        # Hot rows leave the table only once the archive is recorded
+        AuditLog.objects.filter(
+            id__gte=stats["first_id"],
+            id__lte=stats["last_id"],
+        ).delete()
+
+    return archive
+
+
+def archive_closed_months(
+    keep_months: Optional[int] = None,
+    block_size: Optional[int] = None,
+) -> List[AuditArchive]:
+    """
+    Archive every month older than the last keep_months months.
+    """
+    if keep_months is None:
+        keep_months = getattr(settings, "AUDIT_HOT_MONTHS", 3)
+
+    cutoff = _month_start(timezone.localdate())
+    for _ in range(keep_months):
+        cutoff = _month_start(cutoff - timedelta(days=1))
+
+    oldest = AuditLog.objects.order_by("id").only("timestamp").first()
+    if oldest is None:
+        return []
+
+    archives = []
+    period_start = _month_start(timezone.localtime(oldest.timestamp).date())
+    while period_start < cutoff:
+        archive = archive_month(period_start, block_size=block_size)
+        if archive is not None:
+            archives.append(archive)
+        period_start = _next_month(period_start)
+
+    return archives
+
+
+# ======================================================
+# ARCHIVE READ
+# ======================================================
+
+def read_block(archive: AuditArchive, block_number: int) -> List[Dict[str, Any]]:
+    block = archive.block_index[block_number]
+    with default_storage.open(archive.file_path, "rb") as f:
+        f.seek(block["offset"])
+        data = f.read(block["length"])
+
+    lines = _decompress(data, archive.compression).decode("utf-8").splitlines()
+    return [json.loads(line) for line in lines if line]
+
+
+def iter_archive_records(archive: AuditArchive) -> Iterator[Dict[str, Any]]:
+    with default_storage.open(archive.file_path, "rb") as f:
+        for block in archive.block_index:
+            f.seek(block["offset"])
+            data = _decompress(f.read(block["length"]), archive.compression)
+            for line in data.decode("utf-8").splitlines():
+                if line:
+                    yield json.loads(line)
+
+
+def get_archived_trail(model_name: str, object_id: Any) -> Iterator[AuditLog]:
+    """
+    Archived records of one object, newest archive first.
+    Only the blocks listed in the sparse index are read.
+    """
+    entries = (
+        AuditArchiveObject.objects
+        .filter(model_name=model_name, object_id=str(object_id))
+        .select_related("archive")
+        .order_by("-archive__last_log_id")
+    )
+
+    for entry in entries:
+        logs = [
+            log_from_record(record)
+            for block_number in entry.blocks
+            for record in read_block(entry.archive, block_number)
+            if record["model_name"] == model_name
+            and record["object_id"] == str(object_id)
+        ]
+        logs.sort(key=lambda log: log.timestamp, reverse=True)
+        yield from logs
+
+
+# ======================================================
+# ARCHIVE VERIFICATION
+# ======================================================
+
+def verify_archive(archive: AuditArchive) -> List[Dict[str, Any]]:
+    """
+    Check file integrity, the hash chains inside the archive and
+    their continuity with the preceding archive.
+    """
+    broken = []
+
+    with default_storage.open(archive.file_path, "rb") as f:
+        content_hash = hashlib.sha256(f.read()).hexdigest()
+    if content_hash != archive.content_hash:
+        broken.append({
+            "archive_id": archive.id,
+            "error": "content hash mismatch",
+        })
+        return broken
+
+    previous_tails = {}
+    previous = (
+        AuditArchive.objects
+        .filter(last_log_id__lt=archive.first_log_id)
+        .order_by("-last_log_id")
+    )
+    for chain_key, anchor in archive.chain_anchors.items():
+        tail = next(
+            (
+                older.chain_anchors[chain_key]["last_hash"]
+                for older in previous
+                if chain_key in older.chain_anchors
+            ),
+            "",
+        )
+        previous_tails[chain_key] = tail
+
+    for record in iter_archive_records(archive):
+        chain_key = record["chain_key"]
+        if chain_key == AuditChainHead.LEGACY_CHAIN_KEY:
+            continue
+        previous_hash = previous_tails[chain_key]
+        log = log_from_record(record)
+        expected_hash = compute_record_hash(previous_hash, log.hash_payload())
+
+        if log.previous_hash != previous_hash or log.record_hash != expected_hash:
+            broken.append({
+                "archive_id": archive.id,
+                "chain_key": chain_key,
+                "log_id": log.id,
+                "expected_previous": previous_hash,
+                "actual_previous": log.previous_hash,
+                "expected_hash": expected_hash,
+                "actual_hash": log.record_hash,
+            })
+
+        previous_tails[chain_key] = log.record_hash
+
+    return broken
@@ -0,0 +1,251 @@
+# apps/audit/exporters.py
+"""
+Streaming audit log export.
+
+Rows are read in chunks through a server-side cursor and encoded
+piece by piece, so memory stays flat regardless of the date range.
+
+Formats: csv, ndjson, json, parquet (requires pyarrow).
+CSV / NDJSON / JSON can be gzip-compressed on the fly; parquet
+uses its internal column compression instead.
+"""
+
+import csv
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from apps.audit.models import AuditLog
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+EXPORT_FIELDS = (
+    "id",
+    "timestamp",
+    "action",
+    "model_name",
+    "object_id",
+    "user__email",
+    "branch__name",
+    "device_id",
+    "ip_address",
+    "record_hash",
+)
+
+# format -> (content type, file extension)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "json": ("application/json", "json"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+# ======================================================
+# ROW SOURCE
+# ======================================================
+
+def iter_export_chunks(start_date, end_date, chunk_size: int) -> Iterator[List[tuple]]:
+    """
+    Yield lists of up to chunk_size row tuples (EXPORT_FIELDS order).
+    """
+    rows = (
+        AuditLog.objects
+        .filter(timestamp__gte=start_date, timestamp__lte=end_date)
+        .order_by("timestamp", "id")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def _to_text(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+# ======================================================
+# ENCODERS
+# ======================================================
+
+class _Echo:
+    """
+    File-like object whose write() returns the value (for csv.writer).
+    """
+
+    def write(self, value):
+        return value
+
+
+def _encode_csv(chunks: Iterable[List[tuple]]) -> Iterator[bytes]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS).encode("utf-8")
+
+    for chunk in chunks:
+        yield "".join(
+            writer.writerow([_to_text(value) for value in row]) for row in chunk
+        ).encode("utf-8")
+
+
+def _encode_ndjson(chunks: Iterable[List[tuple]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str) + "\n"
+            for row in chunk
+        ).encode("utf-8")
+
+
+def _encode_json(chunks: Iterable[List[tuple]]) -> Iterator[bytes]:
+    yield b"["
+    first = True
+    for chunk in chunks:
+        body = ",".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str) for row in chunk
+        )
+        yield (body if first else "," + body).encode("utf-8")
+        first = False
+    yield b"]"
+
+
+class _ChunkSink:
+    """
+    Write-only sink collecting parquet output between row groups.
+    """
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _parquet_schema():
+    string_fields = [name for name in EXPORT_FIELDS if name not in ("id", "timestamp")]
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("timestamp", pa.timestamp("us", tz="UTC")),
+        ]
+        + [(name, pa.string()) for name in string_fields]
+    )
+
+
+def _encode_parquet(chunks: Iterable[List[tuple]], compression: str) -> Iterator[bytes]:
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+
+    try:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            arrays = [
+                pa.array(
+                    column if name in ("id", "timestamp")
+                    else [None if value is None else str(value) for value in column],
+                    type=schema.field(name).type,
+                )
+                for name, column in zip(EXPORT_FIELDS, columns)
+            ]
+            # One row group per chunk
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+
+    yield sink.drain()
+
+
+def _gzip(stream: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for piece in stream:
+        data = compressor.compress(piece)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# ======================================================
+# PUBLIC API
+# ======================================================
+
+def stream_audit_export(
+    start_date,
+    end_date,
+    format: str = "csv",
+    compress: bool = False,
+    chunk_size: Optional[int] = None,
+) -> Tuple[Iterator[bytes], str, str]:
+    """
+    Build a lazy export stream.
+
+    Returns (byte iterator, content type, filename).
+    Raises ValueError for unknown or unavailable formats.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {format}")
+    if format == "parquet" and not HAS_PYARROW:
+        raise ValueError("Parquet export requires pyarrow")
+
+    chunk_size = chunk_size or getattr(
+        settings, "AUDIT_EXPORT_CHUNK_SIZE", DEFAULT_CHUNK_SIZE
+    )
+    chunks = iter_export_chunks(start_date, end_date, chunk_size)
+    content_type, extension = EXPORT_FORMATS[format]
+    filename = f"audit_export_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{extension}"
+
+    if format == "parquet":
+        stream = _encode_parquet(chunks, compression="zstd" if compress else "snappy")
+        return stream, content_type, filename
+
+    encoders = {
+        "csv": _encode_csv,
+        "ndjson": _encode_ndjson,
+        "json": _encode_json,
+    }
+    stream = encoders[format](chunks)
+
+    if compress:
+        return _gzip(stream), "application/gzip", filename + ".gz"
+
+    return stream, content_type, filename
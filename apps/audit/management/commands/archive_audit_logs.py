@@ -0,0 +1,66 @@
+# apps/audit/management/commands/archive_audit_logs.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.audit.archive import archive_closed_months, verify_archive
+from apps.audit.models import AuditArchive
+
+
+class Command(BaseCommand):
+    help = "Move closed months of audit logs into compressed cold archives."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            default=None,
+            help="Months kept in the hot table (default: AUDIT_HOT_MONTHS).",
+        )
+        parser.add_argument(
+            "--block-size",
+            type=int,
+            default=None,
+            help="Records per compressed block (default: AUDIT_ARCHIVE_BLOCK_SIZE).",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Verify every archive file and its hash chains afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        archives = archive_closed_months(
+            keep_months=options["keep_months"],
+            block_size=options["block_size"],
+        )
+
+        for archive in archives:
+            self.stdout.write(self.style.SUCCESS(
+                f"{archive.period_start:%Y-%m}: {archive.record_count} records "
+                f"(ids {archive.first_log_id}..{archive.last_log_id}) "
+                f"-> {archive.file_path}"
+            ))
+
+        if not archives:
+            self.stdout.write("Nothing to archive")
+
+        if not options["verify"]:
+            return
+
+        failed = []
+        for archive in AuditArchive.objects.order_by("last_log_id"):
+            broken = verify_archive(archive)
+            if broken:
+                failed.append(f"{archive.period_start:%Y-%m}")
+                self.stdout.write(self.style.ERROR(
+                    f"{archive.period_start:%Y-%m}: {len(broken)} problems"
+                ))
+                for problem in broken:
+                    self.stdout.write(f"  {problem.get('log_id', problem.get('error'))}")
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{archive.period_start:%Y-%m}: verified"
+                ))
+
+        if failed:
+            raise CommandError(f"Archive verification failed: {', '.join(failed)}")
@@ -0,0 +1,85 @@
+# apps/audit/management/commands/benchmark_actor_context.py
+
+import inspect
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.actor_context import bind_actor, get_current_user, unbind_actor
+
+
+def stack_lookup():
+    """
+    The former BasePaymentModel.save lookup: walk inspect.stack() up
+    to the get_response frame and read its request.
+    """
+    for frame_record in inspect.stack():
+        if frame_record[3] == 'get_response':
+            request = frame_record[0].f_locals.get('request')
+            if request and hasattr(request, 'user'):
+                user = request.user
+                if user.is_authenticated:
+                    return user
+            break
+    return None
+
+
+def context_lookup():
+    return get_current_user()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare resolving the acting user with inspect.stack() (the former "
+        "payment save path) against the actor ContextVar, at a given call depth."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--depth", type=int, default=60, help="Frames between get_response and the lookup.")
+        parser.add_argument("--iterations", type=int, default=200, help="Lookups per method.")
+
+    def handle(self, *args, **options):
+        if options["depth"] < 1 or options["iterations"] < 1:
+            raise CommandError("--depth and --iterations must be at least 1")
+
+        user = SimpleNamespace(pk=1, is_authenticated=True)
+        request = SimpleNamespace(user=user)
+
+        def measure(lookup):
+            def descend(remaining):
+                if remaining:
+                    return descend(remaining - 1)
+                started = time.perf_counter()
+                for _ in range(options["iterations"]):
+                    found = lookup()
+                elapsed = time.perf_counter() - started
+                if found is not user:
+                    raise CommandError(f"{lookup.__name__} did not find the acting user")
+                return elapsed
+
+            def get_response(request):
+                # Bound the way AuditContextMiddleware does
+                token = bind_actor(request=request)
+                try:
+                    return descend(options["depth"])
+                finally:
+                    unbind_actor(token)
+
+            return get_response(request)
+
+        results = [(lookup.__name__, measure(lookup)) for lookup in (stack_lookup, context_lookup)]
+
+        self.stdout.write(
+            f"{options['iterations']} lookups at a call depth of {options['depth']} frames"
+        )
+        for name, elapsed in results:
+            self.stdout.write(
+                f"{name}: {elapsed * 1000:.3f} ms total, "
+                f"{elapsed / options['iterations'] * 1_000_000:.2f} us per lookup"
+            )
+
+        (_, stack_elapsed), (_, context_elapsed) = results
+        self.stdout.write(self.style.SUCCESS(
+            f"ContextVar lookup is {stack_elapsed / max(context_elapsed, 1e-9):,.0f}x faster"
+        ))
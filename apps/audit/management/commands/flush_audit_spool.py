@@ -0,0 +1,48 @@
+# apps/audit/management/commands/flush_audit_spool.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.audit.services import drain_audit_spool
+
+
+class Command(BaseCommand):
+    help = "Flush the buffered audit spool into the audit hash chains."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Entries per flush transaction (default: AUDIT_SPOOL_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and flush every --interval seconds.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep between flushes in --loop mode.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        if not options["loop"]:
+            flushed = drain_audit_spool(batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} audit entries"))
+            return
+
+        self.stdout.write("Audit spool flusher started")
+        try:
+            while True:
+                flushed = drain_audit_spool(batch_size=batch_size)
+                if flushed:
+                    self.stdout.write(f"Flushed {flushed} audit entries")
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Audit spool flusher stopped")
@@ -0,0 +1,28 @@
+# apps/audit/management/commands/rebuild_audit_stats.py
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.audit.rollup import rebuild_hourly_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the hourly audit stats rollup from AuditLog."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Only rebuild the last N days (default: everything in AuditLog).",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["days"]:
+            since = timezone.now() - timedelta(days=options["days"])
+
+        rows = rebuild_hourly_stats(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} hourly stat rows"))
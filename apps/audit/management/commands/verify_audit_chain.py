@@ -0,0 +1,81 @@
+# apps/audit/management/commands/verify_audit_chain.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.audit.services import list_chain_keys
+from apps.audit.verification import publish_chain_health, verify_chain_incremental
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify audit hash chains incrementally from their last checkpoint "
+        "and publish the chain-health status read by the stats endpoints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chain-key",
+            action="append",
+            dest="chain_keys",
+            help="Chain to verify (repeatable). Default: all chains.",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Ignore checkpoints and verify from the first record.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes used to hash segments in parallel.",
+        )
+        parser.add_argument(
+            "--segment-size",
+            type=int,
+            default=None,
+            help="Records per segment (default: AUDIT_VERIFY_SEGMENT_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        chain_keys = options["chain_keys"] or list_chain_keys()
+        failed = []
+        results = []
+
+        for chain_key in chain_keys:
+            result = verify_chain_incremental(
+                chain_key,
+                full=options["full"],
+                workers=options["workers"],
+                segment_size=options["segment_size"],
+            )
+            results.append(result)
+
+            rate = result["records_per_second"]
+            summary = (
+                f"{chain_key}: {result['records_verified']} records "
+                f"(ids {result['from_log_id']}..{result['to_log_id']}, "
+                f"{result['segments']} segments) in "
+                f"{result['duration_seconds']:.2f}s"
+                + (f" - {rate:,.0f} records/s" if rate else "")
+            )
+
+            if result["checkpoint_rejected"]:
+                self.stdout.write(self.style.WARNING(
+                    f"{chain_key}: latest checkpoint is invalid, verified from start"
+                ))
+
+            if result["verified"]:
+                self.stdout.write(self.style.SUCCESS(summary))
+            else:
+                failed.append(chain_key)
+                self.stdout.write(self.style.ERROR(
+                    f"{summary} - {len(result['broken_links'])} broken links"
+                ))
+                for link in result["broken_links"]:
+                    self.stdout.write(f"  broken at log {link['log_id']}")
+
+        publish_chain_health(results)
+
+        if failed:
+            raise CommandError(f"Audit chain verification failed: {', '.join(failed)}")
@@ -0,0 +1,59 @@
+# Generated by Django 6.0.1 on 2026-10-17 06:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def move_legacy_records(apps, schema_editor):
+    # Existing records were hashed with the former payload and cannot be
+    # re-verified; park them in the "legacy" chain, which verification
+    # skips, and start the new chains empty
+    AuditLog = apps.get_model('audit', 'AuditLog')
+    AuditLog.objects.update(chain_key='legacy')
+
+
+def restore_legacy_records(apps, schema_editor):
+    AuditLog = apps.get_model('audit', 'AuditLog')
+    AuditLog.objects.filter(chain_key='legacy').update(chain_key='global')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0005_auditlog_metadata_auditlog_object_repr_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditChainHead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain_key', models.CharField(max_length=64, unique=True)),
+                ('last_log_id', models.BigIntegerField(blank=True, null=True)),
+                ('last_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('length', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Audit Chain Head',
+                'verbose_name_plural': 'Audit Chain Heads',
+                'ordering': ['chain_key'],
+            },
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='chain_key',
+            field=models.CharField(blank=True, default='global', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['chain_key', 'id'], name='audit_audit_chain_k_700cd5_idx'),
+        ),
+        migrations.RunPython(move_legacy_records, restore_legacy_records),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-17 06:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0006_auditchainhead_auditlog_chain_key_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditSpoolEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain_key', models.CharField(max_length=64)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('payload', models.JSONField()),
+            ],
+            options={
+                'verbose_name': 'Audit Spool Entry',
+                'verbose_name_plural': 'Audit Spool Entries',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-17 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0007_auditspoolentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditVerificationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain_key', models.CharField(max_length=64)),
+                ('last_log_id', models.BigIntegerField()),
+                ('last_hash', models.CharField(max_length=64)),
+                ('records_verified', models.PositiveBigIntegerField(default=0)),
+                ('duration', models.DurationField(blank=True, null=True)),
+                ('signature', models.CharField(editable=False, max_length=64)),
+                ('verified_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Audit Verification Checkpoint',
+                'verbose_name_plural': 'Audit Verification Checkpoints',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['chain_key', '-last_log_id'], name='audit_audit_chain_k_e93a49_idx')],
+            },
+        ),
+    ]
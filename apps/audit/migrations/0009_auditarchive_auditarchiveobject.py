@@ -0,0 +1,53 @@
+# Generated by Django 6.0.1 on 2026-10-17 06:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0008_auditverificationcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(unique=True)),
+                ('period_end', models.DateField()),
+                ('file_path', models.CharField(max_length=255)),
+                ('compression', models.CharField(max_length=10)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('first_log_id', models.BigIntegerField()),
+                ('last_log_id', models.BigIntegerField()),
+                ('record_count', models.PositiveBigIntegerField(default=0)),
+                ('min_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('max_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('chain_anchors', models.JSONField(default=dict)),
+                ('block_index', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Audit Archive',
+                'verbose_name_plural': 'Audit Archives',
+                'ordering': ['-last_log_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditArchiveObject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50)),
+                ('object_id', models.CharField(max_length=255)),
+                ('blocks', models.JSONField(default=list)),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='objects_index', to='audit.auditarchive')),
+            ],
+            options={
+                'verbose_name': 'Audit Archive Object',
+                'verbose_name_plural': 'Audit Archive Objects',
+                'indexes': [models.Index(fields=['model_name', 'object_id'], name='audit_audit_model_n_064415_idx')],
+            },
+        ),
+    ]
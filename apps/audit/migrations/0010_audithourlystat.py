@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-17 07:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0009_auditarchive_auditarchiveobject'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditHourlyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('action', models.CharField(max_length=50)),
+                ('model_name', models.CharField(max_length=50)),
+                ('user_pk', models.BigIntegerField(default=0)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('duration_count', models.PositiveBigIntegerField(default=0)),
+                ('duration_total', models.FloatField(default=0)),
+                ('duration_min', models.FloatField(blank=True, null=True)),
+                ('duration_max', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Audit Hourly Stat',
+                'verbose_name_plural': 'Audit Hourly Stats',
+                'ordering': ['-hour'],
+                'constraints': [models.UniqueConstraint(fields=('hour', 'action', 'model_name', 'user_pk'), name='unique_audit_hourly_stat')],
+            },
+        ),
+    ]
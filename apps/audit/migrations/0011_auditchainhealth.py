@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-17 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0010_audithourlystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditChainHealth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain_key', models.CharField(max_length=64, unique=True)),
+                ('verified', models.BooleanField()),
+                ('broken_links_count', models.PositiveIntegerField(default=0)),
+                ('to_log_id', models.BigIntegerField(blank=True, null=True)),
+                ('checked_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Audit Chain Health',
+                'verbose_name_plural': 'Audit Chain Health',
+                'ordering': ['chain_key'],
+            },
+        ),
+    ]
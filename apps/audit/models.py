@@ -39,11 +39,9 @@
 
 
 # apps/audit/models.py
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import PermissionDenied
-from hashlib import sha256
-import json
-import hashlib
+from django.utils import timezone
 from apps.accounts.models import User
 from apps.clinics.models import Branch
 
@@ -66,10 +64,13 @@ class AuditLog(models.Model):
     object_repr = models.TextField(blank=True, null=True)
 
     # 🔐 HASH CHAIN (IMMUTABLE)
+    # Each chain (one per branch by default) is linked independently
+    chain_key = models.CharField(max_length=64, blank=True, editable=False)
     previous_hash = models.CharField(max_length=64, blank=True)
     record_hash = models.CharField(max_length=64, editable=False, db_index=True)
 
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Assigned before insert so it is part of the hashed payload
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     duration = models.DurationField(null=True, blank=True)
 
     class Meta:
@@ -84,42 +85,301 @@ class AuditLog(models.Model):
             models.Index(fields=["user", "timestamp"]),
             models.Index(fields=["model_name", "object_id"]),
             models.Index(fields=["record_hash"]),
+            models.Index(fields=["chain_key", "id"]),
         ]
 
     def __str__(self):
         return f"{self.id} | {self.action} | {self.model_name}:{self.object_id}"
 
     # ============================
-    # 🔐 IMMUTABILITY ENFORCEMENT
+    # 🔐 HASH CHAIN
     # ============================
 
-    def save(self, *args, **kwargs):
-        if self.pk:
-            raise PermissionDenied("AuditLog is immutable (update forbidden)")
-
-        # Fetch previous hash
-        last = AuditLog.objects.order_by("-id").only("record_hash").first()
-        self.previous_hash = last.record_hash if last else ""
-
-        # Compute current hash
-        payload = {
-            "previous_hash": self.previous_hash,
+    def hash_payload(self):
+        """
+        Canonical payload covered by record_hash.
+        """
+        return {
+            "timestamp": self.timestamp.isoformat() if self.timestamp else "",
             "branch_id": self.branch_id,
             "user_id": self.user_id,
             "action": self.action,
-            "model_name": self.model_name,
+            "model": self.model_name,
             "object_id": self.object_id,
             "before": self.before,
             "after": self.after,
-            "metadata": self.metadata,
-            "timestamp": self.timestamp.isoformat() if self.timestamp else "",
+            "metadata": self.metadata or {},
         }
 
-        serialized = json.dumps(payload, sort_keys=True, default=str)
-        raw = (self.previous_hash or "") + serialized
-        self.record_hash = hashlib.sha256(raw.encode()).hexdigest()
+    # ============================
+    # 🔐 IMMUTABILITY ENFORCEMENT
+    # ============================
 
-        super().save(*args, **kwargs)
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise PermissionDenied("AuditLog is immutable (update forbidden)")
+
+        from apps.audit.rollup import record_logs
+        from apps.audit.services import compute_record_hash, resolve_chain_key
+
+        if not self.chain_key:
+            self.chain_key = resolve_chain_key(self.branch_id)
+
+        with transaction.atomic():
+            # Only this chain's head is locked; other chains append in parallel
+            head = AuditChainHead.lock(self.chain_key)
+
+            self.previous_hash = head.last_hash
+            self.record_hash = compute_record_hash(self.previous_hash, self.hash_payload())
+
+            super().save(*args, **kwargs)
+
+            head.advance(self)
+            record_logs([self])
 
     def delete(self, *args, **kwargs):
         raise PermissionDenied("AuditLog cannot be deleted")
+
+
+class AuditChainHead(models.Model):
+    """
+    Head pointer of one audit hash chain.
+
+    Appending to a chain locks only its head row, so writes
+    to different chains never wait on each other.
+    """
+
+    DEFAULT_CHAIN_KEY = "global"
+    # Records from before per-chain hashing (migration 0006), hashed
+    # with the former payload; kept, but never re-verified
+    LEGACY_CHAIN_KEY = "legacy"
+
+    chain_key = models.CharField(max_length=64, unique=True)
+    last_log_id = models.BigIntegerField(null=True, blank=True)
+    last_hash = models.CharField(max_length=64, blank=True, default="")
+    length = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Audit Chain Head"
+        verbose_name_plural = "Audit Chain Heads"
+        ordering = ["chain_key"]
+
+    def __str__(self):
+        return f"{self.chain_key} | {self.length} records"
+
+    @classmethod
+    def lock(cls, chain_key):
+        """
+        Fetch (or create) the chain head with a row lock.
+        Must be called inside a transaction.
+        """
+        head, _ = cls.objects.select_for_update().get_or_create(chain_key=chain_key)
+        return head
+
+    def advance(self, log, count=1):
+        """
+        Move the head to `log`, the newest of `count` appended records.
+        """
+        self.last_log_id = log.pk
+        self.last_hash = log.record_hash
+        self.length += count
+        self.save(update_fields=["last_log_id", "last_hash", "length", "updated_at"])
+
+
+class AuditSpoolEntry(models.Model):
+    """
+    Pending audit record written by the buffered audit writer.
+
+    Entries are only ever inserted by the request path and are
+    moved into AuditLog, in id order per chain, by the spool flusher.
+    """
+
+    chain_key = models.CharField(max_length=64)
+    timestamp = models.DateTimeField(default=timezone.now)
+    payload = models.JSONField()
+
+    class Meta:
+        verbose_name = "Audit Spool Entry"
+        verbose_name_plural = "Audit Spool Entries"
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.id} | {self.chain_key} | {self.payload.get('action')}"
+
+
+class AuditVerificationCheckpoint(models.Model):
+    """
+    Signed marker of a verified chain prefix.
+
+    Records up to last_log_id (ending in last_hash) were verified, so
+    later runs only need to verify records appended after it.
+    """
+
+    chain_key = models.CharField(max_length=64)
+    last_log_id = models.BigIntegerField()
+    last_hash = models.CharField(max_length=64)
+
+    records_verified = models.PositiveBigIntegerField(default=0)
+    duration = models.DurationField(null=True, blank=True)
+    signature = models.CharField(max_length=64, editable=False)
+
+    verified_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Audit Verification Checkpoint"
+        verbose_name_plural = "Audit Verification Checkpoints"
+        ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["chain_key", "-last_log_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.chain_key} | up to {self.last_log_id}"
+
+    @property
+    def records_per_second(self):
+        seconds = self.duration.total_seconds() if self.duration else 0
+        return self.records_verified / seconds if seconds else None
+
+
+class AuditChainHealth(models.Model):
+    """
+    Outcome of the last verification of one chain.
+
+    Written by the verifier (command or API) and read by dashboards,
+    so the status outlives the process that produced it.
+    """
+
+    chain_key = models.CharField(max_length=64, unique=True)
+    verified = models.BooleanField()
+    broken_links_count = models.PositiveIntegerField(default=0)
+    to_log_id = models.BigIntegerField(null=True, blank=True)
+    checked_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Audit Chain Health"
+        verbose_name_plural = "Audit Chain Health"
+        ordering = ["chain_key"]
+
+    def __str__(self):
+        return f"{self.chain_key} | {'verified' if self.verified else 'broken'}"
+
+
+class AuditArchive(models.Model):
+    """
+    Cold-storage segment of the audit log for one closed month.
+
+    Holds a contiguous id range as independently compressed blocks of
+    JSON lines. chain_anchors records, per chain, the hashes at both
+    ends of the archived range so verification continues across it.
+    """
+
+    period_start = models.DateField(unique=True)
+    period_end = models.DateField()
+
+    file_path = models.CharField(max_length=255)
+    compression = models.CharField(max_length=10)
+    content_hash = models.CharField(max_length=64)
+
+    first_log_id = models.BigIntegerField()
+    last_log_id = models.BigIntegerField()
+    record_count = models.PositiveBigIntegerField(default=0)
+    min_timestamp = models.DateTimeField(null=True, blank=True)
+    max_timestamp = models.DateTimeField(null=True, blank=True)
+
+    # chain_key -> {first_id, first_previous_hash, last_id, last_hash, count}
+    chain_anchors = models.JSONField(default=dict)
+    # [{offset, length, first_id, last_id, count}, ...]
+    block_index = models.JSONField(default=list)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Audit Archive"
+        verbose_name_plural = "Audit Archives"
+        ordering = ["-last_log_id"]
+
+    def __str__(self):
+        return f"{self.period_start:%Y-%m} | {self.record_count} records"
+
+    @classmethod
+    def chain_tail(cls, chain_key):
+        """
+        (last_log_id, last_hash) of the archived part of a chain,
+        or (0, "") when nothing of it is archived.
+        """
+        archive = (
+            cls.objects
+            .filter(chain_anchors__has_key=chain_key)
+            .order_by("-last_log_id")
+            .only("chain_anchors")
+            .first()
+        )
+        if archive is None:
+            return 0, ""
+        anchor = archive.chain_anchors[chain_key]
+        return anchor["last_id"], anchor["last_hash"]
+
+
+class AuditArchiveObject(models.Model):
+    """
+    Sparse object index: which blocks of an archive hold records
+    for a given model_name / object_id.
+    """
+
+    archive = models.ForeignKey(
+        AuditArchive,
+        on_delete=models.CASCADE,
+        related_name="objects_index",
+    )
+    model_name = models.CharField(max_length=50)
+    object_id = models.CharField(max_length=255)
+    blocks = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name = "Audit Archive Object"
+        verbose_name_plural = "Audit Archive Objects"
+        indexes = [
+            models.Index(fields=["model_name", "object_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name}:{self.object_id} in {self.archive_id}"
+
+
+class AuditHourlyStat(models.Model):
+    """
+    Audit record counters per hour, action, model and user.
+
+    Incremented in the same transaction as the records they count
+    (see apps.audit.rollup), so stats never scan AuditLog.
+    """
+
+    hour = models.DateTimeField()
+    action = models.CharField(max_length=50)
+    model_name = models.CharField(max_length=50)
+    # User pk, 0 for records without a user
+    user_pk = models.BigIntegerField(default=0)
+
+    count = models.PositiveBigIntegerField(default=0)
+
+    # Over records with a duration, in seconds
+    duration_count = models.PositiveBigIntegerField(default=0)
+    duration_total = models.FloatField(default=0)
+    duration_min = models.FloatField(null=True, blank=True)
+    duration_max = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Audit Hourly Stat"
+        verbose_name_plural = "Audit Hourly Stats"
+        ordering = ["-hour"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hour", "action", "model_name", "user_pk"],
+                name="unique_audit_hourly_stat",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}:00 | {self.action} {self.model_name} | {self.count}"
@@ -0,0 +1,153 @@
+# apps/audit/rollup.py
+"""
+Hourly audit counters.
+
+Every AuditLog write adds to one AuditHourlyStat row per (hour,
+action, model_name, user): AuditLog.save() for single records and
+flush_audit_spool() once per flushed batch. Rows are incremented
+with F() expressions inside the writer's transaction, so counts stay
+exact under concurrent writers and roll back with the records.
+
+rebuild_hourly_stats() (management command rebuild_audit_stats)
+recomputes the rows from AuditLog, e.g. for records written before
+the rollup existed. Archived months keep their rows.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncHour
+
+from .models import AuditHourlyStat, AuditLog
+
+
+def rollup_enabled() -> bool:
+    return getattr(settings, "AUDIT_STATS_ROLLUP", True)
+
+
+def hour_of(timestamp: datetime) -> datetime:
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(dt_timezone.utc)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+# ======================================================
+# INCREMENTS
+# ======================================================
+
+def _bucket_logs(logs: Iterable[AuditLog]) -> Dict[tuple, Dict[str, Any]]:
+    buckets: Dict[tuple, Dict[str, Any]] = {}
+    for log in logs:
+        key = (hour_of(log.timestamp), log.action, log.model_name, log.user_id or 0)
+        bucket = buckets.setdefault(key, {
+            "count": 0,
+            "duration_count": 0,
+            "duration_total": 0.0,
+            "duration_min": None,
+            "duration_max": None,
+        })
+        bucket["count"] += 1
+
+        if log.duration is not None:
+            seconds = log.duration.total_seconds()
+            bucket["duration_count"] += 1
+            bucket["duration_total"] += seconds
+            bucket["duration_min"] = seconds if bucket["duration_min"] is None else min(bucket["duration_min"], seconds)
+            bucket["duration_max"] = seconds if bucket["duration_max"] is None else max(bucket["duration_max"], seconds)
+    return buckets
+
+
+def _increments(bucket: Dict[str, Any]) -> Dict[str, Any]:
+    updates = {"count": F("count") + bucket["count"]}
+    if bucket["duration_count"]:
+        low = Value(bucket["duration_min"])
+        high = Value(bucket["duration_max"])
+        updates.update(
+            duration_count=F("duration_count") + bucket["duration_count"],
+            duration_total=F("duration_total") + bucket["duration_total"],
+            # Least / Greatest are NULL on some backends if a side is NULL
+            duration_min=Coalesce(Least(F("duration_min"), low), low),
+            duration_max=Coalesce(Greatest(F("duration_max"), high), high),
+        )
+    return updates
+
+
+def record_logs(logs: Iterable[AuditLog]) -> int:
+    """
+    Add written audit records to the hourly counters.
+    Returns the number of rows touched.
+    """
+    if not rollup_enabled():
+        return 0
+
+    buckets = _bucket_logs(logs)
+    for (hour, action, model_name, user_pk), bucket in buckets.items():
+        rows = AuditHourlyStat.objects.filter(
+            hour=hour, action=action, model_name=model_name, user_pk=user_pk
+        )
+        if rows.update(**_increments(bucket)):
+            continue
+        try:
+            with transaction.atomic():
+                AuditHourlyStat.objects.create(
+                    hour=hour, action=action, model_name=model_name, user_pk=user_pk, **bucket
+                )
+        except IntegrityError:
+            # Another writer created the row first
+            rows.update(**_increments(bucket))
+    return len(buckets)
+
+
+# ======================================================
+# REBUILD
+# ======================================================
+
+def rebuild_hourly_stats(since: Optional[datetime] = None) -> int:
+    """
+    Recompute counters from AuditLog for hours from `since` (default:
+    the oldest record). Records written while it runs may be missed,
+    so run it when audit writes are quiet. Returns the rows written.
+    """
+    logs = AuditLog.objects.all()
+    if since is None:
+        since = logs.aggregate(first=Min("timestamp"))["first"]
+        if since is None:
+            return 0
+    since = hour_of(since)
+
+    grouped = (
+        logs.filter(timestamp__gte=since)
+        .annotate(bucket=TruncHour("timestamp", tzinfo=dt_timezone.utc))
+        .values("bucket", "action", "model_name", "user_id")
+        .annotate(
+            total=Count("id"),
+            timed=Count("duration"),
+            duration_sum=Sum("duration"),
+            shortest=Min("duration"),
+            longest=Max("duration"),
+        )
+        .order_by()
+    )
+
+    rows = [
+        AuditHourlyStat(
+            hour=row["bucket"],
+            action=row["action"],
+            model_name=row["model_name"],
+            user_pk=row["user_id"] or 0,
+            count=row["total"],
+            duration_count=row["timed"],
+            duration_total=row["duration_sum"].total_seconds() if row["duration_sum"] else 0,
+            duration_min=row["shortest"].total_seconds() if row["shortest"] is not None else None,
+            duration_max=row["longest"].total_seconds() if row["longest"] is not None else None,
+        )
+        for row in grouped.iterator()
+    ]
+
+    with transaction.atomic():
+        AuditHourlyStat.objects.filter(hour__gte=since).delete()
+        AuditHourlyStat.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
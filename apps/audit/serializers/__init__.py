@@ -8,3 +8,4 @@ from .diff import AuditLogDiffSerializer
 from .response import AuditLogResponseSerializer, BulkAuditResponseSerializer
 from .webhook import AuditWebhookSerializer
 from .alert import AuditAlertSerializer
+from .verification import VerificationCheckpointSerializer, IncrementalVerificationSerializer
@@ -5,10 +5,20 @@ class AuditExportSerializer(serializers.Serializer):
     start_date = serializers.DateTimeField()
     end_date = serializers.DateTimeField()
 
-    format = serializers.ChoiceField(choices=["json", "csv", "excel"])
+    format = serializers.ChoiceField(
+        choices=["json", "csv", "ndjson", "parquet", "excel"]
+    )
     include_sensitive = serializers.BooleanField(default=False)
     compress = serializers.BooleanField(default=False)
 
+    def validate_format(self, value):
+        # Workbooks are built in memory; large ranges must stream
+        if value == "excel":
+            raise serializers.ValidationError(
+                "Excel export is not available for audit logs, use csv (opens in Excel)."
+            )
+        return value
+
 
 class ChainVerificationSerializer(serializers.Serializer):
     verified = serializers.BooleanField()
@@ -15,8 +15,10 @@ class AuditStatsSerializer(serializers.Serializer):
     by_user = serializers.ListField()
     by_hour = serializers.DictField()
 
-    chain_verified = serializers.BooleanField()
-    broken_links_count = serializers.IntegerField()
+    # None until the background verifier has published a status
+    chain_verified = serializers.BooleanField(allow_null=True)
+    broken_links_count = serializers.IntegerField(allow_null=True)
+    chain_checked_at = serializers.DateTimeField(allow_null=True)
 
     avg_duration_seconds = serializers.FloatField()
     max_duration_seconds = serializers.FloatField()
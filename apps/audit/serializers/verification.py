@@ -0,0 +1,38 @@
+from rest_framework import serializers
+from apps.audit.models import AuditVerificationCheckpoint
+
+
+class VerificationCheckpointSerializer(serializers.ModelSerializer):
+    duration_seconds = serializers.SerializerMethodField()
+    records_per_second = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = AuditVerificationCheckpoint
+        fields = [
+            "id",
+            "chain_key",
+            "last_log_id",
+            "last_hash",
+            "records_verified",
+            "duration_seconds",
+            "records_per_second",
+            "verified_at",
+        ]
+        read_only_fields = fields
+
+    def get_duration_seconds(self, obj):
+        return obj.duration.total_seconds() if obj.duration else None
+
+
+class IncrementalVerificationSerializer(serializers.Serializer):
+    chain_key = serializers.CharField()
+    verified = serializers.BooleanField()
+    from_log_id = serializers.IntegerField()
+    to_log_id = serializers.IntegerField()
+    records_verified = serializers.IntegerField()
+    segments = serializers.IntegerField()
+    broken_links = serializers.ListField()
+    checkpoint_rejected = serializers.BooleanField()
+    checkpoint_id = serializers.IntegerField(allow_null=True)
+    duration_seconds = serializers.FloatField()
+    records_per_second = serializers.FloatField(allow_null=True)
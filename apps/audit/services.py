@@ -333,13 +333,19 @@
 
 import hashlib
 import json
-from typing import Optional, Dict, Any, List, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Iterable, Tuple
 
-from django.db import transaction
+from django.conf import settings
+from django.db import connections, transaction
 from django.forms.models import model_to_dict
 from django.utils import timezone
+from django.utils.module_loading import import_string
 
-from apps.audit.models import AuditLog
+from apps.audit.models import AuditLog, AuditArchive, AuditChainHead, AuditSpoolEntry
+from apps.audit.rollup import record_logs
 
 
 # ======================================================
@@ -349,6 +355,9 @@ from apps.audit.models import AuditLog
 AUDIT_BEFORE_ATTR = "_audit_before"
 AUDIT_CONTEXT_ATTR = "_audit_context"
 
+# Set by core.mixins.tracked_state.TrackedStateMixin
+AUDIT_LOADED_VALUES_ATTR = "_loaded_values"
+
 VALID_ACTIONS = {
     "CREATE",
     "UPDATE",
@@ -378,34 +387,75 @@ def json_dumps(value: Any) -> str:
     )
 
 
-def serialize_model(instance) -> Optional[Dict[str, Any]]:
+def _serialize_value(value: Any) -> Any:
+    if hasattr(value, "pk"):
+        return value.pk
+    if hasattr(value, "all"):
+        return list(value.all().values_list("pk", flat=True))
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (dict, list, str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def serialize_model(instance, include_m2m: bool = True) -> Optional[Dict[str, Any]]:
     """
     Convert Django model instance to a JSON-safe dict.
     FK -> pk
-    M2M -> list[pk]
+    M2M -> list[pk] (one query per field, skipped with include_m2m=False)
     Date/Datetime -> ISO
     """
     if instance is None:
         return None
 
-    raw = model_to_dict(instance)
-    data: Dict[str, Any] = {}
+    exclude = None
+    if not include_m2m:
+        exclude = [field.name for field in instance._meta.many_to_many]
 
-    for field, value in raw.items():
-        if hasattr(value, "pk"):
-            data[field] = value.pk
-        elif hasattr(value, "all"):
-            data[field] = list(value.all().values_list("pk", flat=True))
-        elif hasattr(value, "isoformat"):
-            data[field] = value.isoformat()
-        elif isinstance(value, (dict, list, str, int, float, bool)) or value is None:
-            data[field] = value
-        else:
-            data[field] = str(value)
+    raw = model_to_dict(instance, exclude=exclude)
+
+    return {field: _serialize_value(value) for field, value in raw.items()}
+
+
+def serialize_loaded_values(instance) -> Optional[Dict[str, Any]]:
+    """
+    Serialize the field values tracked when the instance was loaded
+    (TrackedStateMixin), in the same shape as
+    serialize_model(instance, include_m2m=False).
+
+    Returns None when nothing is tracked or a field was deferred.
+    """
+    loaded = getattr(instance, AUDIT_LOADED_VALUES_ATTR, None)
+    if loaded is None:
+        return None
+
+    data: Dict[str, Any] = {}
+    for field in instance._meta.concrete_fields:
+        if not getattr(field, "editable", False):
+            continue
+        if field.attname not in loaded:
+            return None
+        data[field.name] = _serialize_value(loaded[field.attname])
 
     return data
 
 
+def changed_fields(
+    before: Dict[str, Any],
+    after: Dict[str, Any],
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Reduce BEFORE / AFTER snapshots to the fields that differ.
+    """
+    keys = set(before) | set(after)
+    changed = [key for key in keys if before.get(key) != after.get(key)]
+    return (
+        {key: before.get(key) for key in changed},
+        {key: after.get(key) for key in changed},
+    )
+
+
 # ======================================================
 # HASH CHAIN
 # ======================================================
@@ -418,6 +468,29 @@ def compute_record_hash(previous_hash: str, payload: Dict[str, Any]) -> str:
     return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 
+@lru_cache(maxsize=None)
+def _load_chain_key_resolver(path: str):
+    return import_string(path)
+
+
+def resolve_chain_key(branch=None) -> str:
+    """
+    Resolve which hash chain a record belongs to.
+
+    Default: one chain per branch ("branch:<id>"), "global" when
+    no branch is known. Override with settings.AUDIT_CHAIN_KEY_RESOLVER
+    (dotted path to a callable taking the branch or branch id).
+    """
+    resolver_path = getattr(settings, "AUDIT_CHAIN_KEY_RESOLVER", None)
+    if resolver_path:
+        return _load_chain_key_resolver(resolver_path)(branch)
+
+    branch_id = getattr(branch, "pk", branch)
+    if branch_id is None:
+        return AuditChainHead.DEFAULT_CHAIN_KEY
+    return f"branch:{branch_id}"
+
+
 # ======================================================
 # SNAPSHOT HANDLING (PRE-SAVE)
 # ======================================================
@@ -426,14 +499,28 @@ def snapshot_before(instance) -> None:
     """
     Capture BEFORE snapshot.
     Called from pre_save / pre_delete signal.
+
+    Instances tracking their loaded state (TrackedStateMixin) are
+    snapshotted in memory; others are re-fetched from the database.
     """
     if not instance.pk:
         setattr(instance, AUDIT_BEFORE_ATTR, None)
         return
 
+    tracked = hasattr(instance, AUDIT_LOADED_VALUES_ATTR)
+    if tracked:
+        before = serialize_loaded_values(instance)
+        if before is not None:
+            setattr(instance, AUDIT_BEFORE_ATTR, before)
+            return
+
     try:
         old = instance.__class__.objects.get(pk=instance.pk)
-        setattr(instance, AUDIT_BEFORE_ATTR, serialize_model(old))
+        setattr(
+            instance,
+            AUDIT_BEFORE_ATTR,
+            serialize_model(old, include_m2m=not tracked),
+        )
     except instance.__class__.DoesNotExist:
         setattr(instance, AUDIT_BEFORE_ATTR, None)
 
@@ -449,8 +536,8 @@ def attach_audit_context(instance, request) -> None:
     context = {
         "user": getattr(request, "user", None),
         "branch": (
-            getattr(request, "branch", None)
-            or getattr(getattr(request, "user", None), "current_branch", None)
+            request.branch if getattr(request, "branch_id", None)
+            else getattr(getattr(request, "user", None), "current_branch", None)
         ),
         "device_id": request.META.get("HTTP_X_DEVICE_ID"),
         "ip_address": request.META.get("REMOTE_ADDR"),
@@ -467,7 +554,6 @@ def _extract_context(instance) -> Dict[str, Any]:
 # CORE AUDIT LOGGER (IMMUTABLE)
 # ======================================================
 
-@transaction.atomic
 def log_action(
     *,
     instance,
@@ -478,9 +564,17 @@ def log_action(
     ip_address: Optional[str] = None,
     duration=None,
     metadata: Optional[Dict[str, Any]] = None,
+    chain_key: Optional[str] = None,
 ) -> AuditLog:
     """
     Create immutable audit log with hash chaining.
+
+    Chain linking happens in AuditLog.save() and only locks the
+    head of the record's chain (see resolve_chain_key).
+
+    With settings.AUDIT_WRITE_MODE = "buffered" the record is only
+    appended to the spool and the AuditSpoolEntry is returned;
+    flush_audit_spool() links it into the chain later.
     """
 
     action = action.upper()
@@ -499,50 +593,55 @@ def log_action(
 
     before = getattr(instance, AUDIT_BEFORE_ATTR, None)
 
-    after = None if action == "DELETE" else serialize_model(instance)
-
-    last = (
-        AuditLog.objects
-        .select_for_update()
-        .order_by("-id")
-        .only("record_hash")
-        .first()
+    # Tracked instances snapshot without M2M on both sides
+    tracked = hasattr(instance, AUDIT_LOADED_VALUES_ATTR)
+    after = (
+        None if action == "DELETE"
+        else serialize_model(instance, include_m2m=not tracked)
     )
 
-    previous_hash = last.record_hash if last else ""
+    if (
+        action == "UPDATE"
+        and before is not None
+        and after is not None
+        and getattr(settings, "AUDIT_STORE_CHANGES_ONLY", True)
+    ):
+        before, after = changed_fields(before, after)
 
     model_name = instance.__class__.__name__
     object_id = str(instance.pk) if instance.pk else "NEW"
-
-    payload = {
-        "timestamp": timezone.now().isoformat(),
-        "branch_id": branch.id if branch else None,
-        "user_id": user.id if user else None,
-        "action": action,
-        "model": model_name,
-        "object_id": object_id,
-        "before": before,
-        "after": after,
-        "metadata": metadata or {},
-    }
-
-    record_hash = compute_record_hash(previous_hash, payload)
-
-    log = AuditLog.objects.create(
-        branch=branch,
-        user=user,
-        device_id=device_id,
-        ip_address=ip_address,
-        action=action,
-        model_name=model_name,
-        object_id=object_id,
-        before=before,
-        after=after,
-        metadata=metadata or {},
-        previous_hash=previous_hash,
-        record_hash=record_hash,
-        duration=duration,
-    )
+    chain_key = chain_key or resolve_chain_key(branch)
+
+    if getattr(settings, "AUDIT_WRITE_MODE", "sync") == "buffered":
+        log = enqueue_audit_entry(
+            chain_key=chain_key,
+            branch_id=getattr(branch, "pk", None),
+            user_id=getattr(user, "pk", None),
+            device_id=device_id,
+            ip_address=ip_address,
+            action=action,
+            model_name=model_name,
+            object_id=object_id,
+            before=before,
+            after=after,
+            metadata=metadata or {},
+            duration=duration,
+        )
+    else:
+        log = AuditLog.objects.create(
+            branch=branch,
+            user=user,
+            device_id=device_id,
+            ip_address=ip_address,
+            action=action,
+            model_name=model_name,
+            object_id=object_id,
+            before=before,
+            after=after,
+            metadata=metadata or {},
+            chain_key=chain_key,
+            duration=duration,
+        )
 
     if hasattr(instance, AUDIT_BEFORE_ATTR):
         delattr(instance, AUDIT_BEFORE_ATTR)
@@ -553,6 +652,99 @@ def log_action(
     return log
 
 
+# ======================================================
+# BUFFERED WRITER (SPOOL)
+# ======================================================
+
+def enqueue_audit_entry(*, chain_key: str, duration=None, **fields) -> AuditSpoolEntry:
+    """
+    Append an audit record to the spool.
+    Single INSERT, no chain lock: this is all the request path pays.
+    """
+    fields["duration"] = duration.total_seconds() if duration is not None else None
+    return AuditSpoolEntry.objects.create(
+        chain_key=chain_key,
+        timestamp=timezone.now(),
+        payload=fields,
+    )
+
+
+def _log_from_spool(entry: AuditSpoolEntry) -> AuditLog:
+    fields = dict(entry.payload)
+    duration = fields.pop("duration", None)
+    return AuditLog(
+        chain_key=entry.chain_key,
+        timestamp=entry.timestamp,
+        duration=timedelta(seconds=duration) if duration is not None else None,
+        **fields,
+    )
+
+
+def flush_audit_spool(batch_size: Optional[int] = None) -> int:
+    """
+    Move up to batch_size spooled entries into AuditLog.
+
+    Entries are linked in spool order within each chain, one head
+    lock and one bulk INSERT per chain. Concurrent flushers queue
+    on the spool rows, so chain order is preserved.
+    Returns the number of flushed entries.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, "AUDIT_SPOOL_BATCH_SIZE", 500)
+
+    with transaction.atomic():
+        entries = list(
+            AuditSpoolEntry.objects
+            .select_for_update()
+            .order_by("id")[:batch_size]
+        )
+        if not entries:
+            return 0
+
+        by_chain: Dict[str, List[AuditSpoolEntry]] = {}
+        for entry in entries:
+            by_chain.setdefault(entry.chain_key, []).append(entry)
+
+        flushed = []
+
+        # Lock heads in a stable order to avoid deadlocks
+        for chain_key in sorted(by_chain):
+            head = AuditChainHead.lock(chain_key)
+            previous_hash = head.last_hash
+
+            logs = []
+            for entry in by_chain[chain_key]:
+                log = _log_from_spool(entry)
+                log.previous_hash = previous_hash
+                log.record_hash = compute_record_hash(previous_hash, log.hash_payload())
+                previous_hash = log.record_hash
+                logs.append(log)
+
+            created = AuditLog.objects.bulk_create(logs)
+            head.advance(created[-1], count=len(created))
+            flushed.extend(created)
+
+        record_logs(flushed)
+
+        AuditSpoolEntry.objects.filter(
+            id__in=[entry.id for entry in entries]
+        ).delete()
+
+    return len(entries)
+
+
+def drain_audit_spool(batch_size: Optional[int] = None) -> int:
+    """
+    Flush batches until the spool is empty.
+    """
+    total = 0
+    while True:
+        flushed = flush_audit_spool(batch_size=batch_size)
+        if not flushed:
+            return total
+        total += flushed
+
+
 # ======================================================
 # ACTION SHORTCUTS
 # ======================================================
@@ -599,35 +791,31 @@ def log_bulk(
 # CHAIN VERIFICATION
 # ======================================================
 
-def verify_chain() -> List[Dict[str, Any]]:
-    """
-    Verify audit hash chain by recomputing hashes.
-    """
+def _verify_single_chain(chain_key: str) -> List[Dict[str, Any]]:
     broken = []
-    previous_hash = ""
+    if chain_key == AuditChainHead.LEGACY_CHAIN_KEY:
+        return broken
 
-    logs = AuditLog.objects.order_by("id").iterator()
+    # Archived records are verified by archive.verify_archive();
+    # the hot part continues from the archived tail
+    _, previous_hash = AuditArchive.chain_tail(chain_key)
+
+    logs = (
+        AuditLog.objects
+        .filter(chain_key=chain_key)
+        .order_by("id")
+        .iterator()
+    )
 
     for log in logs:
-        payload = {
-            "timestamp": log.timestamp.isoformat(),
-            "branch_id": log.branch_id,
-            "user_id": log.user_id,
-            "action": log.action,
-            "model": log.model_name,
-            "object_id": log.object_id,
-            "before": log.before,
-            "after": log.after,
-            "metadata": log.metadata or {},
-        }
-
-        expected_hash = compute_record_hash(previous_hash, payload)
+        expected_hash = compute_record_hash(previous_hash, log.hash_payload())
 
         if (
             log.previous_hash != previous_hash
             or log.record_hash != expected_hash
         ):
             broken.append({
+                "chain_key": chain_key,
                 "log_id": log.id,
                 "expected_previous": previous_hash,
                 "actual_previous": log.previous_hash,
@@ -638,6 +826,70 @@ def verify_chain() -> List[Dict[str, Any]]:
 
         previous_hash = log.record_hash
 
+    # The head pointer must reference the last record of the chain
+    head = AuditChainHead.objects.filter(chain_key=chain_key).first()
+    if head and head.last_hash != previous_hash:
+        broken.append({
+            "chain_key": chain_key,
+            "log_id": head.last_log_id,
+            "expected_previous": previous_hash,
+            "actual_previous": head.last_hash,
+            "expected_hash": previous_hash,
+            "actual_hash": head.last_hash,
+            "timestamp": head.updated_at,
+        })
+
+    return broken
+
+
+def _verify_chain_worker(chain_key: str) -> List[Dict[str, Any]]:
+    # Runs in a pool thread: release the thread's DB connection when done
+    try:
+        return _verify_single_chain(chain_key)
+    finally:
+        connections.close_all()
+
+
+def list_chain_keys() -> List[str]:
+    """
+    Verifiable chains; the legacy chain is left out.
+    """
+    keys = set(AuditChainHead.objects.values_list("chain_key", flat=True))
+    keys.update(
+        AuditLog.objects.values_list("chain_key", flat=True).distinct()
+    )
+    keys.discard(AuditChainHead.LEGACY_CHAIN_KEY)
+    return sorted(keys)
+
+
+def verify_chain(
+    chain_key: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Verify audit hash chain(s) by recomputing hashes.
+
+    chain_key given -> verify that chain only.
+    Otherwise every chain is verified, in parallel when
+    max_workers (default settings.AUDIT_VERIFY_WORKERS) > 1.
+    Returns the broken links of all verified chains.
+    """
+    if chain_key is not None:
+        return _verify_single_chain(chain_key)
+
+    chain_keys = list_chain_keys()
+    if max_workers is None:
+        max_workers = getattr(settings, "AUDIT_VERIFY_WORKERS", 4)
+
+    if max_workers <= 1 or len(chain_keys) <= 1:
+        results = [_verify_single_chain(key) for key in chain_keys]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_verify_chain_worker, chain_keys))
+
+    broken = []
+    for chain_broken in results:
+        broken.extend(chain_broken)
     return broken
 
 
@@ -649,58 +901,35 @@ def get_audit_trail(
     *,
     model_name: str,
     object_id: Any,
-    limit: int = 100,
-):
-    return (
+    limit: Optional[int] = 100,
+    include_archive: bool = True,
+) -> List[AuditLog]:
+    """
+    Newest-first audit trail of one object.
+
+    Hot rows are read first; archived months are only consulted
+    (newest first, via the sparse object index) when the hot table
+    does not fill the limit.
+    """
+    qs = (
         AuditLog.objects
         .filter(
             model_name=model_name,
             object_id=str(object_id),
         )
-        .order_by("-timestamp")[:limit]
-    )
-
-
-# ======================================================
-# EXPORT (BASIC – CSV / JSON)
-# ======================================================
-
-def export_audit_logs(start_date, end_date, format: str = "json"):
-    logs = AuditLog.objects.filter(
-        timestamp__gte=start_date,
-        timestamp__lte=end_date,
-    ).order_by("timestamp")
-
-    data = list(
-        logs.values(
-            "id",
-            "timestamp",
-            "action",
-            "model_name",
-            "object_id",
-            "user__email",
-            "branch__name",
-            "device_id",
-            "ip_address",
-            "record_hash",
-        )
+        .order_by("-timestamp")
     )
+    logs = list(qs[:limit] if limit is not None else qs)
 
-    if format == "csv":
-        import csv
-        from io import StringIO
-
-        output = StringIO()
-        writer = csv.DictWriter(
-            output,
-            fieldnames=data[0].keys() if data else [],
-        )
-        writer.writeheader()
-        writer.writerows(data)
-        return output.getvalue()
+    if include_archive and (limit is None or len(logs) < limit):
+        from apps.audit.archive import get_archived_trail
 
-    return json.dumps(data, indent=2, default=str)
+        for log in get_archived_trail(model_name, object_id):
+            if limit is not None and len(logs) >= limit:
+                break
+            logs.append(log)
 
+    return logs
 
 
 # ==========================
@@ -724,21 +953,9 @@ def validate_record_hash(audit_log) -> bool:
     Recomputes hash and compares with stored value.
     """
 
-    payload = {
-        "timestamp": audit_log.timestamp.isoformat(),
-        "branch_id": audit_log.branch_id,
-        "user_id": audit_log.user_id,
-        "action": audit_log.action,
-        "model": audit_log.model_name,
-        "object_id": audit_log.object_id,
-        "before": audit_log.before,
-        "after": audit_log.after,
-        "metadata": audit_log.metadata if hasattr(audit_log, "metadata") else {},
-    }
-
-    expected_hash = compute_hash(
+    expected_hash = compute_record_hash(
         audit_log.previous_hash,
-        payload,
+        audit_log.hash_payload(),
     )
 
     return expected_hash == audit_log.record_hash
\ No newline at end of file
@@ -165,7 +165,10 @@ from rest_framework.routers import DefaultRouter
 from apps.audit.views.base import AuditLogViewSet
 from apps.audit.views.trail import ObjectAuditTrailView
 from apps.audit.views.stats import AuditStatsView
-from apps.audit.views.verify import AuditChainVerifyView
+from apps.audit.views.verify import (
+    AuditChainVerifyView,
+    AuditVerificationCheckpointView,
+)
 from apps.audit.views.export import AuditExportView
 from apps.audit.views.health import AuditHealthView
 from apps.audit.views.webhooks import audit_webhook
@@ -186,6 +189,11 @@ urlpatterns = [
     # Statistics & verification
     path("stats/", AuditStatsView.as_view(), name="audit-stats"),
     path("verify/", AuditChainVerifyView.as_view(), name="audit-verify"),
+    path(
+        "verify/checkpoints/",
+        AuditVerificationCheckpointView.as_view(),
+        name="audit-verify-checkpoints",
+    ),
 
     # Export
     path("export/", AuditExportView.as_view(), name="audit-export"),
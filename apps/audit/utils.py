@@ -112,8 +112,8 @@ def build_audit_context(request: Optional[HttpRequest]) -> Dict[str, Any]:
 
     return {
         "user": user if getattr(user, "is_authenticated", False) else None,
-        "branch": getattr(request, "branch", None)
-                  or getattr(user, "current_branch", None),
+        "branch": request.branch if getattr(request, "branch_id", None)
+                  else getattr(user, "current_branch", None),
         "device_id": get_device_id(request),
         "ip_address": get_client_ip(request),
         "start_time": getattr(request, "_audit_start_time", None) or now(),
@@ -0,0 +1,339 @@
+# apps/audit/verification.py
+"""
+Incremental, checkpointed audit chain verification.
+
+- Each successful run stores a signed checkpoint (last id + hash)
+- Later runs only verify records appended after the checkpoint
+- Large ranges are split into id segments, hashed in a process
+  pool and stitched together at the segment boundaries
+- Results are published as a per-chain health row that dashboards
+  read instead of verifying inline
+"""
+
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from apps.audit.models import (
+    AuditArchive, AuditChainHead, AuditChainHealth, AuditLog, AuditVerificationCheckpoint,
+)
+from apps.audit.services import compute_record_hash, list_chain_keys
+
+
+CHECKPOINT_SALT = "apps.audit.verification.checkpoint"
+
+DEFAULT_SEGMENT_SIZE = 50_000
+
+
+# ======================================================
+# CHECKPOINT SIGNING
+# ======================================================
+
+def sign_checkpoint(chain_key: str, last_log_id: int, last_hash: str) -> str:
+    value = f"{chain_key}:{last_log_id}:{last_hash}"
+    return salted_hmac(CHECKPOINT_SALT, value, algorithm="sha256").hexdigest()
+
+
+def is_checkpoint_valid(checkpoint: AuditVerificationCheckpoint) -> bool:
+    """
+    Signature matches and the anchored record still carries the hash.
+    """
+    expected = sign_checkpoint(
+        checkpoint.chain_key,
+        checkpoint.last_log_id,
+        checkpoint.last_hash,
+    )
+    if not constant_time_compare(expected, checkpoint.signature):
+        return False
+
+    return AuditLog.objects.filter(
+        id=checkpoint.last_log_id,
+        chain_key=checkpoint.chain_key,
+        record_hash=checkpoint.last_hash,
+    ).exists()
+
+
+def latest_checkpoint(chain_key: str) -> Optional[AuditVerificationCheckpoint]:
+    return (
+        AuditVerificationCheckpoint.objects
+        .filter(chain_key=chain_key)
+        .order_by("-last_log_id", "-id")
+        .first()
+    )
+
+
+# ======================================================
+# SEGMENT VERIFICATION (POOL WORKERS)
+# ======================================================
+
+def _init_worker():
+    # Needed under the "spawn" start method; a no-op once apps are loaded
+    django.setup()
+
+
+def verify_segment(chain_key: str, lo_id: int, hi_id: int) -> Dict[str, Any]:
+    """
+    Verify records of one chain with lo_id <= id <= hi_id.
+
+    The first record's previous_hash is taken as-is; the caller
+    checks it against the preceding segment when stitching.
+    """
+    broken = []
+    count = 0
+    first_previous = None
+    first_id = None
+    previous_hash = None
+    last_id = None
+
+    logs = (
+        AuditLog.objects
+        .filter(chain_key=chain_key, id__gte=lo_id, id__lte=hi_id)
+        .order_by("id")
+        .iterator(chunk_size=2000)
+    )
+
+    for log in logs:
+        if previous_hash is None:
+            first_previous = log.previous_hash
+            first_id = log.id
+            previous_hash = log.previous_hash
+
+        expected_hash = compute_record_hash(previous_hash, log.hash_payload())
+
+        if (
+            log.previous_hash != previous_hash
+            or log.record_hash != expected_hash
+        ):
+            broken.append({
+                "chain_key": chain_key,
+                "log_id": log.id,
+                "expected_previous": previous_hash,
+                "actual_previous": log.previous_hash,
+                "expected_hash": expected_hash,
+                "actual_hash": log.record_hash,
+                "timestamp": log.timestamp,
+            })
+
+        previous_hash = log.record_hash
+        last_id = log.id
+        count += 1
+
+    return {
+        "count": count,
+        "first_id": first_id,
+        "first_previous": first_previous,
+        "last_id": last_id,
+        "last_hash": previous_hash,
+        "broken": broken,
+    }
+
+
+def _verify_segment_worker(args) -> Dict[str, Any]:
+    try:
+        return verify_segment(*args)
+    finally:
+        connections.close_all()
+
+
+def _split_segments(lo_id: int, hi_id: int, parts: int) -> List[tuple]:
+    step = max(1, math.ceil((hi_id - lo_id + 1) / parts))
+    return [
+        (start, min(start + step - 1, hi_id))
+        for start in range(lo_id, hi_id + 1, step)
+    ]
+
+
+# ======================================================
+# INCREMENTAL VERIFICATION
+# ======================================================
+
+def verify_chain_incremental(
+    chain_key: str,
+    *,
+    full: bool = False,
+    workers: int = 1,
+    segment_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Verify one chain from its latest valid checkpoint onwards.
+
+    full=True ignores checkpoints. With workers > 1 the pending range
+    is verified by a process pool, one id segment per task.
+    A new signed checkpoint is stored when no broken links are found.
+    """
+    started = time.monotonic()
+    segment_size = segment_size or getattr(
+        settings, "AUDIT_VERIFY_SEGMENT_SIZE", DEFAULT_SEGMENT_SIZE
+    )
+
+    # Archived records are verified with the archive itself
+    start_id, start_hash = AuditArchive.chain_tail(chain_key)
+
+    checkpoint = None
+    checkpoint_rejected = False
+    if not full:
+        checkpoint = latest_checkpoint(chain_key)
+        if checkpoint is not None and checkpoint.last_log_id <= start_id:
+            checkpoint = None
+        elif checkpoint is not None and not is_checkpoint_valid(checkpoint):
+            checkpoint = None
+            checkpoint_rejected = True
+
+    if checkpoint is not None:
+        start_id = checkpoint.last_log_id
+        start_hash = checkpoint.last_hash
+
+    pending = AuditLog.objects.filter(chain_key=chain_key, id__gt=start_id)
+    bounds = pending.aggregate(lo=Min("id"), hi=Max("id"), total=Count("id"))
+
+    segments: List[Dict[str, Any]] = []
+    if bounds["total"]:
+        parts = max(1, math.ceil(bounds["total"] / segment_size))
+        ranges = _split_segments(bounds["lo"], bounds["hi"], parts)
+        tasks = [(chain_key, lo, hi) for lo, hi in ranges]
+
+        if workers > 1 and len(tasks) > 1:
+            # Children must not share the parent's DB sockets
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(
+                    getattr(settings, "AUDIT_VERIFY_START_METHOD", None)
+                ),
+                initializer=_init_worker,
+            ) as pool:
+                segments = list(pool.map(_verify_segment_worker, tasks))
+        else:
+            segments = [verify_segment(*task) for task in tasks]
+
+    # Stitch segments: each must continue from the previous one
+    broken: List[Dict[str, Any]] = []
+    previous_hash = start_hash
+    last_id = start_id
+    verified = 0
+
+    for segment in segments:
+        if not segment["count"]:
+            continue
+
+        if segment["first_previous"] != previous_hash:
+            broken.append({
+                "chain_key": chain_key,
+                "log_id": segment["first_id"],
+                "expected_previous": previous_hash,
+                "actual_previous": segment["first_previous"],
+                "expected_hash": None,
+                "actual_hash": None,
+                "timestamp": None,
+            })
+
+        broken.extend(segment["broken"])
+        previous_hash = segment["last_hash"]
+        last_id = segment["last_id"]
+        verified += segment["count"]
+
+    duration = timedelta(seconds=time.monotonic() - started)
+
+    new_checkpoint = None
+    if not broken and verified:
+        new_checkpoint = AuditVerificationCheckpoint.objects.create(
+            chain_key=chain_key,
+            last_log_id=last_id,
+            last_hash=previous_hash,
+            records_verified=verified,
+            duration=duration,
+            signature=sign_checkpoint(chain_key, last_id, previous_hash),
+        )
+
+    seconds = duration.total_seconds()
+    return {
+        "chain_key": chain_key,
+        "verified": not broken,
+        "from_log_id": start_id,
+        "to_log_id": last_id,
+        "records_verified": verified,
+        "segments": len(segments),
+        "broken_links": broken,
+        "checkpoint_rejected": checkpoint_rejected,
+        "checkpoint_id": new_checkpoint.id if new_checkpoint else None,
+        "duration_seconds": seconds,
+        "records_per_second": verified / seconds if seconds else None,
+    }
+
+
+def verify_all_chains_incremental(
+    *,
+    full: bool = False,
+    workers: int = 1,
+    segment_size: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    return [
+        verify_chain_incremental(
+            chain_key,
+            full=full,
+            workers=workers,
+            segment_size=segment_size,
+        )
+        for chain_key in list_chain_keys()
+    ]
+
+
+# ======================================================
+# PUBLISHED CHAIN HEALTH
+# ======================================================
+
+def publish_chain_health(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Store verification results as the chains' health rows.
+    Chains not in results keep their last published state; the legacy
+    chain is never published.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        for result in results:
+            if result["chain_key"] == AuditChainHead.LEGACY_CHAIN_KEY:
+                continue
+            AuditChainHealth.objects.update_or_create(
+                chain_key=result["chain_key"],
+                defaults={
+                    "verified": result["verified"],
+                    "broken_links_count": len(result["broken_links"]),
+                    "to_log_id": result["to_log_id"],
+                    "checked_at": now,
+                },
+            )
+    return get_chain_health()
+
+
+def get_chain_health() -> Optional[Dict[str, Any]]:
+    """
+    Last published chain-health status, or None if no verifier has
+    run yet. Never verifies anything itself.
+    """
+    chains = {
+        row["chain_key"]: row
+        for row in AuditChainHealth.objects.values(
+            "chain_key", "verified", "broken_links_count", "to_log_id", "checked_at"
+        )
+    }
+    if not chains:
+        return None
+    return {
+        "verified": all(chain["verified"] for chain in chains.values()),
+        "broken_links_count": sum(chain["broken_links_count"] for chain in chains.values()),
+        "checked_at": max(chain["checked_at"] for chain in chains.values()),
+        "chains": {
+            chain_key: {key: value for key, value in chain.items() if key != "chain_key"}
+            for chain_key, chain in chains.items()
+        },
+    }
@@ -3,10 +3,10 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 
 from apps.audit.serializers import AuditExportSerializer
-from apps.audit.services import export_audit_logs
+from apps.audit.exporters import stream_audit_export
 from core.permissions import IsAdminUser
 
 
@@ -16,9 +16,18 @@ class AuditExportView(APIView):
     def post(self, request):
         serializer = AuditExportSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
 
-        content = export_audit_logs(**serializer.validated_data)
+        try:
+            stream, content_type, filename = stream_audit_export(
+                data["start_date"],
+                data["end_date"],
+                format=data["format"],
+                compress=data["compress"],
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
 
-        response = HttpResponse(content, content_type="application/octet-stream")
-        response["Content-Disposition"] = "attachment; filename=audit_export"
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
         return response
@@ -4,20 +4,28 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
-from django.db.models import Count, Avg, Max, Min
+from django.db.models import Max, Min, Q, Sum
+from django.db.models.functions import ExtractHour
 from datetime import timedelta
 
-from apps.audit.models import AuditLog
+from apps.accounts.models import User
+from apps.audit.models import AuditHourlyStat
+from apps.audit.rollup import hour_of
 from apps.audit.serializers import (
     AuditStatsSerializer,
     AuditSummarySerializer,
     AuditLogListSerializer,
 )
-from apps.audit.services import verify_chain
+from apps.audit.verification import get_chain_health
 from core.permissions import IsAuditor
 
 
 class AuditStatsView(APIView):
+    """
+    Audit statistics from the hourly rollup (AuditHourlyStat) and the
+    chain-health status published by the verifier; periods are
+    counted in whole hours.
+    """
     permission_classes = [IsAuthenticated, IsAuditor]
 
     def get(self, request):
@@ -25,38 +33,63 @@ class AuditStatsView(APIView):
         end = timezone.now()
         start = end - timedelta(days=days)
 
-        qs = AuditLog.objects.filter(timestamp__range=(start, end))
+        qs = AuditHourlyStat.objects.filter(hour__gte=hour_of(start), hour__lte=end)
+        today = timezone.localtime(end).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        totals = qs.aggregate(
+            total=Sum("count"),
+            today=Sum("count", filter=Q(hour__gte=hour_of(today))),
+            week=Sum("count", filter=Q(hour__gte=hour_of(end - timedelta(days=7)))),
+            month=Sum("count", filter=Q(hour__gte=hour_of(end - timedelta(days=30)))),
+            timed=Sum("duration_count"),
+            duration_total=Sum("duration_total"),
+            duration_max=Max("duration_max"),
+            duration_min=Min("duration_min"),
+        )
+
+        by_user = list(
+            qs.values("user_pk")
+            .annotate(count=Sum("count"))
+            .order_by("-count")[:10]
+        )
+        emails = dict(
+            User.objects.filter(pk__in=[row["user_pk"] for row in by_user])
+            .values_list("pk", "email")
+        )
+
+        by_hour = {str(h): 0 for h in range(24)}
+        for hour, count in (
+            qs.annotate(hour_of_day=ExtractHour("hour"))
+            .values_list("hour_of_day")
+            .annotate(total=Sum("count"))
+            .order_by()
+        ):
+            by_hour[str(hour)] = count
+
+        health = get_chain_health()
 
         stats = {
             "period_start": start,
             "period_end": end,
-            "total_logs": qs.count(),
-            "logs_today": qs.filter(timestamp__date=end.date()).count(),
-            "logs_this_week": qs.filter(timestamp__gte=end - timedelta(days=7)).count(),
-            "logs_this_month": qs.filter(timestamp__gte=end - timedelta(days=30)).count(),
-            "by_action": dict(qs.values_list("action").annotate(Count("id"))),
-            "by_model": dict(qs.values_list("model_name").annotate(Count("id"))),
-            "by_user": list(
-                qs.values("user__email")
-                .annotate(count=Count("id"))
-                .order_by("-count")[:10]
+            "total_logs": totals["total"] or 0,
+            "logs_today": totals["today"] or 0,
+            "logs_this_week": totals["week"] or 0,
+            "logs_this_month": totals["month"] or 0,
+            "by_action": dict(qs.values_list("action").annotate(Sum("count")).order_by()),
+            "by_model": dict(qs.values_list("model_name").annotate(Sum("count")).order_by()),
+            "by_user": [
+                {"user__email": emails.get(row["user_pk"]), "count": row["count"]}
+                for row in by_user
+            ],
+            "by_hour": by_hour,
+            "chain_verified": health["verified"] if health else None,
+            "broken_links_count": health["broken_links_count"] if health else None,
+            "chain_checked_at": health["checked_at"] if health else None,
+            "avg_duration_seconds": (
+                totals["duration_total"] / totals["timed"] if totals["timed"] else 0
             ),
-            "by_hour": {
-                str(h): qs.filter(timestamp__hour=h).count()
-                for h in range(24)
-            },
-            "chain_verified": not verify_chain(),
-            "broken_links_count": len(verify_chain()),
+            "max_duration_seconds": totals["duration_max"] or 0,
+            "min_duration_seconds": totals["duration_min"] or 0,
         }
 
-        durations = qs.aggregate(
-            avg=Avg("duration"), max=Max("duration"), min=Min("duration")
-        )
-
-        stats.update({
-            "avg_duration_seconds": durations["avg"].total_seconds() if durations["avg"] else 0,
-            "max_duration_seconds": durations["max"].total_seconds() if durations["max"] else 0,
-            "min_duration_seconds": durations["min"].total_seconds() if durations["min"] else 0,
-        })
-
         return Response(AuditStatsSerializer(stats).data)
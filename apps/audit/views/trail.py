@@ -4,29 +4,31 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.audit.models import AuditLog
 from apps.audit.serializers import AuditTrailSerializer
+from apps.audit.services import get_audit_trail
 from core.permissions import IsAuditor
 
 class ObjectAuditTrailView(APIView):
     permission_classes = [IsAuthenticated, IsAuditor]
 
     def get(self, request, model_name, object_id):
-        qs = AuditLog.objects.filter(
+        # Includes records already rolled over into cold archives
+        logs = get_audit_trail(
             model_name=model_name,
-            object_id=str(object_id),
-        ).order_by("-timestamp")
+            object_id=object_id,
+            limit=None,
+        )
 
-        if not qs.exists():
+        if not logs:
             return Response({"detail": "No audit trail found"}, status=404)
 
         data = {
             "object_id": object_id,
             "model_name": model_name,
-            "total_logs": qs.count(),
-            "first_log": qs.last().timestamp,
-            "last_log": qs.first().timestamp,
-            "logs": qs,
+            "total_logs": len(logs),
+            "first_log": logs[-1].timestamp,
+            "last_log": logs[0].timestamp,
+            "logs": logs,
         }
 
         return Response(AuditTrailSerializer(data).data)
@@ -6,22 +6,37 @@ from rest_framework.response import Response
 from django.utils import timezone
 
 from apps.audit.models import AuditLog
-from apps.audit.services import verify_chain
-from apps.audit.serializers import ChainVerificationSerializer
+from apps.audit.services import verify_chain, list_chain_keys
+from apps.audit.serializers import (
+    ChainVerificationSerializer,
+    IncrementalVerificationSerializer,
+    VerificationCheckpointSerializer,
+)
+from apps.audit.verification import (
+    latest_checkpoint,
+    publish_chain_health,
+    verify_all_chains_incremental,
+    verify_chain_incremental,
+)
 from core.permissions import IsAuditor
 
 class AuditChainVerifyView(APIView):
     permission_classes = [IsAuthenticated, IsAuditor]
 
     def get(self, request):
-        broken = verify_chain()
+        chain_key = request.query_params.get("chain_key")
+        broken = verify_chain(chain_key=chain_key)
 
-        first = AuditLog.objects.order_by("id").first()
-        last = AuditLog.objects.order_by("-id").first()
+        qs = AuditLog.objects.all()
+        if chain_key is not None:
+            qs = qs.filter(chain_key=chain_key)
+
+        first = qs.order_by("id").first()
+        last = qs.order_by("-id").first()
 
         data = {
             "verified": not broken,
-            "total_records": AuditLog.objects.count(),
+            "total_records": qs.count(),
             "broken_links": broken,
             "first_record_hash": first.record_hash if first else None,
             "last_record_hash": last.record_hash if last else None,
@@ -29,3 +44,32 @@ class AuditChainVerifyView(APIView):
         }
 
         return Response(ChainVerificationSerializer(data).data)
+
+
+class AuditVerificationCheckpointView(APIView):
+    """
+    GET  -> latest verification checkpoint (and throughput) per chain
+    POST -> verify records appended since the last checkpoint
+    """
+    permission_classes = [IsAuthenticated, IsAuditor]
+
+    def get(self, request):
+        checkpoints = [
+            checkpoint
+            for checkpoint in (
+                latest_checkpoint(chain_key) for chain_key in list_chain_keys()
+            )
+            if checkpoint is not None
+        ]
+        return Response(VerificationCheckpointSerializer(checkpoints, many=True).data)
+
+    def post(self, request):
+        chain_key = request.data.get("chain_key")
+
+        if chain_key:
+            results = [verify_chain_incremental(chain_key)]
+        else:
+            results = verify_all_chains_incremental()
+        publish_chain_health(results)
+
+        return Response(IncrementalVerificationSerializer(results, many=True).data)
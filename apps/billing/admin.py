@@ -476,7 +476,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Min, Max
 from .models import Invoice, InvoiceItem, DiscountPolicy, AppliedDiscount
 
 
@@ -524,24 +524,56 @@ class StatusFilter(admin.SimpleListFilter):
 # ===========================================
 # CUSTOM ACTIONS
 # ===========================================
+def _rollup_days(queryset):
+    """
+    (branch_id, first date, last date) of the invoices in queryset.
+    """
+    if queryset.model is not Invoice:
+        return []
+    return list(
+        queryset.order_by()
+        .values('branch_id')
+        .annotate(first=Min('invoice_date'), last=Max('invoice_date'))
+        .values_list('branch_id', 'first', 'last')
+    )
+
+
+def _rebuild_rollup(days):
+    """
+    queryset.update() skips the signals that keep BranchDailyFinancials
+    in sync, so recompute the affected days.
+    """
+    from apps.eod.rollup import rebuild_financials
+
+    for branch_id, first, last in days:
+        if branch_id and first:
+            rebuild_financials(first, last, branch=branch_id)
+
+
 @admin.action(description='Mark selected invoices as paid')
 def mark_as_paid(modeladmin, request, queryset):
+    days = _rollup_days(queryset)
     updated = queryset.filter(status__in=['DRAFT', 'ISSUED', 'UNPAID', 'PARTIALLY_PAID']).update(
         status='PAID',
         is_final=True
     )
+    _rebuild_rollup(days)
     modeladmin.message_user(request, f'{updated} invoices marked as paid.')
 
 
 @admin.action(description='Mark selected as active')
 def make_active(modeladmin, request, queryset):
+    days = _rollup_days(queryset)
     queryset.update(is_active=True)
+    _rebuild_rollup(days)
     modeladmin.message_user(request, f'{queryset.count()} items marked as active.')
 
 
 @admin.action(description='Mark selected as inactive')
 def make_inactive(modeladmin, request, queryset):
+    days = _rollup_days(queryset)
     queryset.update(is_active=False)
+    _rebuild_rollup(days)
     modeladmin.message_user(request, f'{queryset.count()} items marked as inactive.')
 
 
@@ -661,7 +661,7 @@
 
 
 #apps/billing/models.py (new)
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -671,10 +671,12 @@ import uuid
 from core.mixins.audit_fields import AuditFieldsMixin
 from core.mixins.soft_delete import SoftDeleteMixin
 from core.mixins.eod_lock import EODImmutableMixin
+from core.mixins.tracked_state import TrackedStateMixin
 from core import constants
+from core.counters import increment_bounded
 
 
-class Invoice(EODImmutableMixin, AuditFieldsMixin, SoftDeleteMixin, models.Model):
+class Invoice(EODImmutableMixin, AuditFieldsMixin, SoftDeleteMixin, TrackedStateMixin, models.Model):
     """Invoice for patient visit - IMMUTABLE after payment"""
     
     STATUS_CHOICES = [
@@ -888,6 +890,7 @@ class Invoice(EODImmutableMixin, AuditFieldsMixin, SoftDeleteMixin, models.Model
     def __str__(self):
         return f"Invoice {self.invoice_number}: {self.patient} - ₹{self.total_amount}"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         # Prevent mutation after lock (except initial create)
         if self.pk:
@@ -915,22 +918,14 @@ class Invoice(EODImmutableMixin, AuditFieldsMixin, SoftDeleteMixin, models.Model
     def _generate_invoice_number(self):
         """Generate INV-YYYYMM-XXXX format"""
         from datetime import datetime
-        from django.db.models import Count
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
-        today = datetime.now()
-        year_month = today.strftime('%Y%m')
+        year_month = datetime.now().strftime('%Y%m')
         
-        last_invoice = Invoice.objects.filter(
-            invoice_number__startswith=f'INV-{year_month}-'
-        ).order_by('invoice_number').last()
-        
-        if last_invoice:
-            last_num = int(last_invoice.invoice_number.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        
-        return f'INV-{year_month}-{new_num:04d}'
+        return next_document_number(
+            'INV', year_month,
+            seed=lambda: last_used_number(Invoice.objects, 'invoice_number', f'INV-{year_month}-'),
+        )
     
     def _calculate_due_date(self):
         """Calculate due date based on payment terms"""
@@ -1379,7 +1374,7 @@ class DiscountPolicy(AuditFieldsMixin, SoftDeleteMixin, models.Model):
         if self.valid_until and today > self.valid_until:
             return False, "Discount expired"
         
-        # Check usage limit
+        # Check usage limit (AppliedDiscount.save() enforces it atomically)
         if self.usage_limit and self.used_count >= self.usage_limit:
             return False, "Discount usage limit reached"
         
@@ -1458,9 +1453,15 @@ class AppliedDiscount(AuditFieldsMixin, models.Model):
         if self.invoice:
             self.invoice._assert_not_locked()
             
-        if not self.pk:  # New record
-            # Increment usage count
-            self.discount_policy.used_count += 1
-            self.discount_policy.save()
+        if self.pk:
+            super().save(*args, **kwargs)
+            return
+        
+        # New record: count the use atomically, only while under the usage limit
+        with transaction.atomic():
+            if not increment_bounded(DiscountPolicy, self.discount_policy_id, 'used_count', 'usage_limit'):
+                raise ValueError("Discount usage limit reached")
+            super().save(*args, **kwargs)
         
-        super().save(*args, **kwargs)
\ No newline at end of file
+        if AppliedDiscount.discount_policy.is_cached(self):
+            self.discount_policy.refresh_from_db(fields=['used_count'])
\ No newline at end of file
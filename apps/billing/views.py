@@ -11,7 +11,7 @@ from datetime import timedelta
 from core.permissions import (
     IsAuthenticatedAndActive, HasBranchAccess,
     IsCashier, IsReceptionist, IsDoctor,
-    IsClinicManager, IsSuperAdmin
+    IsClinicManager, IsSuperAdmin, STAFF_ROLES, has_role
 )
 from .models import Invoice, InvoiceItem, DiscountPolicy, AppliedDiscount
 from .serializers import (
@@ -136,16 +136,19 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         if discount_amount <= 0:
             return Response({'error': 'Discount amount is zero'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create applied discount
-        applied_discount = AppliedDiscount.objects.create(
-            invoice=invoice,
-            discount_policy=discount_policy,
-            discount_amount=discount_amount,
-            original_amount=invoice.subtotal,
-            approved_by=request.user if not discount_policy.requires_approval else None,
-            approved_at=timezone.now() if not discount_policy.requires_approval else None,
-            approval_notes=serializer.validated_data.get('notes', '')
-        )
+        # Create applied discount (counts the use against the usage limit)
+        try:
+            applied_discount = AppliedDiscount.objects.create(
+                invoice=invoice,
+                discount_policy=discount_policy,
+                discount_amount=discount_amount,
+                original_amount=invoice.subtotal,
+                approved_by=request.user if not discount_policy.requires_approval else None,
+                approved_at=timezone.now() if not discount_policy.requires_approval else None,
+                approval_notes=serializer.validated_data.get('notes', '')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         # Update invoice discount
         invoice.discount_amount += discount_amount
@@ -186,16 +189,66 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
+    # Summary filters the daily financial rollup can answer
+    ROLLUP_SUMMARY_PARAMS = {'branch', 'status', 'start_date', 'end_date'}
+    
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get billing summary statistics"""
         queryset = self.filter_queryset(self.get_queryset())
         
-        # Calculate statistics
-        total_invoices = queryset.count()
-        total_amount = queryset.aggregate(total=Sum('total_amount'))['total'] or 0
-        total_paid = queryset.aggregate(total=Sum('paid_amount'))['total'] or 0
-        total_balance = queryset.aggregate(total=Sum('balance_amount'))['total'] or 0
+        # The rollup covers whole branches: staff only, never a
+        # patient's own invoices
+        params = set(request.query_params) - {'format'}
+        if has_role(request, *STAFF_ROLES) and params <= self.ROLLUP_SUMMARY_PARAMS:
+            data = self._summary_from_rollup(request)
+        else:
+            data = self._summary_from_queryset(queryset)
+        
+        # Recent invoices
+        recent_invoices = queryset.order_by('-created_at')[:10]
+        data['recent_invoices'] = InvoiceSerializer(recent_invoices, many=True, context={'request': request}).data
+        
+        return Response(data)
+    
+    def _summary_from_rollup(self, request):
+        """Summary from BranchDailyFinancials - O(days), no invoice scan"""
+        from apps.eod.rollup import summarize_financials
+        
+        params = request.query_params
+        status_filter = params.get('status')
+        totals = summarize_financials(
+            params.get('start_date') if params.get('end_date') else None,
+            params.get('end_date') if params.get('start_date') else None,
+            branch=params.get('branch') or None,
+            invoice_statuses=[status_filter] if status_filter else None,
+        )
+        by_status = totals['by_status']
+        overdue = by_status.get('OVERDUE', {})
+        
+        return {
+            'total_invoices': totals['invoices_count'],
+            'total_amount': totals['invoices_amount'],
+            'total_paid': totals['invoices_paid'],
+            'total_balance': totals['invoices_balance'],
+            'overdue_invoices': overdue.get('count', 0),
+            'overdue_amount': overdue.get('balance', 0),
+            'status_breakdown': [
+                {'status': status, 'count': values['count'], 'amount': values['amount']}
+                for status, values in sorted(by_status.items())
+            ],
+        }
+    
+    def _summary_from_queryset(self, queryset):
+        """Summary for filters the rollup does not cover (patient, flags)"""
+        totals = queryset.aggregate(
+            total_invoices=Count('id'),
+            total_amount=Sum('total_amount'),
+            total_paid=Sum('paid_amount'),
+            total_balance=Sum('balance_amount'),
+            overdue_invoices=Count('id', filter=Q(status='OVERDUE')),
+            overdue_amount=Sum('balance_amount', filter=Q(status='OVERDUE')),
+        )
         
         # Status breakdown
         status_breakdown = queryset.values('status').annotate(
@@ -203,25 +256,15 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             amount=Sum('total_amount')
         ).order_by('status')
         
-        # Recent invoices
-        recent_invoices = queryset.order_by('-created_at')[:10]
-        
-        # Overdue invoices
-        overdue_invoices = queryset.filter(status='OVERDUE').count()
-        overdue_amount = queryset.filter(status='OVERDUE').aggregate(
-            total=Sum('balance_amount')
-        )['total'] or 0
-        
-        return Response({
-            'total_invoices': total_invoices,
-            'total_amount': total_amount,
-            'total_paid': total_paid,
-            'total_balance': total_balance,
-            'overdue_invoices': overdue_invoices,
-            'overdue_amount': overdue_amount,
-            'status_breakdown': status_breakdown,
-            'recent_invoices': InvoiceSerializer(recent_invoices, many=True, context={'request': request}).data
-        })
+        return {
+            'total_invoices': totals['total_invoices'],
+            'total_amount': totals['total_amount'] or 0,
+            'total_paid': totals['total_paid'] or 0,
+            'total_balance': totals['total_balance'] or 0,
+            'overdue_invoices': totals['overdue_invoices'],
+            'overdue_amount': totals['overdue_amount'] or 0,
+            'status_breakdown': list(status_breakdown),
+        }
 
 
 class InvoiceItemViewSet(viewsets.ModelViewSet):
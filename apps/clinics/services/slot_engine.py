@@ -0,0 +1,285 @@
+# apps/clinics/services/slot_engine.py
+"""
+Appointment slot engine.
+
+Availability for any set of doctors and dates is computed from a fixed
+number of queries:
+
+1. DoctorSchedule rows (working hours, break, slot length, capacity)
+2. approved DoctorLeave rows overlapping the date range
+3. booked Appointment intervals for the doctors and dates
+
+plus the cached branch holiday calendar (apps.settings_core.bundles).
+
+Times are handled as minutes since midnight. Each doctor-day's working
+window minus break and partial leaves becomes a sorted list of free
+intervals; slots are laid out inside them and the bookings overlapping
+each slot are counted with binary searches over the sorted booking
+starts / ends, against the schedule's max_patients_per_slot.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+BOOKED_STATUSES = ("SCHEDULED", "CONFIRMED")
+
+Interval = Tuple[int, int]
+
+
+# ======================================================
+# INTERVAL HELPERS
+# ======================================================
+
+def to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes: int) -> time:
+    minutes = min(minutes, 24 * 60 - 1)
+    return time(minutes // 60, minutes % 60)
+
+
+def subtract_intervals(windows: List[Interval], removed: Iterable[Interval]) -> List[Interval]:
+    """
+    Sorted, disjoint windows minus removed intervals (single sweep).
+    """
+    removed = sorted(interval for interval in removed if interval[0] < interval[1])
+    result = []
+    index = 0
+
+    for start, end in windows:
+        # Skip removals ending before this window
+        while index < len(removed) and removed[index][1] <= start:
+            index += 1
+
+        cursor = start
+        scan = index
+        while scan < len(removed) and removed[scan][0] < end:
+            cut_start, cut_end = removed[scan]
+            if cut_start > cursor:
+                result.append((cursor, cut_start))
+            cursor = max(cursor, cut_end)
+            scan += 1
+
+        if cursor < end:
+            result.append((cursor, end))
+
+    return result
+
+
+class BookingIndex:
+    """
+    Booked intervals of one doctor-day; counts overlaps in O(log n).
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals: Iterable[Interval]):
+        intervals = list(intervals)
+        self.starts = sorted(start for start, _ in intervals)
+        self.ends = sorted(end for _, end in intervals)
+
+    def overlapping(self, start: int, end: int) -> int:
+        # Bookings starting before the slot ends, minus those already over
+        return bisect_left(self.starts, end) - bisect_right(self.ends, start)
+
+
+def lay_out_slots(windows: List[Interval], duration: int, step: Optional[int] = None) -> List[Interval]:
+    step = step or duration
+    slots = []
+    for start, end in windows:
+        cursor = start
+        while cursor + duration <= end:
+            slots.append((cursor, cursor + duration))
+            cursor += step
+    return slots
+
+
+# ======================================================
+# DATA LOADING (FIXED NUMBER OF QUERIES)
+# ======================================================
+
+def _date_range(start_date: date, end_date: date) -> List[date]:
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+
+def _load(branch_id, start_date: date, end_date: date, doctor_ids):
+    from apps.doctors.models import DoctorLeave, DoctorSchedule
+    from apps.visits.models import Appointment
+
+    schedules = (
+        DoctorSchedule.objects
+        .filter(is_active=True, doctor__is_active=True)
+        .select_related("doctor__user")
+    )
+    if branch_id is not None:
+        schedules = schedules.filter(branch_id=branch_id)
+    if doctor_ids is not None:
+        schedules = schedules.filter(doctor_id__in=doctor_ids)
+    schedules = list(schedules)
+
+    doctor_ids = {schedule.doctor_id for schedule in schedules}
+    if not doctor_ids:
+        return schedules, {}, {}
+
+    leaves = defaultdict(list)
+    for leave in DoctorLeave.objects.filter(
+        doctor_id__in=doctor_ids,
+        status="APPROVED",
+        is_active=True,
+        start_date__lte=end_date,
+        end_date__gte=start_date,
+    ).only("doctor_id", "start_date", "end_date", "is_full_day", "start_time", "end_time"):
+        leaves[leave.doctor_id].append(leave)
+
+    # Bookings block the doctor whichever branch they are in
+    bookings = defaultdict(list)
+    for doctor_id, day, start, end in (
+        Appointment.objects
+        .filter(
+            doctor_id__in=doctor_ids,
+            appointment_date__range=(start_date, end_date),
+            status__in=BOOKED_STATUSES,
+        )
+        .values_list("doctor_id", "appointment_date", "start_time", "end_time")
+    ):
+        bookings[(doctor_id, day)].append((to_minutes(start), to_minutes(end)))
+
+    return schedules, leaves, bookings
+
+
+def _holiday_calendars(branch_ids) -> Dict[Any, Any]:
+    from apps.settings_core.bundles import get_bundle
+
+    return {branch_id: get_bundle(branch_id)["holidays"] for branch_id in branch_ids}
+
+
+# ======================================================
+# SLOT COMPUTATION
+# ======================================================
+
+def _free_windows(schedule, leaves, day: date) -> List[Interval]:
+    windows = [(to_minutes(schedule.start_time), to_minutes(schedule.end_time))]
+
+    removed = []
+    if schedule.break_start and schedule.break_end:
+        removed.append((to_minutes(schedule.break_start), to_minutes(schedule.break_end)))
+
+    for leave in leaves:
+        if not (leave.start_date <= day <= leave.end_date):
+            continue
+        if leave.is_full_day or not (leave.start_time and leave.end_time):
+            return []
+        removed.append((to_minutes(leave.start_time), to_minutes(leave.end_time)))
+
+    return subtract_intervals(windows, removed)
+
+
+def _day_slots(schedule, windows, index: BookingIndex, duration: Optional[int]):
+    length = duration or schedule.slot_duration
+    capacity = schedule.max_patients_per_slot
+
+    slots = []
+    for start, end in lay_out_slots(windows, length):
+        booked = index.overlapping(start, end)
+        slots.append({
+            "start_time": to_time(start),
+            "end_time": to_time(end),
+            "duration": length,
+            "capacity": capacity,
+            "booked": booked,
+            "remaining": max(capacity - booked, 0),
+            "is_available": booked < capacity,
+        })
+    return slots
+
+
+def get_availability_grid(
+    branch=None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    doctor_ids: Optional[Iterable[Any]] = None,
+    duration: Optional[int] = None,
+    include_full: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Slots per doctor and day for start_date..end_date (inclusive).
+
+    branch: Branch or id (None: every branch the doctors work in).
+    duration: slot length in minutes (default: the schedule's).
+    include_full: also list fully booked slots (is_available=False).
+
+    Returns one entry per doctor and branch:
+    {'doctor_id', 'doctor_name', 'branch_id', 'days': [{'date',
+    'is_holiday', 'total_slots', 'available_slots', 'slots'}]}
+    """
+    branch_id = getattr(branch, "pk", branch)
+    end_date = end_date or start_date
+    if doctor_ids is not None:
+        doctor_ids = list(doctor_ids)
+
+    schedules, leaves, bookings = _load(branch_id, start_date, end_date, doctor_ids)
+    calendars = _holiday_calendars({schedule.branch_id for schedule in schedules})
+
+    by_doctor: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    days = _date_range(start_date, end_date)
+
+    for schedule in sorted(schedules, key=lambda s: (s.doctor_id, s.branch_id)):
+        entry = by_doctor.setdefault((schedule.doctor_id, schedule.branch_id), {
+            "doctor_id": schedule.doctor_id,
+            "doctor_name": schedule.doctor.full_name,
+            "branch_id": schedule.branch_id,
+            "days": {},
+        })
+
+        for day in days:
+            if day.weekday() != schedule.day_of_week:
+                continue
+
+            is_holiday = calendars[schedule.branch_id].is_holiday(day)
+            slots = []
+            if not is_holiday:
+                windows = _free_windows(schedule, leaves.get(schedule.doctor_id, ()), day)
+                index = BookingIndex(bookings.get((schedule.doctor_id, day), ()))
+                slots = _day_slots(schedule, windows, index, duration)
+
+            available = [slot for slot in slots if slot["is_available"]]
+            entry["days"][day] = {
+                "date": day,
+                "is_holiday": is_holiday,
+                "total_slots": len(slots),
+                "available_slots": len(available),
+                "slots": slots if include_full else available,
+            }
+
+    grid = []
+    for entry in by_doctor.values():
+        entry["days"] = [entry["days"][day] for day in sorted(entry["days"])]
+        grid.append(entry)
+    return grid
+
+
+def get_doctor_slots(doctor, day: date, branch=None, duration: Optional[int] = None, include_full: bool = False) -> List[Dict[str, Any]]:
+    """
+    Slots of one doctor on one day (all branches unless branch given).
+    """
+    slots = []
+    for entry in get_availability_grid(
+        branch, day, day, doctor_ids=[getattr(doctor, "pk", doctor)],
+        duration=duration, include_full=include_full,
+    ):
+        for doctor_day in entry["days"]:
+            slots.extend(doctor_day["slots"])
+    return sorted(slots, key=lambda slot: slot["start_time"])
+
+
+def count_bookings_per_slot(bookings: Iterable[Tuple[time, time]], slots: Iterable[Interval]) -> List[int]:
+    """
+    Overlapping bookings for each (start, end) minute interval.
+    """
+    index = BookingIndex((to_minutes(start), to_minutes(end)) for start, end in bookings)
+    return [index.overlapping(start, end) for start, end in slots]
+
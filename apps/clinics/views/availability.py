@@ -9,7 +9,7 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from apps.clinics.models import Branch
-from apps.clinics.models.availability import DoctorAvailability
+from apps.clinics.services.availability_service import get_doctor_daily_availability
 from apps.visits.models import Appointment
 
 
@@ -33,21 +33,6 @@ def availability_cache_key(branch_id, date, mode, doctor_id=None):
     return f"availability:{branch_id}:{date}:{mode}:{doctor_id or 'all'}"
 
 
-def doctor_is_on_leave(doctor, date):
-    """
-    Safely check doctor leave without breaking if model missing.
-    """
-    try:
-        from apps.accounts.models import DoctorLeave
-        return DoctorLeave.objects.filter(
-            doctor=doctor,
-            start_date__lte=date,
-            end_date__gte=date,
-            is_active=True,
-        ).exists()
-    except Exception:
-        return False
-
 def calculate_branch_daily_capacity(branch: Branch) -> int:
     """
     Calculate max appointment slots per day for a branch.
@@ -65,23 +50,6 @@ def calculate_branch_daily_capacity(branch: Branch) -> int:
     return total_minutes // slot_duration
 
 
-def calculate_doctor_slots(availability, date):
-    """
-    Calculate all slots for a doctor on a specific date.
-    """
-    start = datetime.combine(date, availability.start_time)
-    end = datetime.combine(date, availability.end_time)
-
-    slots = []
-    duration = availability.slot_duration_minutes
-
-    while start + timedelta(minutes=duration) <= end:
-        slots.append(start.time())
-        start += timedelta(minutes=duration)
-
-    return slots
-
-
     # =========================
     #✅ BranchAvailabilityView
     # =========================
@@ -186,45 +154,7 @@ class BranchAvailabilityView(APIView):
         # ============================
         # MODE 2️⃣ Doctor availability
         # ============================
-        weekday = date.strftime("%a").lower()[:3]
-
-        availabilities = DoctorAvailability.objects.filter(
-            branch=branch,
-            day_of_week=weekday,
-            is_active=True,
-            deleted_at__isnull=True,
-        )
-
-        if doctor_id:
-            availabilities = availabilities.filter(doctor_id=doctor_id)
-
-        doctors = []
-
-        for availability in availabilities:
-            doctor = availability.doctor
-
-            # 🚫 Leave check
-            if doctor_is_on_leave(doctor, date):
-                continue
-
-            slots = calculate_doctor_slots(availability, date)
-
-            booked_slots = Appointment.objects.filter(
-                branch=branch,
-                doctor=doctor,
-                appointment_date=date,
-                status__in=["scheduled", "confirmed"],
-            ).values_list("appointment_time", flat=True)
-
-            free_slots = [s for s in slots if s not in booked_slots]
-
-            doctors.append({
-                "doctor_id": doctor.id,
-                "doctor_name": doctor.full_name,
-                "total_slots": len(slots),
-                "available_slots": len(free_slots),
-                "slots": free_slots,
-            })
+        doctors = get_doctor_daily_availability(branch, date, doctor_id)
 
         response = {
             "mode": "doctor",
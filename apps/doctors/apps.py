@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DoctorsConfig(AppConfig):
     name = 'apps.doctors'
     verbose_name = 'Doctor Management'
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,264 @@
+# apps/doctors/availability.py
+"""
+Bulk doctor availability.
+
+A doctor is available on a date when an active schedule exists for the
+weekday (at the branch, if one is given) and no approved leave covers
+the date. filter_available() applies this to a whole Doctor queryset
+as Exists subqueries, so a booking screen is one query however many
+doctors the branch has. Date ranges keep the doctors available on at
+least one day of the range.
+
+With DOCTOR_AVAILABILITY_MAP enabled, DoctorAvailabilityMap holds the
+same answer precomputed as one bit per day, per doctor, branch and
+month. rebuild_availability_map() (management command
+refresh_doctor_availability) fills DOCTOR_AVAILABILITY_MAP_MONTHS
+months from the current one; schedule / leave signals refresh the
+affected doctor after commit. Ranges outside the built months fall
+back to the Exists subqueries. The built months are read from the
+table and cached for DOCTOR_AVAILABILITY_COVERAGE_TIMEOUT seconds, so
+every process follows a rebuild made elsewhere.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, F, Max, Min, OuterRef, Q
+from django.utils import timezone
+
+from .models import DoctorAvailabilityMap, DoctorLeave, DoctorSchedule
+
+
+COVERAGE_KEY = "doctors:availability_map:coverage"
+
+DEFAULT_MAP_MONTHS = 3
+DEFAULT_COVERAGE_TIMEOUT = 60
+DEFAULT_MAX_RANGE_DAYS = 31
+
+
+def map_enabled() -> bool:
+    return getattr(settings, "DOCTOR_AVAILABILITY_MAP", False)
+
+
+# ======================================================
+# EXISTS SUBQUERIES
+# ======================================================
+
+def _active_schedules(branch_id=None):
+    schedules = DoctorSchedule.objects.filter(is_active=True)
+    if branch_id is not None:
+        schedules = schedules.filter(branch_id=branch_id)
+    return schedules
+
+
+def _approved_leaves():
+    return DoctorLeave.objects.filter(status='APPROVED', is_active=True)
+
+
+def available_on_condition(target_date: date, branch_id=None):
+    """
+    Filter expression: scheduled on the weekday and not on leave.
+    """
+    scheduled = Exists(
+        _active_schedules(branch_id).filter(
+            doctor=OuterRef('pk'),
+            day_of_week=target_date.weekday(),
+        )
+    )
+    on_leave = Exists(
+        _approved_leaves().filter(
+            doctor=OuterRef('pk'),
+            start_date__lte=target_date,
+            end_date__gte=target_date,
+        )
+    )
+    return scheduled & ~on_leave
+
+
+def _exists_condition(start: date, end: date, branch_id=None):
+    condition = Q()
+    for offset in range((end - start).days + 1):
+        condition |= Q(available_on_condition(start + timedelta(days=offset), branch_id))
+    return condition
+
+
+# ======================================================
+# PRECOMPUTED MAP
+# ======================================================
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _next_month(value: date) -> date:
+    return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _month_end(value: date) -> date:
+    return _next_month(value) - timedelta(days=1)
+
+
+def _months(start: date, end: date) -> List[date]:
+    months = []
+    current = _month_start(start)
+    while current <= end:
+        months.append(current)
+        current = _next_month(current)
+    return months
+
+
+def map_coverage() -> Optional[Tuple[date, date]]:
+    """
+    (first day, last day) covered by the map, or None if never built.
+    """
+    coverage = cache.get(COVERAGE_KEY)
+    if coverage is None:
+        bounds = DoctorAvailabilityMap.objects.aggregate(first=Min('month'), last=Max('month'))
+        if bounds['first'] is None:
+            return None
+        coverage = (bounds['first'], _month_end(bounds['last']))
+        cache.set(
+            COVERAGE_KEY,
+            coverage,
+            getattr(settings, "DOCTOR_AVAILABILITY_COVERAGE_TIMEOUT", DEFAULT_COVERAGE_TIMEOUT),
+        )
+    return tuple(coverage)
+
+
+def _map_condition(start: date, end: date, branch_id=None):
+    condition = Q()
+    for month in _months(start, end):
+        first = max(start, month)
+        last = min(end, _month_end(month))
+        # Bits first.day - 1 .. last.day - 1
+        mask = ((1 << last.day) - 1) ^ ((1 << (first.day - 1)) - 1)
+
+        maps = DoctorAvailabilityMap.objects.filter(doctor=OuterRef('pk'), month=month)
+        if branch_id is not None:
+            maps = maps.filter(branch_id=branch_id)
+        maps = maps.alias(hit=F('days').bitand(mask)).filter(hit__gt=0)
+        condition |= Q(Exists(maps))
+    return condition
+
+
+def compute_day_bits(
+    weekdays: Set[int],
+    leave_days: Set[int],
+    month: date,
+) -> int:
+    """
+    Availability bits of one month from scheduled weekdays and the
+    ordinals of leave days.
+    """
+    bits = 0
+    current = month
+    while current.month == month.month:
+        if current.weekday() in weekdays and current.toordinal() not in leave_days:
+            bits |= 1 << (current.day - 1)
+        current += timedelta(days=1)
+    return bits
+
+
+def refresh_availability_map(doctor_ids: Optional[Iterable[Any]] = None) -> int:
+    """
+    Recompute map rows of the given doctors (all if None) inside the
+    built coverage. Returns the number of rows written.
+    """
+    coverage = map_coverage()
+    if coverage is None:
+        return 0
+    return _refresh(*coverage, doctor_ids=doctor_ids)
+
+
+def _refresh(first: date, last: date, doctor_ids: Optional[Iterable[Any]] = None) -> int:
+    schedules = _active_schedules()
+    leaves = _approved_leaves().filter(start_date__lte=last, end_date__gte=first)
+    if doctor_ids is not None:
+        doctor_ids = list(doctor_ids)
+        schedules = schedules.filter(doctor_id__in=doctor_ids)
+        leaves = leaves.filter(doctor_id__in=doctor_ids)
+
+    weekdays: Dict[Tuple[Any, Any], Set[int]] = defaultdict(set)
+    for doctor_id, branch_id, day_of_week in schedules.values_list('doctor_id', 'branch_id', 'day_of_week'):
+        weekdays[(doctor_id, branch_id)].add(day_of_week)
+
+    leave_days: Dict[Any, Set[int]] = defaultdict(set)
+    for doctor_id, start_date, end_date in leaves.values_list('doctor_id', 'start_date', 'end_date'):
+        leave_days[doctor_id].update(
+            range(max(start_date, first).toordinal(), min(end_date, last).toordinal() + 1)
+        )
+
+    rows = []
+    for (doctor_id, branch_id), days in weekdays.items():
+        for month in _months(first, last):
+            bits = compute_day_bits(days, leave_days.get(doctor_id, set()), month)
+            if bits:
+                rows.append(DoctorAvailabilityMap(
+                    doctor_id=doctor_id, branch_id=branch_id, month=month, days=bits
+                ))
+
+    stale = DoctorAvailabilityMap.objects.filter(month__range=(first, last))
+    if doctor_ids is not None:
+        stale = stale.filter(doctor_id__in=doctor_ids)
+
+    with transaction.atomic():
+        stale.delete()
+        DoctorAvailabilityMap.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def rebuild_availability_map(months: Optional[int] = None, start: Optional[date] = None) -> int:
+    """
+    Rebuild the whole map for `months` months from the month of start
+    (default: today), dropping rows outside that window.
+    """
+    months = months or getattr(settings, "DOCTOR_AVAILABILITY_MAP_MONTHS", DEFAULT_MAP_MONTHS)
+    first = _month_start(start or timezone.localdate())
+    last = first
+    for _ in range(months - 1):
+        last = _next_month(last)
+    last = _month_end(last)
+
+    with transaction.atomic():
+        DoctorAvailabilityMap.objects.exclude(month__range=(first, last)).delete()
+        rows = _refresh(first, last)
+    cache.delete(COVERAGE_KEY)
+    return rows
+
+
+def schedule_refresh(doctor_id):
+    """
+    Refresh one doctor's map rows once the current transaction commits.
+    """
+    if map_enabled():
+        transaction.on_commit(lambda: refresh_availability_map([doctor_id]))
+
+
+# ======================================================
+# QUERYSET FILTER
+# ======================================================
+
+def filter_available(queryset, start: date, end: Optional[date] = None, branch_id=None):
+    """
+    Doctors of queryset available on at least one day of start..end
+    (inclusive) in one query. Raises ValueError for ranges longer
+    than DOCTOR_AVAILABILITY_MAX_DAYS.
+    """
+    end = end or start
+    if end < start:
+        raise ValueError("End date must not be before start date")
+
+    max_days = getattr(settings, "DOCTOR_AVAILABILITY_MAX_DAYS", DEFAULT_MAX_RANGE_DAYS)
+    if (end - start).days + 1 > max_days:
+        raise ValueError(f"Date range cannot exceed {max_days} days")
+
+    if map_enabled():
+        coverage = map_coverage()
+        if coverage is not None and coverage[0] <= start and end <= coverage[1]:
+            return queryset.filter(_map_condition(start, end, branch_id))
+
+    return queryset.filter(_exists_condition(start, end, branch_id))
@@ -0,0 +1,32 @@
+# apps/doctors/management/commands/refresh_doctor_availability.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.doctors.availability import rebuild_availability_map
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed doctor day-availability map (run daily to roll it forward)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=None,
+            help="Months to cover (default: DOCTOR_AVAILABILITY_MAP_MONTHS).",
+        )
+        parser.add_argument(
+            "--start",
+            type=date.fromisoformat,
+            default=None,
+            help="Any day of the first month (YYYY-MM-DD, default: today).",
+        )
+
+    def handle(self, *args, **options):
+        if options["months"] is not None and options["months"] < 1:
+            raise CommandError("--months must be at least 1")
+
+        rows = rebuild_availability_map(months=options["months"], start=options["start"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} doctor availability map rows"))
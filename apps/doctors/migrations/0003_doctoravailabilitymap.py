@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-17 06:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinics', '0003_counter_created_at_counter_created_by_and_more'),
+        ('doctors', '0002_alter_doctor_options_alter_doctorleave_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorAvailabilityMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('days', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='doctor_availability_maps', to='clinics.branch')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_maps', to='doctors.doctor')),
+            ],
+            options={
+                'verbose_name': 'Doctor Availability Map',
+                'verbose_name_plural': 'Doctor Availability Maps',
+                'db_table': 'doctor_availability_maps',
+                'ordering': ['month', 'doctor'],
+                'indexes': [models.Index(fields=['branch', 'month'], name='doctor_avai_branch__57b976_idx'), models.Index(fields=['month'], name='doctor_avai_month_4131b8_idx')],
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'branch', 'month'), name='unique_doctor_availability_map')],
+            },
+        ),
+    ]
@@ -154,7 +154,7 @@
 
 # apps/doctors/models.py
 
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from core.mixins.audit_fields import AuditFieldsMixin
@@ -272,23 +272,22 @@ class Doctor(AuditFieldsMixin, SoftDeleteMixin, models.Model):
         if self.years_of_experience > 100:
             raise ValidationError({'years_of_experience': 'Please enter a valid number of years.'})
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if not self.doctor_id:
             self.doctor_id = self._generate_doctor_id()
         super().save(*args, **kwargs)
     
     def _generate_doctor_id(self):
-        from django.db.models import Count
         from datetime import datetime
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
-        now = datetime.now()
-        year_month = now.strftime('%Y%m')
+        year_month = datetime.now().strftime('%Y%m')
         
-        current_month_count = Doctor.objects.filter(
-            doctor_id__startswith=f'DOC-{year_month}-'
-        ).count() + 1
-        
-        return f'DOC-{year_month}-{current_month_count:04d}'
+        return next_document_number(
+            'DOC', year_month,
+            seed=lambda: last_used_number(Doctor.objects, 'doctor_id', f'DOC-{year_month}-'),
+        )
     
     @property
     def full_name(self):
@@ -728,4 +727,47 @@ class DoctorLeave(AuditFieldsMixin, SoftDeleteMixin, models.Model):  # Added Sof
         if time and self.start_time and self.end_time:
             return self.start_time <= time <= self.end_time
         
-        return False
\ No newline at end of file
+        return False
+
+class DoctorAvailabilityMap(models.Model):
+    """
+    Precomputed day availability of a doctor at a branch for one month.
+
+    Bit n of days is set when the doctor is available on day n + 1: an
+    active schedule exists for the weekday and no approved leave covers
+    the date. Maintained from schedule / leave changes when
+    DOCTOR_AVAILABILITY_MAP is enabled (see apps.doctors.availability).
+    """
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        related_name='availability_maps'
+    )
+    branch = models.ForeignKey(
+        'clinics.Branch',
+        on_delete=models.CASCADE,
+        related_name='doctor_availability_maps'
+    )
+    month = models.DateField(help_text="First day of the month")
+    days = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'doctor_availability_maps'
+        ordering = ['month', 'doctor']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['doctor', 'branch', 'month'],
+                name='unique_doctor_availability_map'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['branch', 'month']),
+            models.Index(fields=['month']),
+        ]
+        verbose_name = 'Doctor Availability Map'
+        verbose_name_plural = 'Doctor Availability Maps'
+    
+    def __str__(self):
+        return f"{self.doctor} - {self.branch} - {self.month:%Y-%m}"
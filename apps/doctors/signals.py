@@ -0,0 +1,22 @@
+# apps/doctors/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.doctors.availability import schedule_refresh
+from apps.doctors.models import DoctorLeave, DoctorSchedule
+
+
+# ---------------------------------------------------------------------
+# AVAILABILITY MAP
+# ---------------------------------------------------------------------
+
+@receiver(post_save, sender=DoctorSchedule)
+@receiver(post_delete, sender=DoctorSchedule)
+@receiver(post_save, sender=DoctorLeave)
+@receiver(post_delete, sender=DoctorLeave)
+def refresh_doctor_availability(sender, instance, **kwargs):
+    """
+    Schedules and approved leaves decide day availability.
+    """
+    schedule_refresh(instance.doctor_id)
@@ -15,6 +15,7 @@ from core.permissions import (
     IsSuperAdmin, IsClinicManager, IsDoctor, 
     IsReceptionist, IsCashier
 )
+from .availability import filter_available
 from .models import Doctor, DoctorSchedule, DoctorLeave
 from .serializers import (
     DoctorListSerializer, DoctorDetailSerializer, DoctorCreateSerializer,
@@ -99,8 +100,9 @@ class DoctorViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def available(self, request):
-        """Get available doctors for appointment booking"""
-        date_str = request.query_params.get('date')
+        """Get available doctors for appointment booking (date or start/end range)"""
+        date_str = request.query_params.get('date') or request.query_params.get('start_date')
+        end_str = request.query_params.get('end_date')
         branch_id = request.query_params.get('branch')
         
         if not date_str:
@@ -111,6 +113,7 @@ class DoctorViewSet(viewsets.ModelViewSet):
         
         try:
             target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else None
         except ValueError:
             return Response(
                 {'error': 'Invalid date format. Use YYYY-MM-DD'},
@@ -129,36 +132,15 @@ class DoctorViewSet(viewsets.ModelViewSet):
                 Q(secondary_branches__id=branch_id)
             ).distinct()
         
-        # Filter doctors available on target date
-        available_doctors = []
-        for doctor in queryset:
-            if self._is_doctor_available(doctor, target_date):
-                available_doctors.append(doctor)
+        # Filter doctors available in the date range (single query)
+        try:
+            available_doctors = filter_available(queryset, target_date, end_date, branch_id or None)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         serializer = DoctorMinimalSerializer(available_doctors, many=True)
         return Response(serializer.data)
     
-    def _is_doctor_available(self, doctor, target_date):
-        """Check if doctor is available on specific date"""
-        # Check if doctor has schedule on this weekday
-        weekday = target_date.weekday()
-        has_schedule = doctor.schedules.filter(
-            day_of_week=weekday,
-            is_active=True
-        ).exists()
-        
-        if not has_schedule:
-            return False
-        
-        # Check if doctor is on leave
-        is_on_leave = doctor.leaves.filter(
-            start_date__lte=target_date,
-            end_date__gte=target_date,
-            status='APPROVED'
-        ).exists()
-        
-        return not is_on_leave
-    
     @action(detail=True, methods=['get'])
     def availability(self, request, pk=None):
         """Get doctor's availability for a date range"""
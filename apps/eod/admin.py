@@ -5,7 +5,7 @@ from django.urls import reverse
 from django.utils import timezone
 from django.contrib import messages
 
-from .models import EodLock, DailySummary, CashReconciliation, EodException
+from .models import EodLock, DailySummary, CashReconciliation, EodException, BranchDailyFinancials
 
 
 @admin.register(EodLock)
@@ -372,4 +372,19 @@ class EodExceptionAdmin(admin.ModelAdmin):
                 exception.severity = EodException.CRITICAL
             exception.save()
         self.message_user(request, f"{queryset.count()} exception(s) severity escalated.")
-    escalate_severity.short_description = "Escalate severity"
\ No newline at end of file
+    escalate_severity.short_description = "Escalate severity"
+
+
+@admin.register(BranchDailyFinancials)
+class BranchDailyFinancialsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'branch', 'payment_method', 'invoice_status',
+                   'invoice_count', 'invoice_amount', 'payment_count',
+                   'payment_amount', 'refund_count', 'refund_amount')
+    list_filter = ('branch', 'payment_method', 'invoice_status')
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
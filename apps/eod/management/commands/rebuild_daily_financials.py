@@ -0,0 +1,38 @@
+# apps/eod/management/commands/rebuild_daily_financials.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.clinics.models import Branch
+from apps.eod.rollup import rebuild_financials
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily branch financial rollup from invoices, payments and refunds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("start", type=date.fromisoformat, help="First day (YYYY-MM-DD).")
+        parser.add_argument("end", type=date.fromisoformat, help="Last day (YYYY-MM-DD).")
+        parser.add_argument(
+            "--branch",
+            type=int,
+            default=None,
+            help="Branch id (default: all branches).",
+        )
+
+    def handle(self, *args, **options):
+        if options["start"] > options["end"]:
+            raise CommandError("start must not be after end")
+
+        branch = None
+        if options["branch"] is not None:
+            try:
+                branch = Branch.objects.get(pk=options["branch"])
+            except Branch.DoesNotExist:
+                raise CommandError(f"Branch {options['branch']} does not exist")
+
+        rows = rebuild_financials(options["start"], options["end"], branch=branch)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {rows} rollup rows for {options['start']}..{options['end']}"
+        ))
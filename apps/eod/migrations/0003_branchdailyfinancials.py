@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-17 06:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinics', '0003_counter_created_at_counter_created_by_and_more'),
+        ('eod', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BranchDailyFinancials',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('payment_method', models.CharField(blank=True, default='', max_length=20)),
+                ('invoice_status', models.CharField(blank=True, default='', max_length=20)),
+                ('invoice_count', models.IntegerField(default=0)),
+                ('invoice_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoice_paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoice_balance_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('payment_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refund_count', models.IntegerField(default=0)),
+                ('refund_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_financials', to='clinics.branch')),
+            ],
+            options={
+                'verbose_name': 'Branch Daily Financials',
+                'verbose_name_plural': 'Branch Daily Financials',
+                'ordering': ['-date', 'branch'],
+                'indexes': [models.Index(fields=['branch', 'date'], name='eod_branchd_branch__fd4e13_idx'), models.Index(fields=['date'], name='eod_branchd_date_968f65_idx')],
+                'constraints': [models.UniqueConstraint(fields=('branch', 'date', 'payment_method', 'invoice_status'), name='unique_branch_daily_financials')],
+            },
+        ),
+    ]
@@ -1,6 +1,6 @@
 # apps/eod/models.py
 
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -210,6 +210,7 @@ class EodLock(BaseAppModel):
     def __str__(self):
         return f"EOD {self.lock_number} - {self.branch} - {self.lock_date}"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if not self.lock_number:
             self.lock_number = self.generate_lock_number()
@@ -221,103 +222,52 @@ class EodLock(BaseAppModel):
     
     def generate_lock_number(self):
         """Generate unique lock number: EOD-YYYYMMDD-XXX"""
+        from apps.settings_core.sequences import next_document_number
+        
         date_str = self.lock_date.strftime('%Y%m%d')
         branch_code = self.branch.code if self.branch.code else '000'
         
-        same_day_locks = EodLock.objects.filter(
-            lock_date=self.lock_date,
-            branch=self.branch
-        ).count()
-        
-        sequence = same_day_locks + 1
-        return f"EOD-{date_str}-{branch_code}-{sequence:03d}"
+        return next_document_number(
+            'EOD', f"{date_str}-{branch_code}", width=3,
+            seed=lambda: EodLock.objects.filter(
+                lock_date=self.lock_date,
+                branch=self.branch
+            ).count(),
+        )
     
     def calculate_totals(self):
-        """Calculate all financial totals for the day"""
-        from django.db.models import Sum, Count
-        from billing.models import Invoice
-        from payments.models import Payment, Refund
+        """Calculate all financial totals for the day (from the daily rollup)"""
+        from apps.eod.rollup import summarize_financials
         
-        # Invoice totals
-        invoices = Invoice.objects.filter(
-            branch=self.branch,
-            invoice_date=self.lock_date,
-            is_active=True
-        ).aggregate(
-            total_invoices=Count('id'),
-            total_amount=Sum('grand_total')
-        )
+        totals = summarize_financials(self.lock_date, self.lock_date, branch=self.branch)
         
-        self.total_invoices = invoices['total_invoices'] or 0
-        self.total_invoice_amount = invoices['total_amount'] or Decimal('0')
+        # Invoice totals
+        self.total_invoices = totals['invoices_count']
+        self.total_invoice_amount = totals['invoices_amount']
         
         # Payment totals
-        payments = Payment.objects.filter(
-            branch=self.branch,
-            payment_date__date=self.lock_date,
-            status=Payment.COMPLETED
-        ).aggregate(
-            total_payments=Count('id'),
-            total_amount=Sum('amount')
-        )
-        
-        self.total_payments = payments['total_payments'] or 0
-        self.total_payment_amount = payments['total_amount'] or Decimal('0')
+        self.total_payments = totals['payments_count']
+        self.total_payment_amount = totals['payments_amount']
         
         # Payment method breakdown
-        payment_methods = Payment.objects.filter(
-            branch=self.branch,
-            payment_date__date=self.lock_date,
-            status=Payment.COMPLETED
-        ).values('payment_method__code').annotate(
-            total=Sum('amount')
-        )
+        by_method = totals['by_method']
         
-        # Reset payment method totals
-        self.card_collections = Decimal('0')
-        self.upi_collections = Decimal('0')
-        self.bank_transfers = Decimal('0')
-        self.insurance_collections = Decimal('0')
-        self.cheque_collections = Decimal('0')
-        self.total_cash_collected = Decimal('0')
-        
-        for method in payment_methods:
-            total = method['total'] or Decimal('0')
-            code = method['payment_method__code']
-            
-            if code == 'CASH':
-                self.total_cash_collected = total
-            elif code == 'CARD':
-                self.card_collections = total
-            elif code == 'UPI':
-                self.upi_collections = total
-            elif code == 'BANK_TRANSFER':
-                self.bank_transfers = total
-            elif code == 'INSURANCE':
-                self.insurance_collections = total
-            elif code == 'CHEQUE':
-                self.cheque_collections = total
+        def collected(code):
+            return by_method.get(code, {}).get('payments_amount', Decimal('0'))
         
-        # Refund totals
-        refunds = Refund.objects.filter(
-            branch=self.branch,
-            requested_at__date=self.lock_date,
-            status__in=[Refund.COMPLETED]
-        ).aggregate(
-            total_refunds=Count('id'),
-            total_amount=Sum('amount')
-        )
+        self.total_cash_collected = collected('CASH')
+        self.card_collections = collected('CARD')
+        self.upi_collections = collected('UPI')
+        self.bank_transfers = collected('BANK_TRANSFER')
+        self.insurance_collections = collected('INSURANCE')
+        self.cheque_collections = collected('CHEQUE')
         
-        self.total_refunds = refunds['total_refunds'] or 0
-        self.total_refund_amount = refunds['total_amount'] or Decimal('0')
+        # Refund totals
+        self.total_refunds = totals['refunds_count']
+        self.total_refund_amount = totals['refunds_amount']
         
         # Cash refunds
-        cash_refunds = Refund.objects.filter(
-            branch=self.branch,
-            requested_at__date=self.lock_date,
-            status=Refund.COMPLETED,
-            refund_method=Refund.CASH
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+        cash_refunds = by_method.get('CASH', {}).get('refunds_amount', Decimal('0'))
         
         self.total_cash_refunded = cash_refunds
         
@@ -542,8 +492,7 @@ class DailySummary(BaseAppModel):
     def generate_summary(cls, branch, summary_type, period_start, period_end, generated_by, custom_name=''):
         """Generate a new daily summary with calculated data"""
         from django.db.models import Count, Sum, Q
-        from billing.models import Invoice
-        from payments.models import Payment, Refund
+        from apps.eod.rollup import summarize_financials, summarize_transactions, whole_days
         from visits.models import Appointment
         from patients.models import Patient
         from doctors.models import Doctor
@@ -559,39 +508,25 @@ class DailySummary(BaseAppModel):
             created_by=generated_by
         )
         
+        # Financials: whole-day EOD windows come from the daily
+        # rollup, every other window from the raw transactions
+        days = whole_days(period_start, period_end) if summary_type == cls.EOD else None
+        if days:
+            financials = summarize_financials(*days, branch=branch)
+        else:
+            financials = summarize_transactions(period_start, period_end, branch=branch)
+        
         # Invoice data
-        invoices = Invoice.objects.filter(
-            branch=branch,
-            invoice_date__date=summary.summary_date,
-            created_at__range=(period_start, period_end),
-            is_active=True
-        )
-        summary.invoices_count = invoices.count()
-        summary.invoices_amount = invoices.aggregate(
-            total=Sum('grand_total')
-        )['total'] or Decimal('0')
+        summary.invoices_count = financials['invoices_count']
+        summary.invoices_amount = financials['invoices_amount']
         
         # Payment data
-        payments = Payment.objects.filter(
-            branch=branch,
-            payment_date__range=(period_start, period_end),
-            status=Payment.COMPLETED
-        )
-        summary.payments_count = payments.count()
-        summary.payments_amount = payments.aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0')
+        summary.payments_count = financials['payments_count']
+        summary.payments_amount = financials['payments_amount']
         
         # Refund data
-        refunds = Refund.objects.filter(
-            branch=branch,
-            requested_at__range=(period_start, period_end),
-            status__in=[Refund.COMPLETED]
-        )
-        summary.refunds_count = refunds.count()
-        summary.refunds_amount = refunds.aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0')
+        summary.refunds_count = financials['refunds_count']
+        summary.refunds_amount = financials['refunds_amount']
         
         # Appointment data
         appointments = Appointment.objects.filter(
@@ -626,10 +561,24 @@ class DailySummary(BaseAppModel):
         summary.invoice_details = {
             'count': summary.invoices_count,
             'amount': str(summary.invoices_amount),
-            'by_type': list(invoices.values('invoice_type').annotate(
-                count=Count('id'),
-                amount=Sum('grand_total')
-            ))
+            'by_status': [
+                {'status': status, 'count': values['count'], 'amount': str(values['amount'])}
+                for status, values in financials['by_status'].items()
+            ]
+        }
+        summary.payment_details = {
+            'count': summary.payments_count,
+            'amount': str(summary.payments_amount),
+            'by_method': [
+                {
+                    'method': method,
+                    'count': values['payments_count'],
+                    'amount': str(values['payments_amount']),
+                    'refunds_count': values['refunds_count'],
+                    'refunds_amount': str(values['refunds_amount']),
+                }
+                for method, values in financials['by_method'].items()
+            ]
         }
         
         summary.save()
@@ -955,4 +904,58 @@ class EodException(BaseAppModel):
         self.resolution_notes = resolution_notes
         self.resolution_action = resolution_action
         self.status = self.RESOLVED
-        self.save()
\ No newline at end of file
+        self.save()
+
+
+class BranchDailyFinancials(models.Model):
+    """
+    Daily financial rollup per branch.
+
+    One row per (branch, date, payment method, invoice status); invoice
+    figures live on rows with an empty payment method, payment and refund
+    figures on rows with an empty invoice status. Maintained incrementally
+    from invoice/payment/refund saves (see apps.eod.rollup) and
+    rebuildable for any date range.
+    """
+    branch = models.ForeignKey(
+        'clinics.Branch',
+        on_delete=models.CASCADE,
+        related_name='daily_financials'
+    )
+    date = models.DateField()
+    payment_method = models.CharField(max_length=20, blank=True, default='')
+    invoice_status = models.CharField(max_length=20, blank=True, default='')
+    
+    # Invoices (by invoice date)
+    invoice_count = models.IntegerField(default=0)
+    invoice_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoice_paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoice_balance_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    # Completed payments (by payment date)
+    payment_count = models.IntegerField(default=0)
+    payment_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    # Completed refunds (by request date)
+    refund_count = models.IntegerField(default=0)
+    refund_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Branch Daily Financials"
+        verbose_name_plural = "Branch Daily Financials"
+        ordering = ['-date', 'branch']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['branch', 'date', 'payment_method', 'invoice_status'],
+                name='unique_branch_daily_financials'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['branch', 'date']),
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.branch} - {self.date} ({self.payment_method or '-'}/{self.invoice_status or '-'})"
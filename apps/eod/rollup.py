@@ -0,0 +1,393 @@
+# apps/eod/rollup.py
+"""
+Incremental daily financial rollup (BranchDailyFinancials).
+
+Every invoice / payment / refund contributes to one rollup row:
+
+- Invoice: (branch, invoice_date, '', status) while active
+- Payment: (branch, payment date, payment method, '') when COMPLETED
+- Refund:  (branch, request date, refund method, '') when COMPLETED
+
+On save the old contribution (from the tracked loaded values) is
+subtracted and the new one added with F() updates, so EOD, summaries
+and reports read O(days) rollup rows instead of raw transactions.
+rebuild_financials() recomputes any date range from scratch.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import BranchDailyFinancials
+
+
+INVOICE_METRICS = (
+    'invoice_count',
+    'invoice_amount',
+    'invoice_paid_amount',
+    'invoice_balance_amount',
+)
+PAYMENT_METRICS = ('payment_count', 'payment_amount')
+REFUND_METRICS = ('refund_count', 'refund_amount')
+METRICS = INVOICE_METRICS + PAYMENT_METRICS + REFUND_METRICS
+
+# (branch_id, date, payment_method, invoice_status)
+RollupKey = Tuple[Any, date, str, str]
+
+
+# ======================================================
+# CONTRIBUTIONS
+# ======================================================
+
+def _local_date(value):
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(value) if value is not None else Decimal('0')
+
+
+def invoice_contribution(values: Dict[str, Any]) -> Optional[Tuple[RollupKey, Dict[str, Any]]]:
+    if not values.get('is_active', True) or not values.get('branch_id') or not values.get('invoice_date'):
+        return None
+
+    key = (values['branch_id'], values['invoice_date'], '', values.get('status') or '')
+    return key, {
+        'invoice_count': 1,
+        'invoice_amount': _decimal(values.get('total_amount')),
+        'invoice_paid_amount': _decimal(values.get('paid_amount')),
+        'invoice_balance_amount': _decimal(values.get('balance_amount')),
+    }
+
+
+def payment_contribution(values: Dict[str, Any]) -> Optional[Tuple[RollupKey, Dict[str, Any]]]:
+    from apps.payments.models import Payment
+
+    if values.get('status') != Payment.COMPLETED or not values.get('branch_id'):
+        return None
+
+    key = (
+        values['branch_id'],
+        _local_date(values['payment_date']),
+        values.get('payment_method_id') or '',
+        '',
+    )
+    return key, {
+        'payment_count': 1,
+        'payment_amount': _decimal(values.get('amount')),
+    }
+
+
+def refund_contribution(values: Dict[str, Any]) -> Optional[Tuple[RollupKey, Dict[str, Any]]]:
+    from apps.payments.models import Refund
+
+    if values.get('status') != Refund.COMPLETED or not values.get('branch_id'):
+        return None
+
+    key = (
+        values['branch_id'],
+        _local_date(values['requested_at']),
+        values.get('refund_method') or '',
+        '',
+    )
+    return key, {
+        'refund_count': 1,
+        'refund_amount': _decimal(values.get('amount')),
+    }
+
+
+def contribution_for(model):
+    from apps.billing.models import Invoice
+    from apps.payments.models import Payment, Refund
+
+    return {
+        Invoice: invoice_contribution,
+        Payment: payment_contribution,
+        Refund: refund_contribution,
+    }.get(model)
+
+
+# ======================================================
+# INCREMENTAL UPDATES
+# ======================================================
+
+def _apply_delta(key: RollupKey, deltas: Dict[str, Any]):
+    branch_id, day, payment_method, invoice_status = key
+    filters = {
+        'branch_id': branch_id,
+        'date': day,
+        'payment_method': payment_method,
+        'invoice_status': invoice_status,
+    }
+    increments = {name: F(name) + value for name, value in deltas.items()}
+    increments['updated_at'] = timezone.now()
+
+    rows = BranchDailyFinancials.objects.filter(**filters)
+    if rows.update(**increments):
+        return
+
+    try:
+        with transaction.atomic():
+            BranchDailyFinancials.objects.create(**filters, **deltas)
+    except IntegrityError:
+        # Created concurrently
+        rows.update(**increments)
+
+
+def apply_change(contribution, old_values: Optional[Dict[str, Any]], new_values: Optional[Dict[str, Any]]):
+    """
+    Move one record's contribution from its old to its new state.
+    """
+    deltas: Dict[RollupKey, Dict[str, Any]] = defaultdict(lambda: defaultdict(int))
+
+    old = contribution(old_values) if old_values else None
+    new = contribution(new_values) if new_values else None
+
+    if old:
+        for name, value in old[1].items():
+            deltas[old[0]][name] -= value
+    if new:
+        for name, value in new[1].items():
+            deltas[new[0]][name] += value
+
+    for key, metrics in deltas.items():
+        metrics = {name: value for name, value in metrics.items() if value}
+        if metrics:
+            _apply_delta(key, metrics)
+
+
+# ======================================================
+# REBUILD
+# ======================================================
+
+def _collect(branch=None, *, invoices: Dict[str, Any], payments: Dict[str, Any], refunds: Dict[str, Any]) -> Dict[RollupKey, Dict[str, Any]]:
+    """
+    Aggregate raw transactions into rollup rows (three grouped queries).
+    """
+    from apps.billing.models import Invoice
+    from apps.payments.models import Payment, Refund
+
+    scope = {'branch': branch} if branch is not None else {}
+    rows: Dict[RollupKey, Dict[str, Any]] = defaultdict(dict)
+
+    invoice_rows = (
+        Invoice.objects
+        .filter(is_active=True, **scope, **invoices)
+        .values('branch_id', 'invoice_date', 'status')
+        .annotate(
+            invoice_count=Count('id'),
+            invoice_amount=Sum('total_amount'),
+            invoice_paid_amount=Sum('paid_amount'),
+            invoice_balance_amount=Sum('balance_amount'),
+        )
+        .order_by()
+    )
+    for row in invoice_rows:
+        key = (row['branch_id'], row['invoice_date'], '', row['status'])
+        rows[key].update({name: row[name] for name in INVOICE_METRICS})
+
+    payment_rows = (
+        Payment.objects
+        .filter(status=Payment.COMPLETED, **scope, **payments)
+        .annotate(day=TruncDate('payment_date'))
+        .values('branch_id', 'day', 'payment_method_id')
+        .annotate(payment_count=Count('id'), payment_amount=Sum('amount'))
+        .order_by()
+    )
+    for row in payment_rows:
+        key = (row['branch_id'], row['day'], row['payment_method_id'] or '', '')
+        rows[key].update({name: row[name] for name in PAYMENT_METRICS})
+
+    refund_rows = (
+        Refund.objects
+        .filter(status=Refund.COMPLETED, **scope, **refunds)
+        .annotate(day=TruncDate('requested_at'))
+        .values('branch_id', 'day', 'refund_method')
+        .annotate(refund_count=Count('id'), refund_amount=Sum('amount'))
+        .order_by()
+    )
+    for row in refund_rows:
+        key = (row['branch_id'], row['day'], row['refund_method'] or '', '')
+        rows[key].update({name: row[name] for name in REFUND_METRICS})
+
+    return rows
+
+
+@transaction.atomic
+def rebuild_financials(start_date: date, end_date: date, branch=None) -> int:
+    """
+    Recompute the rollup for start_date..end_date (inclusive).
+    Returns the number of rows written.
+    """
+    rows = _collect(
+        branch,
+        invoices={'invoice_date__range': (start_date, end_date)},
+        payments={'payment_date__date__range': (start_date, end_date)},
+        refunds={'requested_at__date__range': (start_date, end_date)},
+    )
+
+    existing = BranchDailyFinancials.objects.filter(date__range=(start_date, end_date))
+    if branch is not None:
+        existing = existing.filter(branch=branch)
+    existing.delete()
+
+    BranchDailyFinancials.objects.bulk_create(
+        [
+            BranchDailyFinancials(
+                branch_id=branch_id,
+                date=day,
+                payment_method=payment_method,
+                invoice_status=invoice_status,
+                **metrics,
+            )
+            for (branch_id, day, payment_method, invoice_status), metrics in rows.items()
+        ],
+        batch_size=1000,
+    )
+    return len(rows)
+
+
+# ======================================================
+# READ
+# ======================================================
+
+def _fold(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fold rollup-shaped rows into totals and method / status breakdowns.
+    """
+    summary = {
+        'invoices_count': 0,
+        'invoices_amount': Decimal('0'),
+        'invoices_paid': Decimal('0'),
+        'invoices_balance': Decimal('0'),
+        'payments_count': 0,
+        'payments_amount': Decimal('0'),
+        'refunds_count': 0,
+        'refunds_amount': Decimal('0'),
+        'by_method': {},
+        'by_status': {},
+    }
+
+    for row in rows:
+        if row.get('invoice_count'):
+            summary['invoices_count'] += row['invoice_count']
+            summary['invoices_amount'] += row['invoice_amount'] or 0
+            summary['invoices_paid'] += row['invoice_paid_amount'] or 0
+            summary['invoices_balance'] += row['invoice_balance_amount'] or 0
+
+            status = summary['by_status'].setdefault(row['invoice_status'], {
+                'count': 0,
+                'amount': Decimal('0'),
+                'paid': Decimal('0'),
+                'balance': Decimal('0'),
+            })
+            status['count'] += row['invoice_count']
+            status['amount'] += row['invoice_amount'] or 0
+            status['paid'] += row['invoice_paid_amount'] or 0
+            status['balance'] += row['invoice_balance_amount'] or 0
+
+        if row.get('payment_count') or row.get('refund_count'):
+            method = summary['by_method'].setdefault(row['payment_method'], {
+                'payments_count': 0,
+                'payments_amount': Decimal('0'),
+                'refunds_count': 0,
+                'refunds_amount': Decimal('0'),
+            })
+            if row.get('payment_count'):
+                summary['payments_count'] += row['payment_count']
+                summary['payments_amount'] += row['payment_amount'] or 0
+                method['payments_count'] += row['payment_count']
+                method['payments_amount'] += row['payment_amount'] or 0
+            if row.get('refund_count'):
+                summary['refunds_count'] += row['refund_count']
+                summary['refunds_amount'] += row['refund_amount'] or 0
+                method['refunds_count'] += row['refund_count']
+                method['refunds_amount'] += row['refund_amount'] or 0
+
+    return summary
+
+
+def financial_rows(start_date: Optional[date], end_date: Optional[date], branch=None, invoice_statuses=None):
+    rows = BranchDailyFinancials.objects.all()
+    if start_date is not None and end_date is not None:
+        rows = rows.filter(date__range=(start_date, end_date))
+    if branch is not None:
+        rows = rows.filter(branch=branch)
+    if invoice_statuses is not None:
+        rows = rows.filter(invoice_status__in=invoice_statuses)
+    return rows
+
+
+def summarize_financials(start_date: Optional[date], end_date: Optional[date], branch=None, invoice_statuses=None) -> Dict[str, Any]:
+    """
+    Totals for whole days, read from the rollup (one grouped query).
+    Without a date range all days are included.
+    """
+    rows = (
+        financial_rows(start_date, end_date, branch, invoice_statuses)
+        .values('payment_method', 'invoice_status')
+        .annotate(**{name: Sum(name) for name in METRICS})
+        .order_by()
+    )
+    return _fold(rows)
+
+
+def whole_days(period_start: datetime, period_end: datetime) -> Optional[Tuple[date, date]]:
+    """
+    (first, last) local dates when the window covers whole days (from
+    midnight to the end of a day or the next midnight), else None.
+    """
+    start = timezone.localtime(period_start) if timezone.is_aware(period_start) else period_start
+    end = timezone.localtime(period_end) if timezone.is_aware(period_end) else period_end
+    if start.time() != time.min:
+        return None
+    if end.time() == time.min and end > start:
+        last = end.date() - timedelta(days=1)
+    elif end.time() >= time(23, 59, 59):
+        last = end.date()
+    else:
+        return None
+    return (start.date(), last) if last >= start.date() else None
+
+
+def summarize_transactions(period_start: datetime, period_end: datetime, branch=None) -> Dict[str, Any]:
+    """
+    Same shape as summarize_financials() for intraday windows, which
+    the daily rollup cannot answer; aggregated from raw transactions.
+    """
+    rows = _collect(
+        branch,
+        invoices={'created_at__range': (period_start, period_end)},
+        payments={'payment_date__range': (period_start, period_end)},
+        refunds={'requested_at__range': (period_start, period_end)},
+    )
+    return _fold(
+        {
+            'payment_method': payment_method,
+            'invoice_status': invoice_status,
+            **metrics,
+        }
+        for (_, _, payment_method, invoice_status), metrics in rows.items()
+    )
+
+
+def daily_financials(start_date: date, end_date: date, branch=None, invoice_statuses=None) -> List[Dict[str, Any]]:
+    """
+    Per-day totals, ordered by date.
+    """
+    return list(
+        financial_rows(start_date, end_date, branch, invoice_statuses)
+        .values('date')
+        .annotate(**{name: Sum(name) for name in METRICS})
+        .order_by('date')
+    )
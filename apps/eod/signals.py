@@ -804,7 +804,10 @@ from django.core.exceptions import ValidationError
 import logging
 
 from .models import EodLock, DailySummary, CashReconciliation, EodException
+from .rollup import apply_change, contribution_for
 from apps.audit.services import log_action
+from apps.billing.models import Invoice
+from apps.payments.models import Payment, Refund
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -1303,6 +1306,43 @@ def eod_exception_post_save(sender, instance, created, **kwargs):
             logger.error(f"Failed to update EOD lock status: {str(e)}")
 
 
+# ===========================================
+# DAILY FINANCIAL ROLLUP SIGNALS
+# ===========================================
+
+@receiver(pre_save, sender=Invoice)
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Refund)
+def financial_rollup_pre_save(sender, instance, **kwargs):
+    """
+    Remember the stored state so post_save can move the contribution.
+    Untracked instances (not loaded from the DB) fall back to one query.
+    """
+    if instance._state.adding:
+        instance._rollup_previous = None
+    elif hasattr(instance, '_loaded_values'):
+        instance._rollup_previous = instance._loaded_values
+    else:
+        attnames = [field.attname for field in sender._meta.concrete_fields]
+        instance._rollup_previous = sender.objects.filter(pk=instance.pk).values(*attnames).first()
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Refund)
+def financial_rollup_post_save(sender, instance, created, **kwargs):
+    previous = instance.__dict__.pop('_rollup_previous', None)
+    apply_change(contribution_for(sender), previous, instance._current_field_values())
+
+
+@receiver(post_delete, sender=Invoice)
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=Refund)
+def financial_rollup_post_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_loaded_values', None) or instance._current_field_values()
+    apply_change(contribution_for(sender), previous, None)
+
+
 # ===========================================
 # NOTIFICATION FUNCTIONS
 # ===========================================
@@ -0,0 +1,619 @@
+# apps/notifications/dispatcher.py
+"""
+Notification dispatcher.
+
+Sends NotificationLog rows through pooled, per-provider transports:
+
+- SMTP: up to NOTIFICATION_SMTP_POOL_SIZE persistent sessions per
+  provider (connect / TLS / login once, NOOP-checked after idling,
+  reconnected when the server drops them)
+- SendGrid, Twilio, MSG91: one keep-alive requests.Session per provider
+- SendGrid messages with the same subject and body go out as one
+  request with up to 1000 personalizations (one per recipient); MSG91
+  messages with the same text as one request with many recipients
+
+Every provider has a token bucket limiting provider calls (SMTP
+messages or API requests) per second, NOTIFICATION_RATE_LIMITS by
+provider type, and batches run on a bounded thread pool
+(NOTIFICATION_DISPATCH_WORKERS). Transports are cached per provider
+and rebuilt when the provider row changes.
+
+drain_queue() is the worker loop body (management command
+dispatch_notifications): it claims due NotificationQueue entries,
+sends them and applies the retry backoff. Endpoints come from the
+provider rows (SMTP host / port, MSG91 endpoint_url) or from
+NOTIFICATION_SENDGRID_URL / NOTIFICATION_TWILIO_URL, so everything can
+be pointed at local stub servers.
+"""
+
+import logging
+import queue
+import smtplib
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .models import EmailProvider, NotificationLog, NotificationQueue, SMSProvider
+
+logger = logging.getLogger(__name__)
+
+
+SENDGRID_URL = "https://api.sendgrid.com/v3/mail/send"
+TWILIO_URL = "https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json"
+MSG91_URL = "https://api.msg91.com/api/v2/sendsms"
+
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+DEFAULT_WORKERS = 8
+DEFAULT_CHUNK_SIZE = 25
+DEFAULT_MSG91_BATCH = 100
+DEFAULT_SMTP_POOL_SIZE = 4
+DEFAULT_SMTP_IDLE_CHECK = 30
+DEFAULT_HTTP_POOL_SIZE = 16
+DEFAULT_TIMEOUT = 30
+DEFAULT_CLAIM_TIMEOUT = 10 * 60
+DEFAULT_RATE_LIMITS = {
+    "smtp": 10,
+    "sendgrid": 50,
+    "twilio": 50,
+    "msg91": 20,
+}
+
+
+class DispatchError(Exception):
+    """A provider call failed for a whole batch"""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ======================================================
+# RATE LIMITING
+# ======================================================
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` calls per second, bursts of up to
+    `rate` calls. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = float(rate or 0)
+        self.capacity = max(self.rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1):
+        """
+        Take tokens, sleeping until the bucket has refilled enough.
+        The tokens are reserved first, so waiting callers queue fairly.
+        """
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+def rate_limit_for(provider_type: str) -> float:
+    limits = {**DEFAULT_RATE_LIMITS, **_setting("NOTIFICATION_RATE_LIMITS", {})}
+    return limits.get(provider_type, 0)
+
+
+# ======================================================
+# TRANSPORTS
+# ======================================================
+
+class Transport:
+    """
+    Pooled connection to one provider. send() delivers a batch and
+    returns one error (or None when sent) per notification.
+    """
+
+    batch_size = DEFAULT_CHUNK_SIZE
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.version = provider.updated_at
+        self.limiter = TokenBucket(rate_limit_for(provider.provider_type))
+        self.timeout = _setting("NOTIFICATION_SEND_TIMEOUT", DEFAULT_TIMEOUT)
+
+    def batch_key(self, notification_log):
+        """Notifications with equal keys may share one provider call"""
+        return None
+
+    def send(self, logs: List[NotificationLog]) -> List[Optional[str]]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SMTPTransport(Transport):
+
+    def __init__(self, provider):
+        super().__init__(provider)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(_setting("NOTIFICATION_SMTP_POOL_SIZE", DEFAULT_SMTP_POOL_SIZE))
+        self._closed = False
+
+    def _connect(self):
+        provider = self.provider
+        if provider.use_ssl:
+            server = smtplib.SMTP_SSL(provider.host, provider.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(provider.host, provider.port, timeout=self.timeout)
+            if provider.use_tls:
+                server.starttls()
+        if provider.username and provider.password:
+            server.login(provider.username, provider.password)
+        return server
+
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            idle_check = _setting("NOTIFICATION_SMTP_IDLE_CHECK", DEFAULT_SMTP_IDLE_CHECK)
+            while True:
+                try:
+                    server, released_at = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - released_at < idle_check:
+                    return server
+                try:
+                    if server.noop()[0] == 250:
+                        return server
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._quit(server)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, server, healthy: bool):
+        if healthy and not self._closed:
+            self._idle.put((server, time.monotonic()))
+        elif server is not None:
+            self._quit(server)
+        self._slots.release()
+
+    def build_message(self, notification_log):
+        provider = self.provider
+        message = MIMEMultipart('alternative')
+        message['Subject'] = notification_log.subject or 'No Subject'
+        message['From'] = f"{provider.sender_name or 'Dental Clinic'} <{provider.sender_email}>"
+        message['To'] = notification_log.recipient_contact
+        message.attach(MIMEText(notification_log.message, 'plain'))
+        return message
+
+    def send(self, logs):
+        try:
+            server = self._acquire()
+        except (smtplib.SMTPException, OSError) as e:
+            raise DispatchError(f"SMTP error: {e}")
+
+        errors = []
+        healthy = True
+        try:
+            for notification_log in logs:
+                self.limiter.acquire()
+                message = self.build_message(notification_log)
+                try:
+                    try:
+                        server.send_message(message)
+                    except smtplib.SMTPServerDisconnected:
+                        # The server dropped the pooled session: reconnect once
+                        self._quit(server)
+                        server = None
+                        try:
+                            server = self._connect()
+                        except (smtplib.SMTPException, OSError) as e:
+                            # No session left: fail only the unsent rest
+                            healthy = False
+                            errors.extend([f"SMTP error: {e}"] * (len(logs) - len(errors)))
+                            break
+                        server.send_message(message)
+                    errors.append(None)
+                except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError) as e:
+                    healthy = False
+                    errors.extend([f"SMTP error: {e}"] * (len(logs) - len(errors)))
+                    break
+                except smtplib.SMTPException as e:
+                    # Refused recipient / message; the session stays usable
+                    errors.append(f"SMTP error: {e}")
+                except OSError as e:
+                    healthy = False
+                    errors.extend([f"SMTP error: {e}"] * (len(logs) - len(errors)))
+                    break
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self._release(server, healthy)
+        return errors
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(server)
+
+
+class HTTPTransport(Transport):
+    """Transport over one keep-alive requests.Session"""
+
+    def __init__(self, provider):
+        super().__init__(provider)
+        pool_size = _setting("NOTIFICATION_HTTP_POOL_SIZE", DEFAULT_HTTP_POOL_SIZE)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(self, url, **kwargs):
+        self.limiter.acquire()
+        return self.session.post(url, timeout=self.timeout, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class SendGridTransport(HTTPTransport):
+    batch_size = SENDGRID_MAX_PERSONALIZATIONS
+
+    def __init__(self, provider):
+        super().__init__(provider)
+        self.session.headers["Authorization"] = f"Bearer {provider.api_key}"
+
+    def batch_key(self, notification_log):
+        return (notification_log.subject or '', notification_log.message)
+
+    def send(self, logs):
+        provider = self.provider
+        sender = {"email": provider.sender_email}
+        if provider.sender_name:
+            sender["name"] = provider.sender_name
+
+        # One personalization per recipient keeps addresses private
+        payload = {
+            "personalizations": [{"to": [{"email": log.recipient_contact}]} for log in logs],
+            "from": sender,
+            "subject": logs[0].subject or '',
+            "content": [{"type": "text/html", "value": logs[0].message}],
+        }
+        try:
+            response = self.post(_setting("NOTIFICATION_SENDGRID_URL", SENDGRID_URL), json=payload)
+        except requests.RequestException as e:
+            raise DispatchError(f"SendGrid error: {e}")
+        if response.status_code != 202:
+            raise DispatchError(f"SendGrid API error: {response.status_code} {response.text[:200]}")
+        return [None] * len(logs)
+
+
+class TwilioTransport(HTTPTransport):
+
+    def __init__(self, provider):
+        super().__init__(provider)
+        self.session.auth = (provider.account_sid, provider.auth_token)
+        self.url = _setting("NOTIFICATION_TWILIO_URL", TWILIO_URL).format(sid=provider.account_sid)
+
+    def send(self, logs):
+        provider = self.provider
+        sender = provider.sender_id or provider.account_sid[:12]
+
+        errors = []
+        for notification_log in logs:
+            try:
+                response = self.post(self.url, data={
+                    "To": notification_log.recipient_contact,
+                    "From": sender,
+                    "Body": notification_log.message,
+                })
+            except requests.RequestException as e:
+                errors.append(f"Twilio error: {e}")
+                continue
+
+            if response.status_code >= 400:
+                try:
+                    detail = response.json().get("message") or response.text
+                except ValueError:
+                    detail = response.text
+                errors.append(f"Twilio error: {detail[:200]}")
+            else:
+                errors.append(None)
+        return errors
+
+
+class MSG91Transport(HTTPTransport):
+
+    def __init__(self, provider):
+        super().__init__(provider)
+        self.session.headers["authkey"] = provider.api_key or ''
+        self.batch_size = _setting("NOTIFICATION_MSG91_BATCH", DEFAULT_MSG91_BATCH)
+
+    def batch_key(self, notification_log):
+        return notification_log.message
+
+    def send(self, logs):
+        payload = {
+            "sender": self.provider.sender_id or "DENTAL",
+            "route": "4",
+            "country": "91",
+            "sms": [{
+                "message": logs[0].message,
+                "to": [log.recipient_contact for log in logs],
+            }],
+        }
+        try:
+            response = self.post(self.provider.endpoint_url or MSG91_URL, json=payload)
+        except requests.RequestException as e:
+            raise DispatchError(f"MSG91 error: {e}")
+        if response.status_code != 200:
+            raise DispatchError(f"MSG91 API error: {response.text[:200]}")
+        return [None] * len(logs)
+
+
+TRANSPORTS = {
+    "smtp": SMTPTransport,
+    "sendgrid": SendGridTransport,
+    "twilio": TwilioTransport,
+    "msg91": MSG91Transport,
+}
+
+PROVIDER_MODELS = {
+    "email": EmailProvider,
+    "sms": SMSProvider,
+}
+
+
+# ======================================================
+# DISPATCHER
+# ======================================================
+
+class NotificationDispatcher:
+    """
+    Sends notifications concurrently through cached transports.
+    One instance per process (see get_dispatcher()).
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or _setting("NOTIFICATION_DISPATCH_WORKERS", DEFAULT_WORKERS)
+        self._lock = threading.Lock()
+        self._transports: Dict[tuple, Transport] = {}
+        self._executor = None
+
+    def transport_for(self, provider) -> Transport:
+        key = (provider._meta.model_name, provider.pk)
+        with self._lock:
+            transport = self._transports.get(key)
+            if transport is not None and transport.version == provider.updated_at:
+                return transport
+
+            transport_class = TRANSPORTS.get(provider.provider_type)
+            if transport_class is None:
+                raise DispatchError(f"Unsupported provider type: {provider.provider_type}")
+            if key in self._transports:
+                self._transports.pop(key).close()
+            transport = self._transports[key] = transport_class(provider)
+            return transport
+
+    def _default_providers(self, logs) -> Dict[tuple, object]:
+        """
+        (notification_type, branch_id) -> default active provider,
+        one query per notification type.
+        """
+        branches = defaultdict(set)
+        for notification_log in logs:
+            if notification_log.notification_type in PROVIDER_MODELS:
+                branches[notification_log.notification_type].add(notification_log.branch_id)
+
+        providers = {}
+        for notification_type, branch_ids in branches.items():
+            for provider in PROVIDER_MODELS[notification_type].objects.filter(
+                branch_id__in=branch_ids, is_default=True, is_active=True
+            ):
+                providers.setdefault((notification_type, provider.branch_id), provider)
+        return providers
+
+    def _run(self, transport, batch) -> List[Optional[str]]:
+        try:
+            return transport.send(batch)
+        except Exception as e:
+            logger.error(f"Notification batch of {len(batch)} failed: {str(e)}")
+            return [str(e)] * len(batch)
+
+    def _send_batches(self, batches) -> Dict[int, Optional[str]]:
+        results = {}
+        if len(batches) == 1 or self.workers <= 1:
+            outcomes = [self._run(transport, batch) for transport, batch in batches]
+        else:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="notifications"
+                    )
+            futures = [self._executor.submit(self._run, transport, batch) for transport, batch in batches]
+            outcomes = [future.result() for future in futures]
+
+        for (_, batch), errors in zip(batches, outcomes):
+            for notification_log, error in zip(batch, errors):
+                results[notification_log.pk] = error
+        return results
+
+    def send(self, logs, provider=None) -> Dict[int, Optional[str]]:
+        """
+        Deliver notifications and save their status. Uses the branch's
+        default provider per type unless provider is given.
+
+        Returns {log id: error or None}.
+        """
+        logs = list(logs)
+        providers = {} if provider is not None else self._default_providers(logs)
+
+        errors: Dict[int, Optional[str]] = {}
+        groups = defaultdict(list)
+        for notification_log in logs:
+            notification_type = notification_log.notification_type
+            target = provider or providers.get((notification_type, notification_log.branch_id))
+            if notification_type not in PROVIDER_MODELS and provider is None:
+                errors[notification_log.pk] = f"{notification_type} notifications not yet implemented"
+                continue
+            if target is None:
+                errors[notification_log.pk] = f"No active {notification_type} provider configured"
+                continue
+            try:
+                transport = self.transport_for(target)
+            except DispatchError as e:
+                errors[notification_log.pk] = str(e)
+                continue
+            groups[(transport, transport.batch_key(notification_log))].append(notification_log)
+
+        batches = []
+        for (transport, _), group in groups.items():
+            for start in range(0, len(group), transport.batch_size):
+                batches.append((transport, group[start:start + transport.batch_size]))
+        errors.update(self._send_batches(batches))
+
+        now = timezone.now()
+        for notification_log in logs:
+            error = errors.get(notification_log.pk)
+            notification_log.status = 'failed' if error else 'sent'
+            notification_log.error_message = error
+            notification_log.sent_at = None if error else now
+            notification_log.updated_at = now
+        NotificationLog.objects.bulk_update(
+            logs, ['status', 'error_message', 'sent_at', 'updated_at'], batch_size=500
+        )
+        return errors
+
+    def close(self):
+        with self._lock:
+            for transport in self._transports.values():
+                transport.close()
+            self._transports.clear()
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = NotificationDispatcher()
+    return _dispatcher
+
+
+# ======================================================
+# QUEUE
+# ======================================================
+
+def claim_due(limit: int) -> List[NotificationQueue]:
+    """
+    Mark up to `limit` due queue entries as processing and return them,
+    highest priority first. Entries left processing longer than
+    NOTIFICATION_CLAIM_TIMEOUT seconds (crashed worker) are reclaimed.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=_setting("NOTIFICATION_CLAIM_TIMEOUT", DEFAULT_CLAIM_TIMEOUT))
+    due = (
+        NotificationQueue.objects
+        .filter(Q(processing=False) | Q(processing=True, updated_at__lt=stale))
+        .filter(Q(next_retry_at__isnull=True) | Q(next_retry_at__lte=now))
+        .filter(Q(notification_log__scheduled_for__isnull=True) | Q(notification_log__scheduled_for__lte=now))
+        .order_by('-priority', 'created_at')
+    )
+
+    with transaction.atomic():
+        ids = list(
+            due.select_for_update(skip_locked=True, of=('self',)).values_list('pk', flat=True)[:limit]
+        )
+        NotificationQueue.objects.filter(pk__in=ids).update(processing=True, updated_at=now)
+
+    return list(
+        NotificationQueue.objects
+        .filter(pk__in=ids)
+        .select_related('notification_log')
+        .order_by('-priority', 'created_at')
+    )
+
+
+def drain_queue(limit: int = 500, dispatcher: Optional[NotificationDispatcher] = None) -> Dict[str, int]:
+    """
+    Send one batch of due queue entries. Failed entries are retried
+    with exponential backoff (2^n minutes) until max_retries.
+    """
+    dispatcher = dispatcher or get_dispatcher()
+    entries = claim_due(limit)
+    if not entries:
+        return {'claimed': 0, 'sent': 0, 'retrying': 0, 'failed': 0}
+
+    errors = dispatcher.send([entry.notification_log for entry in entries])
+
+    now = timezone.now()
+    done, retrying, exhausted = [], [], []
+    for entry in entries:
+        error = errors.get(entry.notification_log_id)
+        if not error:
+            done.append(entry.pk)
+            continue
+
+        entry.retry_count += 1
+        if entry.retry_count < entry.max_retries:
+            entry.next_retry_at = now + timedelta(minutes=2 ** entry.retry_count)
+            entry.processing = False
+            entry.updated_at = now
+            retrying.append(entry)
+        else:
+            entry.notification_log.error_message = f"Max retries ({entry.max_retries}) reached: {error}"
+            exhausted.append(entry)
+
+    with transaction.atomic():
+        NotificationQueue.objects.bulk_update(
+            retrying, ['retry_count', 'next_retry_at', 'processing', 'updated_at']
+        )
+        NotificationLog.objects.bulk_update(
+            [entry.notification_log for entry in exhausted], ['error_message']
+        )
+        NotificationQueue.objects.filter(pk__in=done + [entry.pk for entry in exhausted]).delete()
+
+    return {
+        'claimed': len(entries),
+        'sent': len(done),
+        'retrying': len(retrying),
+        'failed': len(exhausted),
+    }
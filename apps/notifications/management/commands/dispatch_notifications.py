@@ -0,0 +1,36 @@
+# apps/notifications/management/commands/dispatch_notifications.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications.dispatcher import NotificationDispatcher, drain_queue
+
+
+class Command(BaseCommand):
+    help = "Send queued notifications through the pooled dispatcher (runs until stopped unless --once)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=500, help="Queue entries claimed per round.")
+        parser.add_argument("--workers", type=int, help="Concurrent send threads (default: NOTIFICATION_DISPATCH_WORKERS).")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain the due entries and exit.")
+
+    def handle(self, *args, **options):
+        dispatcher = NotificationDispatcher(workers=options["workers"])
+        try:
+            while True:
+                result = drain_queue(limit=options["batch"], dispatcher=dispatcher)
+                if result["claimed"]:
+                    self.stdout.write(
+                        f"Sent {result['sent']}, retrying {result['retrying']}, failed {result['failed']}"
+                    )
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            dispatcher.close()
+        self.stdout.write(self.style.SUCCESS("Dispatcher stopped"))
@@ -0,0 +1,386 @@
+# apps/otp/ratelimit.py
+"""
+OTP rate limit and blacklist engine.
+
+OTPService.request_otp() asks the engine instead of the database:
+
+- blacklist: the active OTPBlacklist entries of a branch as one cached
+  snapshot, retired by a version stamp when an entry is saved or
+  deleted (signals.py)
+- sliding window: requests per identifier (contact, IP, device) over
+  the last OTP_RATE_LIMIT_WINDOW seconds (default one day), kept as
+  OTP_RATE_LIMIT_BUCKETS cache counters with atomic incr and checked
+  against OTPConfig.max_otp_per_day
+- cool down: an add-only cache key per contact that lives for
+  OTPConfig.cool_down_period seconds
+
+The durable OTPRateLimit counters are buffered in process and written
+in bulk by a background thread (core.counters.BackgroundFlushBuffer)
+every OTP_RATE_LIMIT_FLUSH_INTERVAL seconds (flush_counters() writes
+them on demand).
+
+OTP_RATE_LIMIT_ENGINE selects the engine class (dotted path). The
+window counters need a cache with atomic incr shared by all processes
+(Redis, Memcached); the database cache backend is not atomic. With a
+per-process cache (LocMem) get_engine() falls back to
+DatabaseRateLimitEngine, which answers the same checks from
+OTPBlacklist and OTPRequest rows.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.cache import shared_cache
+from core.counters import BackgroundFlushBuffer
+
+from .models import OTPBlacklist, OTPRateLimit, OTPRequest
+
+logger = logging.getLogger(__name__)
+
+
+BLACKLIST_VERSION_KEY = "otp:blacklist:version:{branch}"
+BLACKLIST_KEY = "otp:blacklist:{branch}:{version}"
+WINDOW_KEY = "otp:window:{branch}:{type}:{identifier}:{bucket}"
+COOL_DOWN_KEY = "otp:cooldown:{branch}:{identifier}"
+
+DEFAULT_ENGINE = "apps.otp.ratelimit.CacheRateLimitEngine"
+FALLBACK_ENGINE = "apps.otp.ratelimit.DatabaseRateLimitEngine"
+DEFAULT_WINDOW = 24 * 60 * 60
+DEFAULT_BUCKETS = 24
+DEFAULT_BLACKLIST_TIMEOUT = 60 * 60
+DEFAULT_FLUSH_INTERVAL = 10
+FLUSH_BATCH_SIZE = 500
+
+Identifiers = List[Tuple[str, str]]
+
+
+class RateLimitError(Exception):
+    """OTP request refused by the blacklist or a rate limit"""
+
+
+def request_identifiers(recipient_contact=None, ip_address=None, device_id=None) -> Identifiers:
+    """
+    (identifier_type, identifier) pairs limited for one OTP request.
+    """
+    identifiers = [
+        ('CONTACT', recipient_contact),
+        ('IP', ip_address),
+        ('DEVICE', device_id),
+    ]
+    return [(identifier_type, identifier) for identifier_type, identifier in identifiers if identifier]
+
+
+# ======================================================
+# BLACKLIST SNAPSHOT
+# ======================================================
+
+def _current_version(branch_id) -> str:
+    key = BLACKLIST_VERSION_KEY.format(branch=branch_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex[:12], None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_blacklist(branch_id=None):
+    """
+    Retire the cached blacklist of a branch (None: entries without one).
+    """
+    cache.set(BLACKLIST_VERSION_KEY.format(branch=branch_id), uuid.uuid4().hex[:12], None)
+
+
+def load_blacklist(branch_id) -> Dict[str, Optional[float]]:
+    """
+    "TYPE:identifier" -> blocked-until timestamp (None: permanent)
+    for the active entries of a branch.
+    """
+    entries = {}
+    for blacklist_type, identifier, is_permanent, blocked_until in (
+        OTPBlacklist.objects
+        .filter(branch_id=branch_id)
+        .filter(Q(is_permanent=True) | Q(blocked_until__gt=timezone.now()))
+        .values_list('blacklist_type', 'identifier', 'is_permanent', 'blocked_until')
+    ):
+        entries[f"{blacklist_type}:{identifier}"] = None if is_permanent else blocked_until.timestamp()
+    return entries
+
+
+# ======================================================
+# DURABLE COUNTERS
+# ======================================================
+
+class CounterBuffer(BackgroundFlushBuffer):
+    """
+    Pending OTPRateLimit increments, flushed in the background.
+    """
+
+    thread_name = "otp-counter-flush"
+    interval_setting = "OTP_RATE_LIMIT_FLUSH_INTERVAL"
+    default_interval = DEFAULT_FLUSH_INTERVAL
+
+    def add(self, branch_id, identifiers: Identifiers, success: bool):
+        now = timezone.now()
+        with self._lock:
+            for identifier_type, identifier in identifiers:
+                delta = self._deltas.setdefault((branch_id, identifier_type, identifier), [0, 0, 0, now])
+                delta[0] += 1
+                delta[1 if success else 2] += 1
+                delta[3] = now
+            self._start()
+
+    def write(self, deltas):
+        deltas = list(deltas.items())
+        now = timezone.now()
+        today = now.date()
+        for start in range(0, len(deltas), FLUSH_BATCH_SIZE):
+            with transaction.atomic():
+                for key, delta in deltas[start:start + FLUSH_BATCH_SIZE]:
+                    _write_counter(key, delta, today, now)
+        return len(deltas)
+
+
+counter_buffer = CounterBuffer()
+
+
+def _write_counter(key, delta, today, now):
+    branch_id, identifier_type, identifier = key
+    requests, successes, failures, last_request = delta
+
+    rows = OTPRateLimit.objects.filter(
+        identifier=identifier, identifier_type=identifier_type, branch_id=branch_id
+    )
+    if rows.filter(daily_reset=today).update(
+        request_count=F('request_count') + requests,
+        successful_count=F('successful_count') + successes,
+        failed_count=F('failed_count') + failures,
+        last_request=last_request,
+        updated_at=now,
+    ):
+        return
+
+    # First write of the day restarts the counters
+    fresh = dict(
+        request_count=requests,
+        successful_count=successes,
+        failed_count=failures,
+        last_request=last_request,
+        daily_reset=today,
+    )
+    if rows.update(updated_at=now, **fresh):
+        return
+    try:
+        with transaction.atomic():
+            OTPRateLimit.objects.create(
+                identifier=identifier, identifier_type=identifier_type, branch_id=branch_id, **fresh
+            )
+    except IntegrityError:
+        _write_counter(key, delta, today, now)
+
+
+def flush_counters() -> int:
+    """
+    Write buffered increments to OTPRateLimit. Returns rows touched.
+    """
+    return counter_buffer.flush()
+
+
+# ======================================================
+# ENGINES
+# ======================================================
+
+class RateLimitEngine:
+    """
+    Interface used by OTPService. Identifiers are the pairs returned
+    by request_identifiers().
+    """
+
+    # Limits only hold if every process sees the same cache
+    requires_shared_cache = False
+
+    def is_blacklisted(self, identifiers: Identifiers, branch_id=None) -> bool:
+        raise NotImplementedError
+
+    def acquire(self, identifiers: Identifiers, config, branch_id=None) -> None:
+        """Count one request; raise RateLimitError if it is over a limit"""
+        raise NotImplementedError
+
+    def release(self, identifiers: Identifiers, branch_id=None) -> None:
+        """Undo the cool down of an acquired request that failed"""
+
+    def record(self, identifiers: Identifiers, success: bool, branch_id=None) -> None:
+        """Count the outcome in the durable counters"""
+        counter_buffer.add(branch_id, identifiers, success)
+
+    def usage(self, identifier_type: str, identifier: str, branch_id=None) -> int:
+        """Requests of one identifier in the current window"""
+        raise NotImplementedError
+
+
+class CacheRateLimitEngine(RateLimitEngine):
+
+    requires_shared_cache = True
+
+    def __init__(self):
+        self.window = getattr(settings, "OTP_RATE_LIMIT_WINDOW", DEFAULT_WINDOW)
+        self.buckets = getattr(settings, "OTP_RATE_LIMIT_BUCKETS", DEFAULT_BUCKETS)
+        self.bucket_size = max(1, self.window // self.buckets)
+
+    # Blacklist
+
+    def is_blacklisted(self, identifiers, branch_id=None):
+        key = BLACKLIST_KEY.format(branch=branch_id, version=_current_version(branch_id))
+        entries = cache.get(key)
+        if entries is None:
+            entries = load_blacklist(branch_id)
+            cache.set(
+                key, entries,
+                getattr(settings, "OTP_BLACKLIST_CACHE_TIMEOUT", DEFAULT_BLACKLIST_TIMEOUT),
+            )
+
+        now = time.time()
+        for identifier_type, identifier in identifiers:
+            blocked_until = entries.get(f"{identifier_type}:{identifier}", 0)
+            if blocked_until is None or blocked_until > now:
+                return True
+        return False
+
+    # Sliding window
+
+    def _window_keys(self, identifier_type, identifier, branch_id, now) -> List[str]:
+        current = int(now // self.bucket_size)
+        return [
+            WINDOW_KEY.format(
+                branch=branch_id, type=identifier_type, identifier=identifier, bucket=current - offset
+            )
+            for offset in range(self.buckets)
+        ]
+
+    def _incr(self, key) -> int:
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Bucket not created yet (or expired / evicted)
+            if cache.add(key, 1, self.window + self.bucket_size):
+                return 1
+            return cache.incr(key)
+
+    def acquire(self, identifiers, config, branch_id=None):
+        cool_down = config.cool_down_period
+        contact = dict(identifiers).get('CONTACT')
+        if cool_down and contact:
+            if not cache.add(COOL_DOWN_KEY.format(branch=branch_id, identifier=contact), 1, cool_down):
+                raise RateLimitError(f"Please wait {cool_down} seconds before requesting new OTP")
+
+        limit = config.max_otp_per_day
+        if not limit:
+            return
+
+        now = time.time()
+        keys = {
+            pair: self._window_keys(pair[0], pair[1], branch_id, now)
+            for pair in identifiers
+        }
+        for pair_keys in keys.values():
+            self._incr(pair_keys[0])
+
+        counts = cache.get_many([key for pair_keys in keys.values() for key in pair_keys])
+        for (identifier_type, _), pair_keys in keys.items():
+            if sum(counts.get(key, 0) for key in pair_keys) > limit:
+                raise RateLimitError(f"Daily OTP limit reached for {identifier_type}")
+
+    def release(self, identifiers, branch_id=None):
+        contact = dict(identifiers).get('CONTACT')
+        if contact:
+            cache.delete(COOL_DOWN_KEY.format(branch=branch_id, identifier=contact))
+
+    def usage(self, identifier_type, identifier, branch_id=None):
+        keys = self._window_keys(identifier_type, identifier, branch_id, time.time())
+        return sum(cache.get_many(keys).values())
+
+
+class DatabaseRateLimitEngine(RateLimitEngine):
+    """
+    Checks against the database on every request: the active
+    OTPBlacklist entries, and OTPRequest rows for the cool down and the
+    sliding window. Correct with any cache backend, at a few queries
+    per request.
+    """
+
+    REQUEST_FIELDS = {
+        'CONTACT': 'recipient_contact',
+        'IP': 'ip_address',
+        'DEVICE': 'device_id',
+    }
+
+    def __init__(self):
+        self.window = getattr(settings, "OTP_RATE_LIMIT_WINDOW", DEFAULT_WINDOW)
+
+    def is_blacklisted(self, identifiers, branch_id=None):
+        if not identifiers:
+            return False
+        matches = Q()
+        for identifier_type, identifier in identifiers:
+            matches |= Q(blacklist_type=identifier_type, identifier=identifier)
+        return (
+            OTPBlacklist.objects
+            .filter(matches, branch_id=branch_id)
+            .filter(Q(is_permanent=True) | Q(blocked_until__gt=timezone.now()))
+            .exists()
+        )
+
+    def _requests(self, identifier_type, identifier, branch_id, seconds):
+        return OTPRequest.objects.filter(
+            branch_id=branch_id,
+            created_at__gt=timezone.now() - timedelta(seconds=seconds),
+            **{self.REQUEST_FIELDS[identifier_type]: identifier},
+        )
+
+    def acquire(self, identifiers, config, branch_id=None):
+        cool_down = config.cool_down_period
+        contact = dict(identifiers).get('CONTACT')
+        if cool_down and contact:
+            # Failed sends are released, as by the cache engine
+            if self._requests('CONTACT', contact, branch_id, cool_down).exclude(status='FAILED').exists():
+                raise RateLimitError(f"Please wait {cool_down} seconds before requesting new OTP")
+
+        limit = config.max_otp_per_day
+        if not limit:
+            return
+
+        for identifier_type, identifier in identifiers:
+            if self.usage(identifier_type, identifier, branch_id) >= limit:
+                raise RateLimitError(f"Daily OTP limit reached for {identifier_type}")
+
+    def usage(self, identifier_type, identifier, branch_id=None):
+        return self._requests(identifier_type, identifier, branch_id, self.window).count()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> RateLimitEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine_class = import_string(getattr(settings, "OTP_RATE_LIMIT_ENGINE", DEFAULT_ENGINE))
+                if engine_class.requires_shared_cache and not shared_cache():
+                    logger.warning(
+                        f"{engine_class.__name__} needs a shared cache, using {FALLBACK_ENGINE}"
+                    )
+                    engine_class = import_string(FALLBACK_ENGINE)
+                _engine = engine_class()
+    return _engine
@@ -12,6 +12,7 @@ from .models import (
     OTPConfig, OTPRequest, OTPBlacklist,
     OTPRateLimit, OTPTemplate, OTPType, OTPChannel
 )
+from .ratelimit import RateLimitError, get_engine, request_identifiers
 from apps.notifications.services import NotificationService
 from apps.settings_core.models import SystemSetting
 
@@ -30,28 +31,24 @@ class OTPService:
                    branch_id=None, metadata=None, ip_address=None, user_agent=None,
                    device_id=None):
         """Request OTP"""
+        engine = get_engine()
+        identifiers = request_identifiers(recipient_contact, ip_address, device_id)
+        acquired = False
+        
         try:
-            # Check blacklist first
-            if self._is_blacklisted(recipient_contact, contact_type, ip_address, device_id, branch_id):
-                raise Exception("Request blocked due to security restrictions")
-            
-            # Check rate limits
-            self._check_rate_limits(recipient_contact, ip_address, device_id, branch_id)
+            # Blacklist, cool down and sliding-window limits (rate limit engine)
+            if engine.is_blacklisted(identifiers, branch_id):
+                raise RateLimitError("Request blocked due to security restrictions")
             
             # Get OTP configuration
             config = self._get_config(branch_id)
             
+            engine.acquire(identifiers, config, branch_id)
+            acquired = True
+            
             # Get purpose-specific settings
             purpose_config = config.get_purpose_config(otp_type)
             
-            # Check cool down period
-            if not self._check_cool_down(recipient_contact, config.cool_down_period):
-                raise Exception(f"Please wait {config.cool_down_period} seconds before requesting new OTP")
-            
-            # Check daily limit
-            if not self._check_daily_limit(recipient_contact, config.max_otp_per_day):
-                raise Exception(f"Daily OTP limit reached ({config.max_otp_per_day})")
-            
             # Generate OTP
             otp_length = purpose_config['length']
             otp_code = self._generate_otp(otp_length)
@@ -90,19 +87,19 @@ class OTPService:
                 created_by=None  # Will be set by middleware
             )
             
-            # Send OTP
+            # Send OTP (OTPConfig.total_otp_sent is counted by the SENT signal)
             self._send_otp(otp_request, config)
             
-            # Update counters
-            self._update_counters(recipient_contact, ip_address, device_id, branch_id, True)
-            config.total_otp_sent += 1
-            config.save()
+            # Durable counters are written in the background
+            engine.record(identifiers, True, branch_id)
             
             return otp_request
             
         except Exception as e:
             logger.error(f"Error requesting OTP: {str(e)}")
-            self._update_counters(recipient_contact, ip_address, device_id, branch_id, False)
+            if acquired:
+                engine.release(identifiers, branch_id)
+            engine.record(identifiers, False, branch_id)
             raise
     
     def verify_otp(self, otp_id, otp_code, recipient_contact=None, increment_attempt=True):
@@ -115,15 +112,9 @@ class OTPService:
             if recipient_contact and otp_request.recipient_contact != recipient_contact:
                 raise Exception("Recipient mismatch")
             
-            # Verify OTP
+            # Verify OTP (OTPConfig.total_verified is counted by the VERIFIED signal)
             verified = otp_request.verify(otp_code, increment_attempt)
             
-            # Update counters
-            if verified:
-                config = self._get_config(otp_request.branch_id)
-                config.total_verified += 1
-                config.save()
-            
             return verified
             
         except OTPRequest.DoesNotExist:
@@ -163,13 +154,9 @@ class OTPService:
             
             otp_request.save()
             
-            # Resend OTP
+            # Resend OTP (OTPConfig.total_otp_sent is counted by the SENT signal)
             self._send_otp(otp_request, config)
             
-            # Update counters
-            config.total_otp_sent += 1
-            config.save()
-            
             return otp_request
             
         except OTPRequest.DoesNotExist:
@@ -179,17 +166,14 @@ class OTPService:
             raise
     
     def check_rate_limit(self, identifier, identifier_type, branch_id=None):
-        """Check rate limits for identifier"""
+        """Check rate limits for identifier (sliding window count)"""
         try:
-            rate_limit, created = OTPRateLimit.objects.get_or_create(
+            request_count = get_engine().usage(identifier_type, identifier, branch_id)
+            last_request = OTPRateLimit.objects.filter(
                 identifier=identifier,
                 identifier_type=identifier_type,
-                branch_id=branch_id,
-                defaults={'last_request': timezone.now()}
-            )
-            
-            # Reset daily counters if needed
-            rate_limit.reset_daily_counters()
+                branch_id=branch_id
+            ).values_list('last_request', flat=True).first()
             
             # Get config for limits
             config = self._get_config(branch_id)
@@ -197,10 +181,10 @@ class OTPService:
             return {
                 'identifier': identifier,
                 'identifier_type': identifier_type,
-                'request_count': rate_limit.request_count,
+                'request_count': request_count,
                 'daily_limit': config.max_otp_per_day,
-                'remaining': max(0, config.max_otp_per_day - rate_limit.request_count),
-                'last_request': rate_limit.last_request,
+                'remaining': max(0, config.max_otp_per_day - request_count),
+                'last_request': last_request,
                 'cool_down_seconds': config.cool_down_period
             }
             
@@ -328,156 +312,6 @@ class OTPService:
         except Exception:
             return None
     
-    def _is_blacklisted(self, recipient_contact, contact_type, ip_address, device_id, branch_id):
-        """Check if identifier is blacklisted"""
-        try:
-            # Check IP
-            if ip_address:
-                blacklist = OTPBlacklist.objects.filter(
-                    blacklist_type='IP',
-                    identifier=ip_address,
-                    branch_id=branch_id
-                ).first()
-                if blacklist and blacklist.is_blocked():
-                    return True
-            
-            # Check device
-            if device_id:
-                blacklist = OTPBlacklist.objects.filter(
-                    blacklist_type='DEVICE',
-                    identifier=device_id,
-                    branch_id=branch_id
-                ).first()
-                if blacklist and blacklist.is_blocked():
-                    return True
-            
-            # Check contact
-            if recipient_contact:
-                blacklist = OTPBlacklist.objects.filter(
-                    blacklist_type='CONTACT',
-                    identifier=recipient_contact,
-                    branch_id=branch_id
-                ).first()
-                if blacklist and blacklist.is_blocked():
-                    return True
-            
-            return False
-            
-        except Exception as e:
-            logger.error(f"Error checking blacklist: {str(e)}")
-            return False
-    
-    def _check_rate_limits(self, recipient_contact, ip_address, device_id, branch_id):
-        """Check rate limits"""
-        try:
-            config = self._get_config(branch_id)
-            
-            # Check multiple identifiers
-            identifiers = [
-                (recipient_contact, 'CONTACT'),
-                (ip_address, 'IP'),
-                (device_id, 'DEVICE')
-            ]
-            
-            for identifier, identifier_type in identifiers:
-                if identifier:
-                    rate_limit, created = OTPRateLimit.objects.get_or_create(
-                        identifier=identifier,
-                        identifier_type=identifier_type,
-                        branch_id=branch_id,
-                        defaults={'last_request': timezone.now()}
-                    )
-                    
-                    # Reset daily counters if needed
-                    rate_limit.reset_daily_counters()
-                    
-                    # Check daily limit
-                    if rate_limit.request_count >= config.max_otp_per_day:
-                        raise Exception(f"Daily OTP limit reached for {identifier_type}")
-                    
-                    # Update last request
-                    rate_limit.last_request = timezone.now()
-                    rate_limit.save()
-            
-        except Exception as e:
-            logger.error(f"Error checking rate limits: {str(e)}")
-            raise
-    
-    def _update_counters(self, recipient_contact, ip_address, device_id, branch_id, success):
-        """Update rate limit counters"""
-        try:
-            identifiers = [
-                (recipient_contact, 'CONTACT'),
-                (ip_address, 'IP'),
-                (device_id, 'DEVICE')
-            ]
-            
-            for identifier, identifier_type in identifiers:
-                if identifier:
-                    try:
-                        rate_limit = OTPRateLimit.objects.get(
-                            identifier=identifier,
-                            identifier_type=identifier_type,
-                            branch_id=branch_id
-                        )
-                        
-                        rate_limit.request_count += 1
-                        if success:
-                            rate_limit.successful_count += 1
-                        else:
-                            rate_limit.failed_count += 1
-                        
-                        rate_limit.last_request = timezone.now()
-                        rate_limit.save()
-                        
-                    except OTPRateLimit.DoesNotExist:
-                        pass
-                        
-        except Exception as e:
-            logger.error(f"Error updating counters: {str(e)}")
-    
-    def _check_cool_down(self, recipient_contact, cool_down_period):
-        """Check cool down period"""
-        try:
-            if not cool_down_period:
-                return True
-            
-            # Check last successful OTP for this contact
-            last_otp = OTPRequest.objects.filter(
-                recipient_contact=recipient_contact,
-                status='VERIFIED'
-            ).order_by('-created_at').first()
-            
-            if last_otp:
-                cool_down_end = last_otp.created_at + timedelta(seconds=cool_down_period)
-                if timezone.now() < cool_down_end:
-                    return False
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error checking cool down: {str(e)}")
-            return True
-    
-    def _check_daily_limit(self, recipient_contact, max_per_day):
-        """Check daily OTP limit"""
-        try:
-            if not max_per_day:
-                return True
-            
-            today = timezone.now().date()
-            today_count = OTPRequest.objects.filter(
-                recipient_contact=recipient_contact,
-                created_at__date=today
-            ).count()
-            
-            return today_count < max_per_day
-            
-        except Exception as e:
-            logger.error(f"Error checking daily limit: {str(e)}")
-            return True
-        
-
     # Add to apps/otp/services.py in _send_voice_otp method:
 
     def _send_voice_otp(self, otp_request, template, context, config):
@@ -9,9 +9,11 @@ from datetime import datetime, timedelta
 import logging
 
 from .models import OTPConfig, OTPRequest, OTPBlacklist, OTPRateLimit, OTPTemplate
+from .ratelimit import invalidate_blacklist
 from .services import OTPService
 from apps.audit.services import log_action
 from apps.notifications.services import NotificationService  # Assuming you'll have notifications app
+from core.counters import hot_counters
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -289,15 +291,13 @@ def otp_request_post_save(sender, instance, created, **kwargs):
     
     # Update OTP config counters
     if instance.status in ['SENT', 'DELIVERED']:
-        update_otp_config_counter(instance.branch, 'sent')
+        update_otp_config_counter(instance.branch_id, 'sent')
     elif instance.status == 'VERIFIED':
-        update_otp_config_counter(instance.branch, 'verified')
+        update_otp_config_counter(instance.branch_id, 'verified')
     elif instance.status == 'FAILED':
-        update_otp_config_counter(instance.branch, 'failed')
+        update_otp_config_counter(instance.branch_id, 'failed')
     
-    # Update rate limits
-    if created:
-        update_rate_limits(instance)
+    # Rate limit counters are kept by the OTP rate limit engine (ratelimit.py)
     
     # Auto-expire OTPs in background (can be moved to Celery task)
     if instance.status in ['PENDING', 'SENT', 'DELIVERED']:
@@ -382,7 +382,10 @@ def otp_blacklist_post_save(sender, instance, created, **kwargs):
     - Create audit log
     - Block related OTP requests
     - Send notifications
+    - Refresh the cached blacklist
     """
+    invalidate_blacklist(instance.branch_id)
+    
     action = 'OTP_BLACKLIST_CREATED' if created else 'OTP_BLACKLIST_UPDATED'
     
     # Log unblocking
@@ -420,7 +423,10 @@ def otp_blacklist_post_delete(sender, instance, **kwargs):
     """
     Post-delete signal for OTPBlacklist
     - Unblock related OTP requests
+    - Refresh the cached blacklist
     """
+    invalidate_blacklist(instance.branch_id)
+    
     try:
         user = getattr(instance, '_deleted_by', None)
         
@@ -645,74 +651,23 @@ def add_to_blacklist_if_needed(otp_request):
         logger.error(f"Failed to add to blacklist: {str(e)}")
 
 
-def update_otp_config_counter(branch, counter_type):
-    """Update OTP config counters"""
-    try:
-        if not branch:
-            return
-        
-        config = OTPConfig.objects.get(branch=branch)
-        
-        if counter_type == 'sent':
-            config.total_otp_sent += 1
-        elif counter_type == 'verified':
-            config.total_verified += 1
-        elif counter_type == 'failed':
-            config.total_failed += 1
-        
-        config.save(update_fields=['total_otp_sent', 'total_verified', 'total_failed'])
-        
-    except OTPConfig.DoesNotExist:
-        pass
-    except Exception as e:
-        logger.error(f"Failed to update OTP config counter: {str(e)}")
+OTP_CONFIG_COUNTERS = {
+    'sent': 'total_otp_sent',
+    'verified': 'total_verified',
+    'failed': 'total_failed',
+}
 
 
-def update_rate_limits(otp_request):
-    """Update rate limits for identifiers"""
+def update_otp_config_counter(branch_id, counter_type):
+    """Update OTP config counters (buffered, see core/counters.py)"""
     try:
-        # Update for recipient contact
-        if otp_request.recipient_contact:
-            rate_limit, _ = OTPRateLimit.objects.get_or_create(
-                identifier=otp_request.recipient_contact,
-                identifier_type='CONTACT',
-                branch=otp_request.branch,
-                defaults={'last_request': timezone.now()}
-            )
-            rate_limit.request_count += 1
-            if otp_request.status == 'VERIFIED':
-                rate_limit.successful_count += 1
-            elif otp_request.status == 'FAILED':
-                rate_limit.failed_count += 1
-            rate_limit.last_request = timezone.now()
-            rate_limit.save()
+        if not branch_id or counter_type not in OTP_CONFIG_COUNTERS:
+            return
         
-        # Update for IP address
-        if otp_request.ip_address:
-            rate_limit, _ = OTPRateLimit.objects.get_or_create(
-                identifier=otp_request.ip_address,
-                identifier_type='IP',
-                branch=otp_request.branch,
-                defaults={'last_request': timezone.now()}
-            )
-            rate_limit.request_count += 1
-            rate_limit.last_request = timezone.now()
-            rate_limit.save()
+        hot_counters.add(OTPConfig, {'branch_id': branch_id}, **{OTP_CONFIG_COUNTERS[counter_type]: 1})
         
-        # Update for device ID
-        if otp_request.device_id:
-            rate_limit, _ = OTPRateLimit.objects.get_or_create(
-                identifier=otp_request.device_id,
-                identifier_type='DEVICE',
-                branch=otp_request.branch,
-                defaults={'last_request': timezone.now()}
-            )
-            rate_limit.request_count += 1
-            rate_limit.last_request = timezone.now()
-            rate_limit.save()
-            
     except Exception as e:
-        logger.error(f"Failed to update rate limits: {str(e)}")
+        logger.error(f"Failed to update OTP config counter: {str(e)}")
 
 
 def schedule_otp_expiry_check(otp_request):
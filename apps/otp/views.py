@@ -13,6 +13,7 @@ import logging
 from core.permissions import (
     IsAdminUser, IsManager, IsDoctor, IsReceptionist, IsCashier
 )
+from core.counters import hot_counters
 from apps.clinics.models import Branch
 from .models import (
     OTPConfig, OTPRequest, OTPBlacklist,
@@ -60,10 +61,12 @@ class OTPConfigViewSet(viewsets.ModelViewSet):
     def reset_counters(self, request, pk=None):
         """Reset OTP counters"""
         config = self.get_object()
-        config.total_otp_sent = 0
-        config.total_verified = 0
-        config.total_failed = 0
-        config.save()
+        hot_counters.discard(OTPConfig, {'branch_id': config.branch_id})
+        OTPConfig.objects.filter(pk=config.pk).update(
+            total_otp_sent=0,
+            total_verified=0,
+            total_failed=0,
+        )
         
         return Response({'message': 'Counters reset successfully'})
 
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class PatientsConfig(AppConfig):
     name = 'apps.patients'
-    verbose_name = 'Patient Management'
\ No newline at end of file
+    verbose_name = 'Patient Management'
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,451 @@
+# apps/patients/importer.py
+"""
+Chunked, resumable patient import (PatientImportJob).
+
+Rows are streamed from the uploaded file job.chunk_size at a time
+(pandas chunked CSV reader, openpyxl read-only mode for .xlsx) and each
+chunk is handled as a unit:
+
+1. vectorized validation over the chunk DataFrame (required values,
+   email / phone format, in-file duplicates, gender, blood group,
+   date of birth)
+2. existing users (by email, with their patient profile) and taken
+   phone numbers are fetched with one query each
+3. one transaction bulk-creates new users and patients (patient IDs
+   from a single block allocation), bulk-updates existing patients,
+   refreshes their search documents and advances the job cursor
+
+A failure leaves the job FAILED with every committed chunk kept;
+running it again resumes at job.processed_rows. Every chunk touches
+job.updated_at, so a RUNNING job without progress for
+PATIENT_IMPORT_STALE_AFTER seconds is taken to be orphaned (its runner
+was killed) and can be claimed again.
+
+Bulk writes skip model save() and signals: imported users get an
+unusable password (set via password reset / OTP) and no per-row audit
+entries are written.
+"""
+
+import logging
+from datetime import timedelta
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.settings_core.sequences import allocate_document_numbers, last_used_number
+
+from .models import Patient, PatientImportJob
+from .search import index_patients
+
+try:
+    import openpyxl
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ('email', 'full_name', 'phone')
+PATIENT_COLUMNS = (
+    'date_of_birth', 'gender', 'blood_group',
+    'allergies', 'chronic_conditions', 'current_medications',
+    'emergency_contact_name', 'emergency_contact_phone', 'emergency_contact_relation',
+    'insurance_provider', 'insurance_id',
+)
+COLUMNS = REQUIRED_COLUMNS + PATIENT_COLUMNS
+
+GENDER_VALUES = {
+    'm': 'M', 'male': 'M',
+    'f': 'F', 'female': 'F',
+    'o': 'O', 'other': 'O',
+    'u': 'U', 'unknown': 'U', 'prefer not to say': 'U',
+}
+
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+MAX_STORED_ERRORS = 500
+DEFAULT_STALE_AFTER = 15 * 60
+BULK_BATCH_SIZE = 500
+
+
+class ImportJobError(Exception):
+    """Raised for files or jobs that cannot be imported"""
+
+
+# ======================================================
+# READING
+# ======================================================
+
+def file_kind(name: str) -> str:
+    name = name.lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith('.xlsx'):
+        return 'xlsx'
+    if name.endswith('.xls'):
+        return 'xls'
+    raise ImportJobError('Unsupported file format. Use CSV or Excel.')
+
+
+def _normalize_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    frame.columns = [str(column).strip().lower() for column in frame.columns]
+    return frame
+
+
+def read_header(job: PatientImportJob) -> List[str]:
+    return list(next(_read_frames(job, start=0, chunk_size=1), pd.DataFrame()).columns)
+
+
+def count_rows(job: PatientImportJob) -> int:
+    kind = file_kind(job.file.name)
+    with job.file.open('rb') as handle:
+        if kind == 'csv':
+            return sum(
+                len(chunk)
+                for chunk in pd.read_csv(handle, dtype=str, usecols=[0], chunksize=50000)
+            )
+        if kind == 'xlsx' and HAS_OPENPYXL:
+            workbook = openpyxl.load_workbook(handle, read_only=True, data_only=True)
+            try:
+                return sum(1 for _ in workbook.active.iter_rows(min_row=2, values_only=True))
+            finally:
+                workbook.close()
+        return len(pd.read_excel(handle, dtype=str))
+
+
+def _read_frames(job: PatientImportJob, start: int, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    DataFrames of at most chunk_size rows, from data row start on.
+    """
+    kind = file_kind(job.file.name)
+
+    with job.file.open('rb') as handle:
+        if kind == 'csv':
+            reader = pd.read_csv(
+                handle,
+                dtype=str,
+                keep_default_na=False,
+                skiprows=range(1, start + 1),
+                chunksize=chunk_size,
+            )
+            for frame in reader:
+                yield _normalize_columns(frame)
+            return
+
+        if kind == 'xlsx' and HAS_OPENPYXL:
+            workbook = openpyxl.load_workbook(handle, read_only=True, data_only=True)
+            try:
+                rows = workbook.active.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    return
+                rows = islice(rows, start, None)
+                while True:
+                    block = list(islice(rows, chunk_size))
+                    if not block:
+                        return
+                    yield _normalize_columns(pd.DataFrame(block, columns=list(header), dtype=str))
+            finally:
+                workbook.close()
+            return
+
+        # .xls (or no openpyxl): no streaming reader, slice in memory
+        frame = _normalize_columns(pd.read_excel(handle, dtype=str, keep_default_na=False))
+        for offset in range(start, len(frame), chunk_size):
+            yield frame.iloc[offset:offset + chunk_size]
+
+
+def read_chunks(job: PatientImportJob, start: int = 0) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """
+    (first data row, DataFrame) chunks from data row start on.
+    """
+    offset = start
+    for frame in _read_frames(job, start, job.chunk_size):
+        frame = frame.reset_index(drop=True)
+        frame.index = range(offset, offset + len(frame))
+        yield offset, frame
+        offset += len(frame)
+
+
+# ======================================================
+# VALIDATION (VECTORIZED)
+# ======================================================
+
+def prepare_chunk(frame: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Normalized chunk plus a Series of error messages ('' = valid).
+    """
+    frame = frame.reindex(columns=list(COLUMNS)).fillna('')
+    frame = frame.astype(str).apply(lambda column: column.str.strip())
+
+    # Lowercase the email domain, as UserManager.normalize_email does
+    email = frame['email']
+    parts = email.str.rpartition('@')
+    frame['email'] = email.where(parts[1] == '', parts[0] + '@' + parts[2].str.lower())
+
+    # Spreadsheet numbers come back as "1711000111.0"
+    for column in ('phone', 'emergency_contact_phone'):
+        frame[column] = frame[column].str.replace(r'\.0$', '', regex=True)
+
+    gender = frame['gender'].str.lower()
+    frame['gender'] = gender.map(GENDER_VALUES).fillna('')
+    frame['blood_group'] = frame['blood_group'].str.upper().str.replace(' ', '', regex=False)
+
+    raw_birth_dates = frame['date_of_birth']
+    birth_dates = pd.to_datetime(raw_birth_dates, errors='coerce', format='mixed')
+    frame['date_of_birth'] = birth_dates.dt.date.astype(object).where(birth_dates.notna(), None)
+
+    errors = pd.Series('', index=frame.index)
+
+    def flag(mask, message):
+        errors[mask & (errors == '')] = message
+
+    flag(frame['email'] == '', 'email is required')
+    flag(~frame['email'].str.match(EMAIL_PATTERN), 'invalid email')
+    flag(frame['full_name'] == '', 'full_name is required')
+    flag(frame['phone'] == '', 'phone is required')
+    flag(frame['phone'].str.len() > 15, 'phone is longer than 15 characters')
+    flag(frame['email'].str.lower().duplicated(keep='first'), 'duplicate email in file')
+    flag(frame['phone'].duplicated(keep='first'), 'duplicate phone in file')
+    flag((gender != '') & (frame['gender'] == ''), 'invalid gender')
+    flag(frame['blood_group'].str.len() > 5, 'invalid blood_group')
+    flag((raw_birth_dates != '') & birth_dates.isna(), 'invalid date_of_birth')
+    flag(frame['emergency_contact_phone'].str.len() > 15, 'emergency_contact_phone is longer than 15 characters')
+
+    return frame, errors
+
+
+# ======================================================
+# CHUNK PROCESSING
+# ======================================================
+
+def _patient_values(row) -> Dict[str, Any]:
+    """
+    Non-empty patient columns of a row.
+    """
+    values = {}
+    for column in PATIENT_COLUMNS:
+        value = row[column]
+        if value is not None and value != '':
+            values[column] = value
+    return values
+
+
+def _row_error(row_index: int, email: str, message: str) -> Dict[str, Any]:
+    # +2: one-based, after the header line
+    return {'row': row_index + 2, 'email': email, 'error': message}
+
+
+def process_chunk(job: PatientImportJob, frame: pd.DataFrame) -> Dict[str, int]:
+    """
+    Import one chunk and advance the job in the same transaction.
+    """
+    frame, errors = prepare_chunk(frame)
+    valid = frame[errors == '']
+
+    # Pre-fetch existing users and taken phones (one query each)
+    existing = {
+        user.email.lower(): user
+        for user in User.objects.filter(email__in=list(valid['email'])).select_related('patient_profile')
+    }
+    phone_owners = dict(
+        User.objects
+        .filter(phone__in=list(valid['phone']))
+        .values_list('phone', 'email')
+    )
+
+    actor = job.created_by
+    now = timezone.now()
+    unusable_password = make_password(None)
+
+    new_users: List[User] = []
+    new_patients: List[Tuple[User, Dict[str, Any]]] = []
+    updated: List[Patient] = []
+    update_fields = set()
+
+    for row_index, row in zip(valid.index, valid.to_dict('records')):
+        email = row['email']
+        user = existing.get(email.lower())
+        owner = phone_owners.get(row['phone'])
+
+        if user is None and owner is not None:
+            errors[row_index] = 'phone already belongs to another user'
+            continue
+
+        values = _patient_values(row)
+
+        if user is None:
+            user = User(
+                email=email,
+                full_name=row['full_name'],
+                phone=row['phone'],
+                password=unusable_password,
+                created_by=actor,
+                updated_by=actor,
+            )
+            new_users.append(user)
+            new_patients.append((user, values))
+            continue
+
+        patient = getattr(user, 'patient_profile', None)
+        if patient is None:
+            new_patients.append((user, values))
+            continue
+
+        for field, value in values.items():
+            setattr(patient, field, value)
+        patient.updated_at = now
+        patient.updated_by = actor
+        patient.user = user
+        update_fields.update(values)
+        updated.append(patient)
+
+    with transaction.atomic():
+        if new_users:
+            User.objects.bulk_create(new_users, batch_size=BULK_BATCH_SIZE)
+            if any(user.pk is None for user in new_users):
+                # Backends without RETURNING on bulk inserts
+                ids = dict(
+                    User.objects
+                    .filter(email__in=[user.email for user in new_users])
+                    .values_list('email', 'pk')
+                )
+                for user in new_users:
+                    user.pk = ids[user.email]
+
+        created = []
+        if new_patients:
+            year_month = now.strftime('%Y%m')
+            numbers = allocate_document_numbers(
+                'PAT', year_month, len(new_patients),
+                seed=lambda: last_used_number(Patient.objects, 'patient_id', f'PAT-{year_month}-'),
+            )
+            for (user, values), number in zip(new_patients, numbers):
+                created.append(Patient(
+                    user=user,
+                    patient_id=number,
+                    registered_branch_id=job.branch_id,
+                    created_by=actor,
+                    updated_by=actor,
+                    **values,
+                ))
+            Patient.objects.bulk_create(created, batch_size=BULK_BATCH_SIZE)
+            if any(patient.pk is None for patient in created):
+                ids = dict(
+                    Patient.objects
+                    .filter(patient_id__in=numbers)
+                    .values_list('patient_id', 'pk')
+                )
+                for patient in created:
+                    patient.pk = ids[patient.patient_id]
+
+        if updated:
+            Patient.objects.bulk_update(
+                updated,
+                sorted(update_fields) + ['updated_at', 'updated_by'],
+                batch_size=BULK_BATCH_SIZE,
+            )
+
+        index_patients(created + updated)
+
+        failed = errors[errors != '']
+        job.processed_rows += len(frame)
+        job.created_count += len(created)
+        job.updated_count += len(updated)
+        job.error_count += len(failed)
+        room = MAX_STORED_ERRORS - len(job.errors)
+        if room > 0:
+            job.errors = job.errors + [
+                _row_error(row_index, frame.at[row_index, 'email'], message)
+                for row_index, message in islice(failed.items(), room)
+            ]
+        job.save(update_fields=[
+            'processed_rows', 'created_count', 'updated_count',
+            'error_count', 'errors', 'updated_at',
+        ])
+
+    return {'created': len(created), 'updated': len(updated), 'errors': len(failed)}
+
+
+# ======================================================
+# JOBS
+# ======================================================
+
+def create_import_job(file, branch=None, user=None, chunk_size: Optional[int] = None) -> PatientImportJob:
+    """
+    Store the upload and check its header; raises ImportJobError.
+    """
+    file_kind(file.name)
+    job = PatientImportJob.objects.create(
+        file=file,
+        branch=branch,
+        created_by=user,
+        chunk_size=chunk_size or getattr(settings, 'PATIENT_IMPORT_CHUNK_SIZE', 1000),
+    )
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in read_header(job)]
+    if missing:
+        job.status = 'FAILED'
+        job.last_error = f'Missing required columns: {missing}'
+        job.save(update_fields=['status', 'last_error', 'updated_at'])
+        raise ImportJobError(job.last_error)
+    return job
+
+
+def claim_job(job: PatientImportJob, force: bool = False) -> bool:
+    """
+    Mark the job RUNNING unless another runner holds it. A RUNNING job
+    with no committed chunk for PATIENT_IMPORT_STALE_AFTER seconds is
+    taken over; force takes over any RUNNING job.
+    """
+    jobs = PatientImportJob.objects.filter(pk=job.pk).exclude(status='COMPLETED')
+    if not force:
+        stale_after = getattr(settings, 'PATIENT_IMPORT_STALE_AFTER', DEFAULT_STALE_AFTER)
+        jobs = jobs.exclude(
+            status='RUNNING',
+            updated_at__gte=timezone.now() - timedelta(seconds=stale_after),
+        )
+    claimed = bool(jobs.update(status='RUNNING', last_error='', updated_at=timezone.now()))
+    if claimed:
+        job.refresh_from_db()
+    return claimed
+
+
+def run_import(job: PatientImportJob, force: bool = False, progress=None) -> PatientImportJob:
+    """
+    Import (or resume) job to the end of the file.
+
+    progress(job) is called after every committed chunk.
+    """
+    if not claim_job(job, force=force):
+        raise ImportJobError(f'Import job {job.pk} is already running or completed')
+
+    try:
+        if job.started_at is None:
+            job.started_at = timezone.now()
+        if job.total_rows is None:
+            job.total_rows = count_rows(job)
+        job.save(update_fields=['started_at', 'total_rows', 'updated_at'])
+
+        for _, frame in read_chunks(job, start=job.processed_rows):
+            process_chunk(job, frame)
+            if progress is not None:
+                progress(job)
+    except Exception as e:
+        logger.exception('Patient import %s failed at row %s', job.pk, job.processed_rows)
+        job.status = 'FAILED'
+        job.last_error = str(e)
+        job.save(update_fields=['status', 'last_error', 'updated_at'])
+        return job
+
+    job.status = 'COMPLETED'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    return job
@@ -0,0 +1,24 @@
+# apps/patients/management/commands/rebuild_patient_search.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.patients.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the patient search documents from patients and their users."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Documents written per statement (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        written = rebuild_search_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} patients"))
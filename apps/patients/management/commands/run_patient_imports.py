@@ -0,0 +1,45 @@
+# apps/patients/management/commands/run_patient_imports.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.patients.importer import ImportJobError, run_import
+from apps.patients.models import PatientImportJob
+
+
+class Command(BaseCommand):
+    help = "Run pending patient import jobs, or resume the given jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("job_ids", nargs="*", type=int, help="Jobs to run or resume (default: all pending).")
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Take over jobs left RUNNING, even before they go stale (PATIENT_IMPORT_STALE_AFTER).",
+        )
+
+    def handle(self, *args, **options):
+        if options["job_ids"]:
+            jobs = list(PatientImportJob.objects.filter(pk__in=options["job_ids"]).order_by("pk"))
+            missing = set(options["job_ids"]) - {job.pk for job in jobs}
+            if missing:
+                raise CommandError(f"Unknown import jobs: {sorted(missing)}")
+        else:
+            jobs = list(PatientImportJob.objects.filter(status="PENDING").order_by("pk"))
+
+        def report(job):
+            self.stdout.write(
+                f"Job {job.pk}: {job.processed_rows}/{job.total_rows or '?'} rows "
+                f"({job.created_count} created, {job.updated_count} updated, {job.error_count} errors)"
+            )
+
+        for job in jobs:
+            try:
+                job = run_import(job, force=options["force"], progress=report)
+            except ImportJobError as e:
+                self.stderr.write(str(e))
+                continue
+
+            if job.status == "COMPLETED":
+                self.stdout.write(self.style.SUCCESS(f"Job {job.pk} completed"))
+            else:
+                self.stderr.write(f"Job {job.pk} failed at row {job.processed_rows}: {job.last_error}")
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.1 on 2026-10-17 06:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+TRIGRAM_INDEX = 'patient_search_document_trgm'
+
+
+def create_trigram_index(apps, schema_editor):
+    # Substring / prefix lookups on PostgreSQL; other backends use the
+    # in-process n-gram index (apps.patients.search)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON patient_search_documents '
+        'USING gin (document gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinics', '0003_counter_created_at_counter_created_by_and_more'),
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientSearchDocument',
+            fields=[
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='patients.patient')),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('code', models.CharField(blank=True, max_length=50)),
+                ('phone_digits', models.CharField(blank=True, max_length=20)),
+                ('document', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='patient_search_documents', to='clinics.branch')),
+            ],
+            options={
+                'db_table': 'patient_search_documents',
+                'indexes': [models.Index(fields=['branch', 'name'], name='patient_sea_branch__a31936_idx'), models.Index(fields=['code'], name='patient_sea_code_799b4a_idx'), models.Index(fields=['phone_digits'], name='patient_sea_phone_d_f59928_idx'), models.Index(fields=['updated_at'], name='patient_sea_updated_37d904_idx')],
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:05
+
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_search_documents(apps, schema_editor):
+    # Search joins search_document; existing patients need theirs
+    # before the first query (same as rebuild_patient_search)
+    from apps.patients.search import build_document
+
+    Patient = apps.get_model('patients', 'Patient')
+    PatientSearchDocument = apps.get_model('patients', 'PatientSearchDocument')
+
+    batch = []
+    patients = Patient.objects.select_related('user').order_by('pk')
+    for patient in patients.iterator(chunk_size=BATCH_SIZE):
+        batch.append(PatientSearchDocument(patient_id=patient.pk, **build_document(patient)))
+        if len(batch) >= BATCH_SIZE:
+            PatientSearchDocument.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    PatientSearchDocument.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0003_patientimportjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,5 @@
 # clinic/Backend/apps/patients/models.py
-from django.db import models
+from django.db import models, transaction
 from core.mixins.audit_fields import AuditFieldsMixin
 from core.mixins.soft_delete import SoftDeleteMixin
 
@@ -62,24 +62,123 @@ class Patient(AuditFieldsMixin, SoftDeleteMixin, models.Model):
     def __str__(self):
         return f"{self.user.full_name} (ID: {self.patient_id or 'N/A'})"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if not self.patient_id:
-            # Auto-generate patient ID: PAT-YYYY-MM-XXXX
+            # Auto-generate patient ID: PAT-YYYYMM-XXXX
             from datetime import datetime
-            from django.db.models import Count
-            today = datetime.now()
-            year_month = today.strftime('%Y%m')
+            from apps.settings_core.sequences import last_used_number, next_document_number
+            year_month = datetime.now().strftime('%Y%m')
             
-            last_patient = Patient.objects.filter(
-                patient_id__startswith=f'PAT-{year_month}-'
-            ).order_by('patient_id').last()
-            
-            if last_patient:
-                last_num = int(last_patient.patient_id.split('-')[-1])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-            
-            self.patient_id = f'PAT-{year_month}-{new_num:04d}'
+            self.patient_id = next_document_number(
+                'PAT', year_month,
+                seed=lambda: last_used_number(Patient.objects, 'patient_id', f'PAT-{year_month}-'),
+            )
         
         super().save(*args, **kwargs)
+
+
+class PatientSearchDocument(models.Model):
+    """
+    Denormalized search text of a patient (see apps.patients.search).
+
+    Holds the normalized name, patient ID, email, insurance ID and phone
+    digits in one column so lookups hit a single (trigram-indexed on
+    PostgreSQL) table instead of OR-ing icontains across patients and
+    users.
+    """
+    patient = models.OneToOneField(
+        Patient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    branch = models.ForeignKey(
+        'clinics.Branch',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='patient_search_documents'
+    )
+    name = models.CharField(max_length=255, blank=True)
+    code = models.CharField(max_length=50, blank=True)
+    phone_digits = models.CharField(max_length=20, blank=True)
+    document = models.TextField(blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'patient_search_documents'
+        indexes = [
+            models.Index(fields=['branch', 'name']),
+            models.Index(fields=['code']),
+            models.Index(fields=['phone_digits']),
+            models.Index(fields=['updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"Search document for patient {self.patient_id}"
+
+
+class PatientImportJob(models.Model):
+    """
+    A chunked patient import (see apps.patients.importer).
+
+    processed_rows is committed together with each chunk, so a failed
+    or interrupted job resumes from the first row not yet imported.
+    """
+    
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    file = models.FileField(upload_to='patient_imports/%Y/%m/')
+    branch = models.ForeignKey(
+        'clinics.Branch',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='patient_import_jobs'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    chunk_size = models.PositiveIntegerField(default=1000)
+    
+    # Progress
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    created_by = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='patient_import_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'patient_import_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Patient import {self.pk} ({self.status})"
+    
+    @property
+    def progress(self):
+        if not self.total_rows:
+            return None
+        return round(self.processed_rows * 100 / self.total_rows, 1)
@@ -0,0 +1,331 @@
+# apps/patients/search.py
+"""
+Patient search index.
+
+Every patient has one PatientSearchDocument row: the normalized name,
+patient ID, email, insurance ID and phone digits joined into a single
+`document` column (lowercase, accents stripped, punctuation as spaces).
+A query matches when every query token is a substring of the document,
+so typeahead prefixes, partial phone numbers and patient IDs typed with
+or without dashes all work (the ID is indexed both as words and
+compacted: "PAT-202401-0001" -> "pat 202401 0001 pat2024010001").
+
+- PostgreSQL: the substring tests are served by a pg_trgm GIN index on
+  `document` (created by the migration) and results are ranked by
+  exact / prefix hits plus trigram word similarity on the name.
+- Other backends: a process-local trigram posting index narrows the
+  candidates before the same substring test runs in the database.
+
+Documents are kept current from patient / user saves (signals.py) and
+can be rebuilt with the rebuild_patient_search management command.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.utils import timezone
+
+from .models import Patient, PatientSearchDocument
+
+try:
+    from django.contrib.postgres.search import TrigramWordSimilarity
+    HAS_TRIGRAM = True
+except ImportError:
+    HAS_TRIGRAM = False
+
+
+GENERATION_KEY = "patients:search:generation"
+
+DEFAULT_LOCAL_TTL = 5
+DEFAULT_SYNC_SKEW = 60
+DEFAULT_MAX_CANDIDATES = 5000
+DEFAULT_SUGGEST_LIMIT = 10
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NON_DIGIT = re.compile(r"\D+")
+
+
+# ======================================================
+# NORMALIZATION
+# ======================================================
+
+def normalize(value) -> str:
+    """
+    Lowercase ASCII words separated by single spaces.
+    """
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(" ", value.lower()).strip()
+
+
+def phone_digits(value) -> str:
+    return _NON_DIGIT.sub("", value or "")
+
+
+def query_tokens(query: str) -> List[str]:
+    """
+    Tokens a document must contain. Queries without letters are
+    treated as one phone / number string ("017-11" -> "01711").
+    """
+    text = normalize(query)
+    if text and not re.search(r"[a-z]", text):
+        return [text.replace(" ", "")]
+    return text.split()
+
+
+def build_document(patient) -> Dict[str, str]:
+    user = patient.user
+    name = normalize(user.full_name)
+    code = normalize(patient.patient_id)
+    digits = phone_digits(user.phone)
+    # Compacted ID for queries typed without separators
+    compact_code = code.replace(" ", "") if " " in code else ""
+
+    parts = [name, code, compact_code, normalize(user.email), normalize(patient.insurance_id), digits]
+    return {
+        "branch_id": patient.registered_branch_id,
+        "name": name,
+        "code": code,
+        "phone_digits": digits,
+        # Leading space lets " token" match word prefixes
+        "document": " " + " ".join(part for part in parts if part),
+    }
+
+
+# ======================================================
+# MAINTENANCE
+# ======================================================
+
+def index_patient(patient) -> PatientSearchDocument:
+    """
+    Create or refresh the search document of one patient.
+    """
+    fields = build_document(patient)
+    document, _ = PatientSearchDocument.objects.update_or_create(
+        patient_id=patient.pk, defaults=fields
+    )
+    ngram_index.add(patient.pk, fields["document"])
+    return document
+
+
+def index_patients(patients: Iterable) -> int:
+    """
+    Bulk create / refresh search documents (patients need .user loaded).
+    """
+    now = timezone.now()
+    rows = [
+        PatientSearchDocument(patient_id=patient.pk, updated_at=now, **build_document(patient))
+        for patient in patients
+    ]
+    if rows:
+        PatientSearchDocument.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["patient"],
+            update_fields=["branch", "name", "code", "phone_digits", "document", "updated_at"],
+        )
+        for row in rows:
+            ngram_index.add(row.patient_id, row.document)
+    return len(rows)
+
+
+def rebuild_search_index(batch_size: int = 1000) -> int:
+    """
+    Recreate every search document. Returns the number written.
+    """
+    written = 0
+    batch = []
+    for patient in Patient.objects.select_related("user").order_by("pk").iterator(chunk_size=batch_size):
+        batch.append(patient)
+        if len(batch) >= batch_size:
+            written += index_patients(batch)
+            batch = []
+    written += index_patients(batch)
+
+    reset_search_generation()
+    return written
+
+
+def reset_search_generation():
+    """
+    Make every process rebuild its n-gram index (after deletes / rebuilds).
+    """
+    cache.set(GENERATION_KEY, uuid.uuid4().hex[:12], None)
+
+
+def _current_generation() -> str:
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex[:12], None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+# ======================================================
+# N-GRAM FALLBACK (NON-POSTGRESQL)
+# ======================================================
+
+def trigrams(text: str) -> Set[str]:
+    return {text[index:index + 3] for index in range(len(text) - 2)}
+
+
+class NgramIndex:
+    """
+    Process-local trigram postings over search documents.
+
+    Synced incrementally by updated_at every PATIENT_SEARCH_LOCAL_TTL
+    seconds; a generation change (deletes, full rebuild) reloads it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set] = defaultdict(set)
+        self._grams: Dict[object, Set[str]] = {}
+        self._generation = None
+        self._synced_at = None
+        self._checked_at = float("-inf")
+
+    def add(self, patient_id, document: str):
+        with self._lock:
+            self._replace(patient_id, document)
+
+    def _replace(self, patient_id, document: str):
+        for gram in self._grams.pop(patient_id, ()):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(patient_id)
+                if not postings:
+                    del self._postings[gram]
+
+        grams = trigrams(document)
+        self._grams[patient_id] = grams
+        for gram in grams:
+            self._postings[gram].add(patient_id)
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._checked_at < getattr(settings, "PATIENT_SEARCH_LOCAL_TTL", DEFAULT_LOCAL_TTL):
+            return
+        self._checked_at = now
+
+        generation = _current_generation()
+        rows = PatientSearchDocument.objects.all()
+        if generation != self._generation:
+            self._postings.clear()
+            self._grams.clear()
+            self._generation = generation
+        elif self._synced_at is not None:
+            rows = rows.filter(updated_at__gte=self._synced_at)
+
+        # Re-read a margin so rows committed late are not missed
+        mark = timezone.now() - timedelta(
+            seconds=getattr(settings, "PATIENT_SEARCH_SYNC_SKEW", DEFAULT_SYNC_SKEW)
+        )
+        for patient_id, document in rows.values_list("patient_id", "document").iterator():
+            self._replace(patient_id, document)
+        self._synced_at = mark
+
+    def candidates(self, tokens: Iterable[str]) -> Optional[Set]:
+        """
+        Patient ids containing every trigram of the tokens, or None
+        when no token is long enough to narrow the search.
+        """
+        with self._lock:
+            self._sync()
+
+            result = None
+            for token in tokens:
+                for gram in trigrams(token):
+                    postings = self._postings.get(gram, set())
+                    result = set(postings) if result is None else result & postings
+                    if not result:
+                        return set()
+            return result
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._grams.clear()
+            self._generation = None
+            self._synced_at = None
+            self._checked_at = float("-inf")
+
+
+ngram_index = NgramIndex()
+
+
+# ======================================================
+# SEARCH
+# ======================================================
+
+def _uses_trigram(queryset) -> bool:
+    return HAS_TRIGRAM and connections[queryset.db].vendor == "postgresql"
+
+
+def search_patients(queryset, query: str, branch=None, prefix: str = ""):
+    """
+    Filter queryset to matches of query, best first.
+
+    queryset may be Patient or any model reaching the patient through
+    prefix (e.g. "patient__" for visits). Adds a search_rank
+    annotation; branch scopes to the patient's registered branch.
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        return queryset.none()
+
+    doc = f"{prefix}search_document__"
+    text = " ".join(tokens)
+
+    condition = Q()
+    for token in tokens:
+        condition &= Q(**{f"{doc}document__contains": token})
+    queryset = queryset.filter(condition)
+
+    if branch is not None:
+        queryset = queryset.filter(**{f"{doc}branch_id": getattr(branch, "pk", branch)})
+
+    use_trigram = _uses_trigram(queryset)
+    if not use_trigram:
+        candidates = ngram_index.candidates(tokens)
+        if candidates is not None and len(candidates) <= getattr(
+            settings, "PATIENT_SEARCH_MAX_CANDIDATES", DEFAULT_MAX_CANDIDATES
+        ):
+            queryset = queryset.filter(**{f"{prefix}pk__in": candidates})
+
+    # Exact ID / phone, name prefix, ID / phone prefix, word prefix
+    rank = Case(
+        When(Q(**{f"{doc}code": text}) | Q(**{f"{doc}phone_digits": text}), then=Value(100.0)),
+        When(Q(**{f"{doc}name__startswith": text}), then=Value(50.0)),
+        When(Q(**{f"{doc}code__startswith": text}) | Q(**{f"{doc}phone_digits__startswith": text}), then=Value(40.0)),
+        When(Q(**{f"{doc}document__contains": " " + tokens[0]}), then=Value(20.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    if use_trigram:
+        rank = rank + TrigramWordSimilarity(Value(text), f"{doc}name") * Value(10.0)
+
+    return queryset.annotate(search_rank=rank).order_by("-search_rank", f"{doc}name")
+
+
+def suggest_patients(queryset, query: str, branch=None, limit: Optional[int] = None):
+    """
+    Typeahead: top matches as small dicts.
+    """
+    limit = limit or DEFAULT_SUGGEST_LIMIT
+    return list(
+        search_patients(queryset, query, branch=branch)
+        .values("id", "patient_id", "user__full_name", "user__phone", "search_rank")[:limit]
+    )
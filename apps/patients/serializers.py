@@ -304,7 +304,7 @@ class PatientImportSerializer(serializers.Serializer):
     """Serializer for importing patients from CSV/Excel"""
     
     file = serializers.FileField(required=True)
-    branch_id = serializers.UUIDField(required=False)
+    branch_id = serializers.IntegerField(required=False)
     send_welcome_email = serializers.BooleanField(default=False)
     
     class Meta:
@@ -0,0 +1,42 @@
+# apps/patients/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.models import User
+from apps.patients.models import Patient, PatientSearchDocument
+from apps.patients.search import index_patient, reset_search_generation
+
+
+# Fields of User that feed the search document
+USER_SEARCH_FIELDS = {"full_name", "email", "phone"}
+
+
+# ---------------------------------------------------------------------
+# SEARCH INDEX
+# ---------------------------------------------------------------------
+
+@receiver(post_save, sender=Patient)
+def index_patient_on_save(sender, instance, **kwargs):
+    transaction.on_commit(lambda: index_patient(instance))
+
+
+@receiver(post_save, sender=User)
+def index_patient_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not USER_SEARCH_FIELDS.intersection(update_fields):
+        return
+
+    def reindex():
+        patient = Patient.objects.select_related("user").filter(user_id=instance.pk).first()
+        if patient is not None:
+            index_patient(patient)
+
+    transaction.on_commit(reindex)
+
+
+@receiver(post_delete, sender=PatientSearchDocument)
+def search_document_deleted(sender, instance, **kwargs):
+    reset_search_generation()
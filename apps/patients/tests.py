@@ -1,3 +1,152 @@
-from django.test import TestCase
+from datetime import time, timedelta
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.accounts.models import Role, User, UserBranch, UserBranchRole
+from apps.clinics.models import Branch, Clinic
+
+from .importer import claim_job
+from .models import Patient, PatientImportJob
+from .search import build_document, ngram_index, query_tokens, search_patients
+from .views import PatientViewSet
+
+
+def make_patient(patient_id, full_name="Rahim Uddin", phone="+880 1711-223344"):
+    return SimpleNamespace(
+        patient_id=patient_id,
+        insurance_id="",
+        registered_branch_id=1,
+        user=SimpleNamespace(full_name=full_name, email="rahim@example.com", phone=phone),
+    )
+
+
+def matches(document, query):
+    tokens = query_tokens(query)
+    return bool(tokens) and all(token in document for token in tokens)
+
+
+class SearchDocumentTests(SimpleTestCase):
+
+    def setUp(self):
+        self.document = build_document(make_patient("PAT-202401-0001"))["document"]
+
+    def test_patient_id_with_or_without_separators(self):
+        for query in [
+            "PAT-202401-0001",
+            "pat 202401 0001",
+            "PAT2024010001",
+            "pat202401",
+            "202401-0001",
+            "2024010001",
+            "0001",
+        ]:
+            with self.subTest(query=query):
+                self.assertTrue(matches(self.document, query))
+
+    def test_other_patient_id_does_not_match(self):
+        for query in ["PAT2024010002", "202401-0002", "2024020001"]:
+            with self.subTest(query=query):
+                self.assertFalse(matches(self.document, query))
+
+    def test_name_and_phone(self):
+        for query in ["rah", "Rahim Udd", "uddin rahim", "01711", "1711-22"]:
+            with self.subTest(query=query):
+                self.assertTrue(matches(self.document, query))
+
+    def test_letterless_query_is_one_token(self):
+        self.assertEqual(query_tokens("202401-0001"), ["2024010001"])
+        self.assertEqual(query_tokens("PAT-202401"), ["pat", "202401"])
+
+
+class SearchPatientsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        clinic = Clinic.objects.create(name="Clinic")
+        cls.branch = Branch.objects.create(
+            clinic=clinic, name="Main", code="MAIN", address="Street 1",
+            phone="0100000000", opening_time=time(9), closing_time=time(17),
+        )
+        cls.patients = []
+        # Search documents are written on commit
+        with cls.captureOnCommitCallbacks(execute=True):
+            for index, name in enumerate(["Rahim Uddin", "Karim Ahmed"]):
+                user = User.objects.create_user(
+                    email=f"patient{index}@example.com", password="x",
+                    full_name=name, phone=f"0171100000{index}",
+                )
+                cls.patients.append(Patient.objects.create(user=user, registered_branch=cls.branch))
+
+    def setUp(self):
+        ngram_index.clear()
+
+    def search(self, query):
+        return list(search_patients(Patient.objects.all(), query))
+
+    def test_compacted_patient_id(self):
+        patient = self.patients[1]
+        code = patient.patient_id
+        for query in [code, code.replace("-", ""), code.split("-", 1)[1], code.split("-", 1)[1].replace("-", "")]:
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), [patient])
+
+    def test_name_prefix(self):
+        self.assertEqual(self.search("kar"), [self.patients[1]])
+
+
+class ImportJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        clinic = Clinic.objects.create(name="Clinic")
+        branches = [
+            Branch.objects.create(
+                clinic=clinic, name=code, code=code, address="Street 1",
+                phone="0100000000", opening_time=time(9), closing_time=time(17),
+            )
+            for code in ["MAIN", "EAST"]
+        ]
+        cls.receptionist = User.objects.create_user(email="front@example.com", password="x")
+        UserBranch.objects.create(user=cls.receptionist, branch=branches[0], is_primary=True)
+        UserBranchRole.objects.create(
+            user=cls.receptionist, branch=branches[0],
+            role=Role.objects.create(code="RECEPTIONIST", name="Receptionist"),
+        )
+        cls.job, cls.other_job = [
+            PatientImportJob.objects.create(
+                file="patient_imports/patients.csv", branch=branch, status='RUNNING'
+            )
+            for branch in branches
+        ]
+
+    def test_running_job_is_not_claimed(self):
+        self.assertFalse(claim_job(self.job))
+
+    @override_settings(PATIENT_IMPORT_STALE_AFTER=60)
+    def test_stale_running_job_is_claimed(self):
+        PatientImportJob.objects.filter(pk=self.job.pk).update(
+            updated_at=timezone.now() - timedelta(minutes=5)
+        )
+        self.assertTrue(claim_job(self.job))
+        self.assertEqual(self.job.status, 'RUNNING')
+
+    def import_status(self, user, job_id):
+        request = APIRequestFactory().get('/api/patients/import_status/', {'job_id': job_id})
+        force_authenticate(request, user=user)
+        return PatientViewSet.as_view({'get': 'import_status'})(request)
+
+    def test_import_status(self):
+        response = self.import_status(self.receptionist, self.job.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'RUNNING')
+
+    def test_import_status_is_branch_scoped(self):
+        self.assertEqual(self.import_status(self.receptionist, self.other_job.pk).status_code, 404)
+        self.assertEqual(self.import_status(self.receptionist, 'abc').status_code, 400)
+
+    def test_import_status_requires_role(self):
+        user = User.objects.create_user(email="patient@example.com", password="x")
+        self.assertEqual(self.import_status(user, self.job.pk).status_code, 403)
@@ -7,6 +7,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.utils import timezone
 from django.db.models import Q, Count, Sum, Avg, Max, Min
 from django.db import transaction
@@ -19,13 +20,16 @@ from io import StringIO, BytesIO
 import pandas as pd
 import logging
 
+from core.constants import UserRoles
 from core.permissions import (
     IsAdminUser, IsManager, IsDoctor, IsReceptionist, IsCashier,
     IsStaff, HasBranchAccess, CanOverride, IsAuthenticatedAndActive,
-    IsOwnerOrStaff
+    IsOwnerOrStaff, get_request_access, has_role
 )
 
-from .models import Patient
+from .importer import ImportJobError, create_import_job, run_import
+from .models import Patient, PatientImportJob
+from .search import search_patients, suggest_patients
 from .serializers import (
     PatientSerializer,
     PatientCreateSerializer,
@@ -39,6 +43,7 @@ from .serializers import (
     EmergencyContactSerializer,
 )
 from apps.accounts.models import User
+from apps.clinics.models import Branch
 from apps.audit.services import log_action, attach_audit_context
 
 logger = logging.getLogger(__name__)
@@ -349,14 +354,8 @@ class PatientViewSet(viewsets.ModelViewSet):
             data = serializer.validated_data
             
             if data.get('q'):
-                search_term = data['q']
-                queryset = queryset.filter(
-                    Q(patient_id__icontains=search_term) |
-                    Q(user__email__icontains=search_term) |
-                    Q(user__full_name__icontains=search_term) |
-                    Q(user__phone__icontains=search_term) |
-                    Q(insurance_id__icontains=search_term)
-                )
+                # Ranked lookup on the patient search index
+                queryset = search_patients(queryset, data['q'])
             
             if data.get('gender'):
                 queryset = queryset.filter(gender=data['gender'])
@@ -409,6 +408,36 @@ class PatientViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Typeahead suggestions (best matches first).
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response([])
+        
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        suggestions = suggest_patients(
+            self.get_queryset(),
+            query,
+            branch=getattr(request, 'branch_id', None),
+            limit=limit,
+        )
+        return Response([
+            {
+                'id': row['id'],
+                'patient_id': row['patient_id'],
+                'full_name': row['user__full_name'],
+                'phone': row['user__phone'],
+            }
+            for row in suggestions
+        ])
+    
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """
@@ -506,8 +535,13 @@ class PatientViewSet(viewsets.ModelViewSet):
     def import_patients(self, request):
         """
         Import patients from CSV/Excel file.
+        
+        The file is stored as a PatientImportJob and imported in chunks
+        (apps.patients.importer). The job is left for the
+        run_patient_imports command (202); poll import_status for
+        progress. PATIENT_IMPORT_INLINE runs it within the request.
         """
-        if not (request.user.role in ['receptionist', 'clinic_manager', 'super_admin']):
+        if not has_role(request, UserRoles.RECEPTIONIST, UserRoles.CLINIC_MANAGER, UserRoles.SUPER_ADMIN):
             return Response(
                 {'error': 'Permission denied'},
                 status=status.HTTP_403_FORBIDDEN
@@ -517,132 +551,97 @@ class PatientViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        file = serializer.validated_data['file']
         branch_id = serializer.validated_data.get('branch_id')
-        send_welcome_email = serializer.validated_data['send_welcome_email']
+        branch = Branch.objects.filter(id=branch_id).first() if branch_id else None
         
         try:
-            import pandas as pd
-            
-            # Read file based on extension
-            if file.name.endswith('.csv'):
-                df = pd.read_csv(file)
-            elif file.name.endswith('.xlsx') or file.name.endswith('.xls'):
-                df = pd.read_excel(file)
-            else:
-                return Response(
-                    {'error': 'Unsupported file format. Use CSV or Excel.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Validate required columns
-            required_columns = ['email', 'full_name', 'phone']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                return Response(
-                    {'error': f'Missing required columns: {missing_columns}'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            imported = 0
-            updated = 0
-            errors = []
-            
-            with transaction.atomic():
-                for index, row in df.iterrows():
-                    try:
-                        patient_data = {
-                            'email': row['email'],
-                            'full_name': row['full_name'],
-                            'phone': str(row['phone']),
-                            'date_of_birth': row.get('date_of_birth'),
-                            'gender': row.get('gender', ''),
-                            'blood_group': row.get('blood_group', ''),
-                            'allergies': row.get('allergies', ''),
-                            'chronic_conditions': row.get('chronic_conditions', ''),
-                            'current_medications': row.get('current_medications', ''),
-                        }
-                        
-                        # Check if patient already exists
-                        existing_user = User.objects.filter(email=patient_data['email']).first()
-                        
-                        if existing_user:
-                            # Check if user already has patient profile
-                            if hasattr(existing_user, 'patient_profile'):
-                                # Update existing patient
-                                patient = existing_user.patient_profile
-                                
-                                # Update fields
-                                for field in ['date_of_birth', 'gender', 'blood_group', 
-                                            'allergies', 'chronic_conditions', 'current_medications']:
-                                    if field in row and pd.notna(row[field]):
-                                        setattr(patient, field, row[field])
-                                
-                                patient.save()
-                                updated += 1
-                            else:
-                                # Create patient profile for existing user
-                                patient_data.pop('email')
-                                patient_data.pop('full_name')
-                                patient_data.pop('phone')
-                                
-                                Patient.objects.create(
-                                    user=existing_user,
-                                    **patient_data
-                                )
-                                imported += 1
-                        else:
-                            # Create new patient with user
-                            serializer = PatientCreateSerializer(
-                                data=patient_data,
-                                context={'request': request}
-                            )
-                            
-                            if serializer.is_valid():
-                                patient = serializer.save()
-                                
-                                # Set branch if provided
-                                if branch_id:
-                                    from apps.clinics.models import Branch
-                                    try:
-                                        branch = Branch.objects.get(id=branch_id)
-                                        patient.registered_branch = branch
-                                        patient.save()
-                                    except Branch.DoesNotExist:
-                                        pass
-                                
-                                imported += 1
-                            else:
-                                errors.append({
-                                    'row': index + 2,
-                                    'email': patient_data['email'],
-                                    'errors': serializer.errors
-                                })
-                    
-                    except Exception as e:
-                        errors.append({
-                            'row': index + 2,
-                            'email': row.get('email', 'unknown'),
-                            'error': str(e)
-                        })
-                        continue
-            
-            return Response({
-                'success': True,
-                'imported': imported,
-                'updated': updated,
-                'total_rows': len(df),
-                'errors': errors if errors else None,
-                'message': f'Imported {imported} new patients, updated {updated} existing patients'
-            })
+            job = create_import_job(
+                serializer.validated_data['file'],
+                branch=branch,
+                user=request.user,
+            )
+        except ImportJobError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        except Exception as e:
-            logger.error(f"Error importing patients: {str(e)}")
+        if not getattr(settings, 'PATIENT_IMPORT_INLINE', False):
+            return Response(self._import_job_data(job), status=status.HTTP_202_ACCEPTED)
+        
+        job = run_import(job)
+        return Response(self._import_job_data(job))
+    
+    @action(detail=False, methods=['get'])
+    def import_status(self, request):
+        """
+        Progress of an import job (?job_id=).
+        """
+        if not has_role(request, UserRoles.RECEPTIONIST, UserRoles.CLINIC_MANAGER, UserRoles.SUPER_ADMIN):
             return Response(
-                {'error': f'Import failed: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'Permission denied'},
+                status=status.HTTP_403_FORBIDDEN
             )
+        
+        job = self._get_import_job(request, request.query_params.get('job_id'))
+        if isinstance(job, Response):
+            return job
+        return Response(self._import_job_data(job))
+    
+    @action(detail=False, methods=['post'])
+    def resume_import(self, request):
+        """
+        Continue a failed import job from its last committed chunk, or
+        one left RUNNING by a killed worker once it has gone stale.
+        """
+        if not has_role(request, UserRoles.RECEPTIONIST, UserRoles.CLINIC_MANAGER, UserRoles.SUPER_ADMIN):
+            return Response(
+                {'error': 'Permission denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        job = self._get_import_job(request, request.data.get('job_id'))
+        if isinstance(job, Response):
+            return job
+        try:
+            job = run_import(job)
+        except ImportJobError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(self._import_job_data(job))
+    
+    def _get_import_job(self, request, job_id):
+        """
+        Import job by id, limited to the user's branches (or their own
+        jobs) unless they are a super admin; a Response on a bad id.
+        """
+        try:
+            job_id = int(job_id)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'job_id must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        jobs = PatientImportJob.objects.all()
+        if not has_role(request, UserRoles.SUPER_ADMIN):
+            jobs = jobs.filter(
+                Q(created_by=request.user)
+                | Q(branch_id__in=get_request_access(request).branch_ids)
+            )
+        return get_object_or_404(jobs, pk=job_id)
+    
+    def _import_job_data(self, job):
+        return {
+            'success': job.status == 'COMPLETED',
+            'job_id': job.id,
+            'status': job.status,
+            'imported': job.created_count,
+            'updated': job.updated_count,
+            'processed_rows': job.processed_rows,
+            'total_rows': job.total_rows,
+            'progress': job.progress,
+            'errors': job.errors or None,
+            'error_count': job.error_count,
+            'last_error': job.last_error or None,
+            'message': f'Imported {job.created_count} new patients, updated {job.updated_count} existing patients'
+        }
     
     @action(detail=False, methods=['post'])
     def export_patients(self, request):
@@ -756,7 +756,7 @@
 #         self.save()
 
 
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from decimal import Decimal
@@ -764,6 +764,7 @@ import uuid
 
 from core.mixins.audit_fields import AuditFieldsMixin
 from core.mixins.soft_delete import SoftDeleteMixin
+from core.mixins.tracked_state import TrackedStateMixin
 from apps.billing.models import Invoice
 from apps.clinics.models import Branch
 from apps.patients.models import Patient
@@ -772,29 +773,11 @@ from apps.patients.models import Patient
 # ===========================================
 # BASE CLASSES USING YOUR MIXINS
 # ===========================================
-class BasePaymentModel(AuditFieldsMixin, models.Model):
+class BasePaymentModel(AuditFieldsMixin, TrackedStateMixin, models.Model):
     """Base model for all payment models"""
     
     class Meta:
         abstract = True
-    
-    def save(self, *args, **kwargs):
-        # Auto-set audit fields
-        if not self.pk:  # New object
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            # Try to get user from request if available
-            import inspect
-            for frame_record in inspect.stack():
-                if frame_record[3] == 'get_response':
-                    request = frame_record[0].f_locals.get('request')
-                    if request and hasattr(request, 'user'):
-                        user = request.user
-                        if user.is_authenticated:
-                            self.created_by = user
-                            self.updated_by = user
-                    break
-        super().save(*args, **kwargs)
 
 
 # ===========================================
@@ -1032,6 +1015,7 @@ class Payment(BasePaymentModel):
     def __str__(self):
         return f"{self.payment_number} - {self.patient} - ₹{self.amount}"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         # Auto-generate payment number
         if not self.payment_number:
@@ -1060,23 +1044,15 @@ class Payment(BasePaymentModel):
     
     def _generate_payment_number(self):
         """Generate unique payment number: PAY-YYYYMMDD-XXXXX"""
-        from django.db.models import Max
         from datetime import datetime
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
-        today = datetime.now()
-        date_str = today.strftime('%Y%m%d')
-        
-        last_payment = Payment.objects.filter(
-            payment_number__startswith=f'PAY-{date_str}-'
-        ).order_by('payment_number').last()
+        date_str = datetime.now().strftime('%Y%m%d')
         
-        if last_payment:
-            last_num = int(last_payment.payment_number[-5:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        
-        return f"PAY-{date_str}-{new_num:05d}"
+        return next_document_number(
+            'PAY', date_str, width=5,
+            seed=lambda: last_used_number(Payment.objects, 'payment_number', f'PAY-{date_str}-'),
+        )
     
     def _update_invoice_payment(self):
         """Update invoice paid amount"""
@@ -1303,6 +1279,7 @@ class Refund(BasePaymentModel):
     def __str__(self):
         return f"{self.refund_number} - ₹{self.amount}"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         # Auto-generate refund number
         if not self.refund_number:
@@ -1319,23 +1296,15 @@ class Refund(BasePaymentModel):
     
     def _generate_refund_number(self):
         """Generate unique refund number: REF-YYYYMMDD-XXXXX"""
-        from django.db.models import Max
         from datetime import datetime
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
-        today = datetime.now()
-        date_str = today.strftime('%Y%m%d')
-        
-        last_refund = Refund.objects.filter(
-            refund_number__startswith=f'REF-{date_str}-'
-        ).order_by('refund_number').last()
+        date_str = datetime.now().strftime('%Y%m%d')
         
-        if last_refund:
-            last_num = int(last_refund.refund_number[-5:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        
-        return f"REF-{date_str}-{new_num:05d}"
+        return next_document_number(
+            'REF', date_str, width=5,
+            seed=lambda: last_used_number(Refund.objects, 'refund_number', f'REF-{date_str}-'),
+        )
     
     def approve(self, user, notes=""):
         """Approve refund request"""
@@ -1470,6 +1439,7 @@ class PaymentReceipt(BasePaymentModel):
         duplicate_tag = " (Duplicate)" if self.is_duplicate else ""
         return f"Receipt {self.receipt_number}{duplicate_tag}"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         # Auto-generate receipt number
         if not self.receipt_number:
@@ -1483,23 +1453,15 @@ class PaymentReceipt(BasePaymentModel):
     
     def _generate_receipt_number(self):
         """Generate unique receipt number: RCPT-YYYYMMDD-XXXXX"""
-        from django.db.models import Max
         from datetime import datetime
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
-        today = datetime.now()
-        date_str = today.strftime('%Y%m%d')
-        
-        last_receipt = PaymentReceipt.objects.filter(
-            receipt_number__startswith=f'RCPT-{date_str}-'
-        ).order_by('receipt_number').last()
+        date_str = datetime.now().strftime('%Y%m%d')
         
-        if last_receipt:
-            last_num = int(last_receipt.receipt_number[-5:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        
-        return f"RCPT-{date_str}-{new_num:05d}"
+        return next_document_number(
+            'RCPT', date_str, width=5,
+            seed=lambda: last_used_number(PaymentReceipt.objects, 'receipt_number', f'RCPT-{date_str}-'),
+        )
     
     def _generate_security_code(self):
         """Generate a security code for receipt verification"""
@@ -357,7 +357,7 @@
 
 # apps/prescriptions/models.py
 
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import timedelta
@@ -492,6 +492,7 @@ class Prescription(AuditFieldsMixin, SoftDeleteMixin, models.Model):
                 'doctor': 'Doctor license has expired'
             })
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if not self.prescription_id:
             self.prescription_id = self._generate_prescription_id()
@@ -511,17 +512,15 @@ class Prescription(AuditFieldsMixin, SoftDeleteMixin, models.Model):
     
     def _generate_prescription_id(self):
         """Generate RX-YYYYMM-XXXX format ID"""
-        from django.db.models import Count
         from datetime import datetime
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
-        now = datetime.now()
-        year_month = now.strftime('%Y%m')
-        
-        current_month_count = Prescription.objects.filter(
-            prescription_id__startswith=f'RX-{year_month}-'
-        ).count() + 1
+        year_month = datetime.now().strftime('%Y%m')
         
-        return f'RX-{year_month}-{current_month_count:04d}'
+        return next_document_number(
+            'RX', year_month,
+            seed=lambda: last_used_number(Prescription.objects, 'prescription_id', f'RX-{year_month}-'),
+        )
     
     @property
     def is_valid(self):
@@ -0,0 +1,156 @@
+# apps/reports/aggregation.py
+"""
+Single-pass aggregation helpers for report generators.
+
+Instead of one count()/aggregate() per status or bucket, every bucket
+becomes a COUNT(...) FILTER (WHERE ...) / SUM(...) FILTER (...) column
+of one aggregate query (Django emulates FILTER with CASE where the
+database lacks it).
+
+Duration histograms use WIDTH_BUCKET on PostgreSQL and a vectorized
+NumPy pass over the raw column elsewhere (SQLite).
+"""
+
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import connections
+from django.db.models import BigIntegerField, Count, FloatField, Func, IntegerField, Q, QuerySet, Sum, Value
+from django.db.models.functions import Cast, Extract
+
+
+def conditional_aggregate(
+    queryset: QuerySet,
+    buckets: Dict[str, Q],
+    sum_field: Optional[str] = None,
+    **aggregates,
+) -> Dict[str, Any]:
+    """
+    Count (and optionally sum sum_field) per bucket in one query.
+
+    Returns {'counts': {bucket: n}, 'sums': {bucket: total}, **aggregates}.
+    Bucket names may be any label ('0-18', '61+', ...).
+    """
+    expressions = {}
+    for index, condition in enumerate(buckets.values()):
+        expressions[f'bucket_count_{index}'] = Count('pk', filter=condition)
+        if sum_field:
+            expressions[f'bucket_sum_{index}'] = Sum(sum_field, filter=condition)
+
+    row = queryset.aggregate(**expressions, **aggregates)
+
+    result = {name: row[name] for name in aggregates}
+    result['counts'] = {
+        label: row[f'bucket_count_{index}']
+        for index, label in enumerate(buckets)
+    }
+    if sum_field:
+        result['sums'] = {
+            label: row[f'bucket_sum_{index}']
+            for index, label in enumerate(buckets)
+        }
+    return result
+
+
+def value_buckets(field: str, values: Iterable[Any]) -> Dict[Any, Q]:
+    """
+    One bucket per value of field (status, gender, ...).
+    """
+    return {value: Q(**{field: value}) for value in values}
+
+
+def age_buckets(
+    birth_date_field: str,
+    ranges: List[Tuple[str, int, Optional[int]]],
+    today: Optional[date] = None,
+) -> Dict[str, Q]:
+    """
+    Age buckets expressed as birth date ranges, so they stay indexable.
+
+    ranges: (label, min_age, max_age or None), ages inclusive.
+    """
+    today = today or date.today()
+
+    def years_ago(years):
+        try:
+            return today.replace(year=today.year - years)
+        except ValueError:
+            # 29 February
+            return today.replace(year=today.year - years, day=28)
+
+    buckets = {}
+    for label, min_age, max_age in ranges:
+        # age >= min_age  <=>  born on or before today - min_age years
+        condition = Q(**{f'{birth_date_field}__lte': years_ago(min_age)})
+        if max_age is not None:
+            # age <= max_age  <=>  born after today - (max_age + 1) years
+            condition &= Q(**{f'{birth_date_field}__gt': years_ago(max_age + 1)})
+        buckets[label] = condition
+    return buckets
+
+
+def grouped_counts(queryset: QuerySet, field: str) -> Dict[Any, int]:
+    """
+    {value: count} with one GROUP BY query.
+    """
+    return {
+        row[field]: row['count']
+        for row in queryset.values(field).annotate(count=Count('pk')).order_by()
+    }
+
+
+class WidthBucket(Func):
+    function = 'WIDTH_BUCKET'
+    output_field = IntegerField()
+
+
+def duration_histogram(
+    queryset: QuerySet,
+    field: str,
+    bin_minutes: int,
+    max_minutes: int,
+) -> List[int]:
+    """
+    Counts of a DurationField in bins of bin_minutes up to max_minutes.
+
+    Returns max_minutes // bin_minutes counts for [0, w), [w, 2w), ...
+    followed by one overflow count (>= max_minutes). Negative values
+    are counted in the first bin.
+    """
+    bins = max_minutes // bin_minutes
+    queryset = queryset.filter(**{f'{field}__isnull': False}).order_by()
+    connection = connections[queryset.db]
+
+    counts = np.zeros(bins + 1, dtype=np.int64)
+
+    if connection.vendor == 'postgresql':
+        minutes = Extract(field, 'epoch', output_field=FloatField()) / Value(60.0)
+        rows = (
+            queryset
+            .annotate(bucket=WidthBucket(minutes, Value(0.0), Value(float(max_minutes)), Value(bins)))
+            .values('bucket')
+            .annotate(count=Count('pk'))
+        )
+        for row in rows:
+            # WIDTH_BUCKET: 0 below range, 1..bins inside, bins + 1 above
+            counts[min(max(row['bucket'] - 1, 0), bins)] += row['count']
+        return counts.tolist()
+
+    if connection.features.has_native_duration_field:
+        seconds = np.fromiter(
+            (value.total_seconds() for value in queryset.values_list(field, flat=True)),
+            dtype=np.float64,
+        )
+    else:
+        # Stored as bigint microseconds (SQLite, MySQL): skip timedelta conversion
+        microseconds = np.fromiter(
+            queryset.annotate(raw=Cast(field, BigIntegerField())).values_list('raw', flat=True),
+            dtype=np.int64,
+        )
+        seconds = microseconds / 1_000_000
+
+    if seconds.size:
+        indexes = np.clip(np.floor(seconds / 60 / bin_minutes), 0, bins).astype(np.int64)
+        counts += np.bincount(indexes, minlength=bins + 1)
+    return counts.tolist()
@@ -1,5 +1,5 @@
 # apps/reports/models.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -278,6 +278,7 @@ class GeneratedReport(BaseAppModel):
     def __str__(self):
         return f"Report {self.report_number} - {self.template.name}"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if not self.report_number:
             self.report_number = self.generate_report_number()
@@ -285,19 +286,14 @@ class GeneratedReport(BaseAppModel):
     
     def generate_report_number(self):
         """Generate unique report number: REP-YYYYMMDD-XXXXX"""
-        date_str = timezone.now().strftime('%Y%m%d')
-        
-        last_report = GeneratedReport.objects.filter(
-            report_number__startswith=f'REP-{date_str}-'
-        ).order_by('report_number').last()
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
-        if last_report:
-            last_num = int(last_report.report_number[-5:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+        date_str = timezone.now().strftime('%Y%m%d')
         
-        return f"REP-{date_str}-{new_num:05d}"
+        return next_document_number(
+            'REP', date_str, width=5,
+            seed=lambda: last_used_number(GeneratedReport.objects, 'report_number', f'REP-{date_str}-'),
+        )
     
     def mark_completed(self, file_path, file_size, duration, row_count=0):
         """Mark report as completed"""
@@ -622,6 +618,7 @@ class ReportSchedule(BaseAppModel):
     def __str__(self):
         return f"Schedule {self.schedule_number} - {self.template.name}"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if not self.schedule_number:
             self.schedule_number = self.generate_schedule_number()
@@ -634,19 +631,14 @@ class ReportSchedule(BaseAppModel):
     
     def generate_schedule_number(self):
         """Generate unique schedule number: SCH-YYYYMMDD-XXXXX"""
-        date_str = timezone.now().strftime('%Y%m%d')
-        
-        last_schedule = ReportSchedule.objects.filter(
-            schedule_number__startswith=f'SCH-{date_str}-'
-        ).order_by('schedule_number').last()
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
-        if last_schedule:
-            last_num = int(last_schedule.schedule_number[-5:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+        date_str = timezone.now().strftime('%Y%m%d')
         
-        return f"SCH-{date_str}-{new_num:05d}"
+        return next_document_number(
+            'SCH', date_str, width=5,
+            seed=lambda: last_used_number(ReportSchedule.objects, 'schedule_number', f'SCH-{date_str}-'),
+        )
     
     def calculate_next_run(self):
         """Calculate next run date/time"""
@@ -767,6 +759,7 @@ class ReportExport(BaseModel, BranchScopedModel):
     def __str__(self):
         return f"Export {self.export_number} - {self.export_format}"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if not self.export_number:
             self.export_number = self.generate_export_number()
@@ -774,19 +767,14 @@ class ReportExport(BaseModel, BranchScopedModel):
     
     def generate_export_number(self):
         """Generate unique export number: EXP-YYYYMMDD-XXXXX"""
-        date_str = timezone.now().strftime('%Y%m%d')
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
-        last_export = ReportExport.objects.filter(
-            export_number__startswith=f'EXP-{date_str}-'
-        ).order_by('export_number').last()
-        
-        if last_export:
-            last_num = int(last_export.export_number[-5:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+        date_str = timezone.now().strftime('%Y%m%d')
         
-        return f"EXP-{date_str}-{new_num:05d}"
+        return next_document_number(
+            'EXP', date_str, width=5,
+            seed=lambda: last_used_number(ReportExport.objects, 'export_number', f'EXP-{date_str}-'),
+        )
 
 
 class ReportFavorite(BaseModel):
@@ -4,10 +4,13 @@ import os
 from datetime import datetime, timedelta
 from decimal import Decimal
 from django.db import connection
-from django.db.models import Sum, Count, Avg, Q, F
+from django.db.models import Sum, Count, Avg, Max, Min, Q, F, IntegerField, OuterRef, Subquery
 from django.utils import timezone
 from django.conf import settings
 
+from .aggregation import (
+    age_buckets, conditional_aggregate, duration_histogram, grouped_counts, value_buckets
+)
 from .models import ReportTemplate, GeneratedReport, ReportData
 from apps.billing.models import Invoice
 from apps.payments.models import Payment as PaymentModel
@@ -16,6 +19,7 @@ from apps.patients.models import Patient
 from apps.doctors.models import Doctor
 from apps.treatments.models import Treatment, TreatmentPlan
 from apps.clinics.models import Branch
+from apps.eod.rollup import daily_financials, summarize_financials
 
 
 class ReportService:
@@ -108,16 +112,20 @@ class ReportService:
     @staticmethod
     def _generate_revenue_summary(start_date, end_date, branch):
         """Generate revenue summary report"""
-        # Daily revenue
-        daily_revenue = Invoice.objects.filter(
-            branch=branch,
-            invoice_date__range=[start_date, end_date],
-            status__in=['PAID', 'PARTIALLY_PAID']
-        ).values('invoice_date').annotate(
-            invoices=Count('id'),
-            total_amount=Sum('total_amount'),
-            paid_amount=Sum('paid_amount')
-        ).order_by('invoice_date')
+        # Daily revenue (from the daily financial rollup)
+        daily_revenue = [
+            {
+                'invoice_date': day['date'],
+                'invoices': day['invoice_count'],
+                'total_amount': day['invoice_amount'],
+                'paid_amount': day['invoice_paid_amount'],
+            }
+            for day in daily_financials(
+                start_date, end_date, branch=branch,
+                invoice_statuses=['PAID', 'PARTIALLY_PAID']
+            )
+        ]
+        totals = summarize_financials(start_date, end_date, branch=branch)
         
         # Revenue by doctor
         revenue_by_doctor = Invoice.objects.filter(
@@ -142,20 +150,11 @@ class ReportService:
                 'branch': branch.name if branch else 'All'
             },
             'summary': {
-                'total_invoices': Invoice.objects.filter(
-                    branch=branch,
-                    invoice_date__range=[start_date, end_date]
-                ).count(),
-                'total_amount': Invoice.objects.filter(
-                    branch=branch,
-                    invoice_date__range=[start_date, end_date]
-                ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0'),
-                'total_paid': Invoice.objects.filter(
-                    branch=branch,
-                    invoice_date__range=[start_date, end_date]
-                ).aggregate(total=Sum('paid_amount'))['total'] or Decimal('0'),
+                'total_invoices': totals['invoices_count'],
+                'total_amount': totals['invoices_amount'],
+                'total_paid': totals['invoices_paid'],
             },
-            'daily_revenue': list(daily_revenue),
+            'daily_revenue': daily_revenue,
             'revenue_by_doctor': list(revenue_by_doctor),
         }
     
@@ -167,13 +166,22 @@ class ReportService:
             invoice_date__range=[start_date, end_date]
         )
         
-        total_invoices = invoices.count()
-        paid_invoices = invoices.filter(status='PAID').count()
-        partially_paid = invoices.filter(status='PARTIALLY_PAID').count()
-        unpaid_invoices = invoices.filter(status='UNPAID').count()
+        # One query: status buckets and totals
+        stats = conditional_aggregate(
+            invoices,
+            value_buckets('status', ['PAID', 'PARTIALLY_PAID', 'UNPAID']),
+            total_invoices=Count('pk'),
+            total_amount=Sum('total_amount'),
+            paid_amount=Sum('paid_amount'),
+        )
+        
+        total_invoices = stats['total_invoices']
+        paid_invoices = stats['counts']['PAID']
+        partially_paid = stats['counts']['PARTIALLY_PAID']
+        unpaid_invoices = stats['counts']['UNPAID']
         
-        total_amount = invoices.aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-        paid_amount = invoices.aggregate(total=Sum('paid_amount'))['total'] or Decimal('0')
+        total_amount = stats['total_amount'] or Decimal('0')
+        paid_amount = stats['paid_amount'] or Decimal('0')
         
         collection_efficiency = (paid_amount / total_amount * 100) if total_amount > 0 else 0
         
@@ -201,13 +209,18 @@ class ReportService:
         """Generate accounts receivable aging summary"""
         today = timezone.now().date()
         
-        aging_buckets = {
-            'current': {'days': 0, 'amount': Decimal('0')},
-            '1-30': {'days': 30, 'amount': Decimal('0')},
-            '31-60': {'days': 60, 'amount': Decimal('0')},
-            '61-90': {'days': 90, 'amount': Decimal('0')},
-            '90+': {'days': 999, 'amount': Decimal('0')},
+        def overdue_since(days):
+            return today - timedelta(days=days)
+        
+        # Days overdue expressed as due date ranges: one SUM ... FILTER per bucket
+        buckets = {
+            'current': Q(due_date__isnull=True) | Q(due_date__gte=today),
+            '1-30': Q(due_date__lt=today, due_date__gte=overdue_since(30)),
+            '31-60': Q(due_date__lt=overdue_since(30), due_date__gte=overdue_since(60)),
+            '61-90': Q(due_date__lt=overdue_since(60), due_date__gte=overdue_since(90)),
+            '90+': Q(due_date__lt=overdue_since(90)),
         }
+        bucket_days = {'current': 0, '1-30': 30, '31-60': 60, '61-90': 90, '90+': 999}
         
         unpaid_invoices = Invoice.objects.filter(
             branch=branch,
@@ -215,21 +228,12 @@ class ReportService:
             balance_amount__gt=0
         )
         
-        for invoice in unpaid_invoices:
-            days_overdue = (today - invoice.due_date).days if invoice.due_date else 0
-            
-            if days_overdue <= 0:
-                aging_buckets['current']['amount'] += invoice.balance_amount
-            elif days_overdue <= 30:
-                aging_buckets['1-30']['amount'] += invoice.balance_amount
-            elif days_overdue <= 60:
-                aging_buckets['31-60']['amount'] += invoice.balance_amount
-            elif days_overdue <= 90:
-                aging_buckets['61-90']['amount'] += invoice.balance_amount
-            else:
-                aging_buckets['90+']['amount'] += invoice.balance_amount
+        sums = conditional_aggregate(unpaid_invoices, buckets, sum_field='balance_amount')['sums']
         
-        return aging_buckets
+        return {
+            label: {'days': bucket_days[label], 'amount': sums[label] or Decimal('0')}
+            for label in buckets
+        }
     
     @staticmethod
     def _generate_outstanding_summary(start_date, end_date, branch):
@@ -314,31 +318,40 @@ class ReportService:
     @staticmethod
     def _generate_doctor_utilization(start_date, end_date, branch):
         """Generate doctor utilization report"""
-        doctors = Doctor.objects.filter(branch=branch, is_active=True)
+        doctors = Doctor.objects.filter(
+            Q(primary_branch=branch) | Q(secondary_branches=branch),
+            is_active=True
+        ).select_related('user').distinct()
+        
+        # One GROUP BY over visits for all doctors
+        visit_stats = {
+            row['doctor']: row
+            for row in Visit.objects.filter(
+                doctor__in=doctors,
+                scheduled_date__range=[start_date, end_date],
+                status__in=['COMPLETED', 'READY_FOR_BILLING', 'PAID']
+            ).values('doctor').annotate(
+                total_visits=Count('pk'),
+                total_duration=Sum('consultation_duration')
+            ).order_by()
+        }
+        
+        # Calculate available hours (assuming 8 hours/day, 6 days/week)
+        days_in_period = (end_date - start_date).days + 1
+        available_hours = days_in_period * 8 * (6/7)  # 6 working days per week
         
         utilization_data = []
         for doctor in doctors:
-            visits = Visit.objects.filter(
-                doctor=doctor,
-                scheduled_date__range=[start_date, end_date],
-                status__in=['COMPLETED', 'READY_FOR_BILLING', 'PAID']
-            )
-            
-            total_visits = visits.count()
-            total_hours = sum(
-                (v.consultation_duration.total_seconds() / 3600 if v.consultation_duration else 0)
-                for v in visits
-            )
-            
-            # Calculate available hours (assuming 8 hours/day, 6 days/week)
-            days_in_period = (end_date - start_date).days + 1
-            available_hours = days_in_period * 8 * (6/7)  # 6 working days per week
+            stats = visit_stats.get(doctor.id, {})
+            total_visits = stats.get('total_visits', 0)
+            total_duration = stats.get('total_duration')
+            total_hours = total_duration.total_seconds() / 3600 if total_duration else 0
             
             utilization_rate = (total_hours / available_hours * 100) if available_hours > 0 else 0
             
             utilization_data.append({
                 'doctor_id': doctor.id,
-                'doctor_name': f"{doctor.first_name} {doctor.last_name}",
+                'doctor_name': doctor.full_name,
                 'total_visits': total_visits,
                 'total_hours': round(total_hours, 2),
                 'available_hours': round(available_hours, 2),
@@ -375,25 +388,52 @@ class ReportService:
     def _generate_patient_demographics(start_date, end_date, branch):
         """Generate patient demographics report"""
         patients = Patient.objects.filter(
-            branch=branch,
+            registered_branch=branch,
             created_at__date__range=[start_date, end_date]
         )
         
-        # Age groups
-        age_groups = {
-            '0-18': patients.filter(age__range=(0, 18)).count(),
-            '19-30': patients.filter(age__range=(19, 30)).count(),
-            '31-45': patients.filter(age__range=(31, 45)).count(),
-            '46-60': patients.filter(age__range=(46, 60)).count(),
-            '61+': patients.filter(age__gt=60).count(),
+        # Visits per patient, as a correlated subquery
+        visit_counts = Visit.objects.filter(
+            patient=OuterRef('pk')
+        ).order_by().values('patient').annotate(count=Count('pk')).values('count')
+        patients = patients.annotate(
+            visit_count=Subquery(visit_counts, output_field=IntegerField())
+        )
+        
+        # One query: age groups, gender distribution, new vs returning
+        age_ranges = [
+            ('0-18', 0, 18),
+            ('19-30', 19, 30),
+            ('31-45', 31, 45),
+            ('46-60', 46, 60),
+            ('61+', 61, None),
+        ]
+        genders = [code for code, _ in Patient.GENDER_CHOICES] + ['']
+        buckets = {
+            **{('age', label): q for label, q in age_buckets('date_of_birth', age_ranges).items()},
+            **{('gender', code): q for code, q in value_buckets('gender', genders).items()},
         }
+        stats = conditional_aggregate(
+            patients,
+            buckets,
+            total_patients=Count('pk'),
+            returning_patients=Count('pk', filter=Q(visit_count__gt=1)),
+        )
+        counts = stats['counts']
+        
+        # Age groups
+        age_groups = {label: counts[('age', label)] for label, _, _ in age_ranges}
         
         # Gender distribution
-        gender_dist = patients.values('gender').annotate(count=Count('id'))
+        gender_dist = [
+            {'gender': code, 'count': counts[('gender', code)]}
+            for code in genders
+            if counts[('gender', code)]
+        ]
         
         # New vs returning
-        total_patients = patients.count()
-        returning_patients = patients.filter(visits__count__gt=1).distinct().count()
+        total_patients = stats['total_patients']
+        returning_patients = stats['returning_patients']
         new_patients = total_patients - returning_patients
         
         return {
@@ -409,7 +449,7 @@ class ReportService:
                 'returning_patients': returning_patients,
             },
             'age_groups': age_groups,
-            'gender_distribution': list(gender_dist),
+            'gender_distribution': gender_dist,
         }
     
     @staticmethod
@@ -434,15 +474,19 @@ class ReportService:
             appointment_date__range=[start_date, end_date]
         )
         
-        total_appointments = appointments.count()
-        completed = appointments.filter(status='COMPLETED').count()
-        no_show = appointments.filter(status='NO_SHOW').count()
-        cancelled = appointments.filter(status='CANCELLED').count()
+        # One GROUP BY query; totals are folded from the breakdown
+        by_status = grouped_counts(appointments, 'status')
+        
+        total_appointments = sum(by_status.values())
+        completed = by_status.get('COMPLETED', 0)
+        no_show = by_status.get('NO_SHOW', 0)
+        cancelled = by_status.get('CANCELLED', 0)
         
         # Status breakdown
-        status_breakdown = appointments.values('status').annotate(
-            count=Count('id')
-        ).order_by('status')
+        status_breakdown = [
+            {'status': status, 'count': count}
+            for status, count in sorted(by_status.items())
+        ]
         
         # Source breakdown
         source_breakdown = Visit.objects.filter(
@@ -467,7 +511,7 @@ class ReportService:
                 'completion_rate': (completed / total_appointments * 100) if total_appointments > 0 else 0,
                 'no_show_rate': (no_show / total_appointments * 100) if total_appointments > 0 else 0,
             },
-            'status_breakdown': list(status_breakdown),
+            'status_breakdown': status_breakdown,
             'source_breakdown': list(source_breakdown),
         }
     
@@ -481,7 +525,14 @@ class ReportService:
             wait_duration__isnull=False
         )
         
-        total_visits = visits.count()
+        # One aggregate for the summary, one histogram pass for the distribution
+        stats = visits.aggregate(
+            total_visits=Count('pk'),
+            avg_wait=Avg('wait_duration'),
+            max_wait=Max('wait_duration'),
+            min_wait=Min('wait_duration'),
+        )
+        total_visits = stats['total_visits']
         
         if total_visits == 0:
             return {
@@ -500,25 +551,17 @@ class ReportService:
                 'wait_time_distribution': {},
             }
         
-        # Calculate wait times in minutes
-        wait_times = []
-        for visit in visits:
-            if visit.wait_duration:
-                wait_minutes = visit.wait_duration.total_seconds() / 60
-                wait_times.append(wait_minutes)
-        
-        avg_wait = sum(wait_times) / len(wait_times)
-        max_wait = max(wait_times)
-        min_wait = min(wait_times)
-        
-        # Distribution
-        distribution = {
-            '0-15 min': len([t for t in wait_times if t <= 15]),
-            '16-30 min': len([t for t in wait_times if 16 <= t <= 30]),
-            '31-45 min': len([t for t in wait_times if 31 <= t <= 45]),
-            '46-60 min': len([t for t in wait_times if 46 <= t <= 60]),
-            '60+ min': len([t for t in wait_times if t > 60]),
-        }
+        # Wait times in minutes
+        avg_wait = stats['avg_wait'].total_seconds() / 60
+        max_wait = stats['max_wait'].total_seconds() / 60
+        min_wait = stats['min_wait'].total_seconds() / 60
+        
+        # Distribution: 15 minute bins up to an hour
+        histogram = duration_histogram(visits, 'wait_duration', bin_minutes=15, max_minutes=60)
+        distribution = dict(zip(
+            ['0-15 min', '15-30 min', '30-45 min', '45-60 min', '60+ min'],
+            histogram
+        ))
         
         return {
             'report_type': 'patient_wait_times',
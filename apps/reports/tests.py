@@ -1,3 +1,190 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.accounts.models import User
+from apps.billing.models import Invoice
+from apps.clinics.models import Branch, Clinic
+from apps.doctors.models import Doctor
+from apps.patients.models import Patient
+from apps.visits.models import Appointment, Visit
+
+from .aggregation import age_buckets, conditional_aggregate, grouped_counts, value_buckets
+from .services import ReportService
+from .views import ReportStatisticsAPIView
+
+
+class ReportQueryCountTests(TestCase):
+    """
+    Report generators answer from a fixed number of queries,
+    whatever the number of rows or buckets.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date.today()
+        clinic = Clinic.objects.create(name="Clinic")
+        cls.branch = Branch.objects.create(
+            clinic=clinic, name="Main", code="MAIN", address="Street 1",
+            phone="0100000000", opening_time=time(9), closing_time=time(17),
+        )
+
+        doctor_user = User.objects.create_user(email="doctor@example.com", password="x")
+        cls.doctor = Doctor.objects.create(
+            user=doctor_user,
+            specialization=Doctor._meta.get_field('specialization').choices[0][0],
+            license_number="LIC-1",
+            license_expiry=date(2030, 1, 1),
+            primary_branch=cls.branch,
+        )
+
+        cls.patients = []
+        # Ages 10, 35, 75 and unknown
+        people = [(10, 'M'), (35, 'F'), (75, 'F'), (None, '')]
+        for index, (age, gender) in enumerate(people):
+            birth_date = date(cls.today.year - age, 1, 1) if age is not None else None
+            user = User.objects.create_user(email=f"patient{index}@example.com", password="x")
+            patient = Patient.objects.create(
+                user=user, registered_branch=cls.branch,
+                date_of_birth=birth_date, gender=gender,
+            )
+            cls.patients.append(patient)
+            Invoice.objects.create(branch=cls.branch, patient=patient, subtotal=Decimal('100'))
+
+        # First patient returns
+        for _ in range(2):
+            Visit.objects.create(
+                patient=cls.patients[0], branch=cls.branch, doctor=cls.doctor,
+                scheduled_date=cls.today, scheduled_time=time(10),
+            )
+
+        for status, start in [('COMPLETED', 9), ('COMPLETED', 10), ('NO_SHOW', 11), ('CANCELLED', 12)]:
+            Appointment.objects.create(
+                patient=cls.patients[1], doctor=cls.doctor, branch=cls.branch,
+                appointment_date=cls.today, start_time=time(start), end_time=time(start, 30),
+                status=status,
+            )
+
+    def period(self):
+        return self.today - timedelta(days=1), self.today
+
+    def test_collection_efficiency(self):
+        # Status counts and totals, then the aging summary
+        with self.assertNumQueries(2):
+            report = ReportService._generate_collection_efficiency(*self.period(), self.branch)
+        self.assertEqual(report['summary']['total_invoices'], 4)
+        self.assertEqual(
+            report['summary']['unpaid_invoices'],
+            Invoice.objects.filter(branch=self.branch, status='UNPAID').count(),
+        )
+
+    def test_patient_demographics(self):
+        with self.assertNumQueries(1):
+            report = ReportService._generate_patient_demographics(*self.period(), self.branch)
+        self.assertEqual(report['summary']['total_patients'], 4)
+        self.assertEqual(report['summary']['returning_patients'], 1)
+        self.assertEqual(report['age_groups']['0-18'], 1)
+        self.assertEqual(report['age_groups']['61+'], 1)
+        self.assertEqual(
+            {row['gender']: row['count'] for row in report['gender_distribution']},
+            {'M': 1, 'F': 2, '': 1},
+        )
+
+    def test_appointment_statistics(self):
+        # Status breakdown, then the visit source breakdown
+        with self.assertNumQueries(2):
+            report = ReportService._generate_appointment_statistics(*self.period(), self.branch)
+        self.assertEqual(report['summary']['total_appointments'], 4)
+        self.assertEqual(report['summary']['completed'], 2)
+        self.assertEqual(report['summary']['no_show'], 1)
+        self.assertEqual(report['summary']['cancelled'], 1)
+
+    def test_wait_times(self):
+        # Bins are half-open: a 15 minute wait belongs to '15-30 min'
+        now = timezone.now()
+        for minutes in [0, 14, 15, 30, 59, 60, 90]:
+            visit = Visit.objects.create(
+                patient=self.patients[2], branch=self.branch, doctor=self.doctor,
+                scheduled_date=self.today, scheduled_time=time(10),
+            )
+            Visit.objects.filter(pk=visit.pk).update(
+                actual_checkin=now, wait_duration=timedelta(minutes=minutes)
+            )
+
+        # Summary aggregate, then one histogram pass
+        with self.assertNumQueries(2):
+            report = ReportService._generate_wait_times(*self.period(), self.branch)
+        self.assertEqual(report['summary']['total_visits'], 7)
+        self.assertEqual(report['wait_time_distribution'], {
+            '0-15 min': 2,
+            '15-30 min': 1,
+            '30-45 min': 1,
+            '45-60 min': 1,
+            '60+ min': 2,
+        })
+
+    def test_report_statistics(self):
+        admin = User.objects.create_superuser(email="admin@example.com", password="x")
+        request = APIRequestFactory().get('/api/reports/statistics/')
+        force_authenticate(request, user=admin)
+
+        # Template, schedule and dashboard counts, one aggregate for
+        # every generated-report counter, recent reports, top templates
+        with self.assertNumQueries(6):
+            response = ReportStatisticsAPIView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_generated'], 0)
+        self.assertEqual(
+            response.data['generation_status'],
+            {'completed': 0, 'failed': 0, 'pending': 0, 'cancelled': 0},
+        )
+
+
+class AggregationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        clinic = Clinic.objects.create(name="Clinic")
+        cls.branch = Branch.objects.create(
+            clinic=clinic, name="Main", code="MAIN", address="Street 1",
+            phone="0100000000", opening_time=time(9), closing_time=time(17),
+        )
+        # Ages 10, 30, 50, 70
+        for index, gender in enumerate(['M', 'F', 'F', 'O']):
+            user = User.objects.create_user(email=f"patient{index}@example.com", password="x")
+            Patient.objects.create(
+                user=user, registered_branch=cls.branch,
+                date_of_birth=date(date.today().year - 10 - index * 20, 1, 1), gender=gender,
+            )
+
+    def test_conditional_aggregate_is_one_query(self):
+        patients = Patient.objects.filter(registered_branch=self.branch)
+        buckets = {
+            **value_buckets('gender', ['M', 'F', 'O', 'U']),
+            **age_buckets('date_of_birth', [('young', 0, 30), ('old', 31, None)]),
+        }
+        with self.assertNumQueries(1):
+            stats = conditional_aggregate(patients, buckets, total=Count('pk'))
+        self.assertEqual(stats['total'], 4)
+        self.assertEqual(stats['counts']['F'], 2)
+        self.assertEqual(stats['counts']['U'], 0)
+        self.assertEqual(stats['counts']['young'], 2)
+        self.assertEqual(stats['counts']['old'], 2)
+
+    def test_conditional_aggregate_sums(self):
+        patients = Patient.objects.filter(registered_branch=self.branch)
+        with self.assertNumQueries(1):
+            stats = conditional_aggregate(patients, {'female': Q(gender='F')}, sum_field='pk')
+        self.assertEqual(
+            stats['sums']['female'],
+            sum(patients.filter(gender='F').values_list('pk', flat=True)),
+        )
 
-# Create your tests here.
+    def test_grouped_counts(self):
+        with self.assertNumQueries(1):
+            counts = grouped_counts(Patient.objects.filter(registered_branch=self.branch), 'gender')
+        self.assertEqual(counts, {'M': 1, 'F': 2, 'O': 1})
@@ -35,6 +35,7 @@ from .serializers import (
     DashboardCloneSerializer, ReportStatsSerializer,
     BranchPerformanceSerializer, FinancialSummarySerializer
 )
+from .aggregation import conditional_aggregate
 from .services import ReportService
 from apps.audit.services import log_action
 
@@ -1119,19 +1120,31 @@ class ReportStatisticsAPIView(APIView):
         
         # Calculate statistics
         total_templates = templates.count()
-        total_generated = reports.count()
         total_scheduled = schedules.count()
         total_dashboards = dashboards.count()
         
-        completed_reports = reports.filter(status=GeneratedReport.COMPLETED).count()
+        # One query for all generated report counters
+        report_stats = conditional_aggregate(
+            reports,
+            {
+                'completed': Q(status=GeneratedReport.COMPLETED),
+                'failed': Q(status=GeneratedReport.FAILED),
+                'pending': Q(status__in=[GeneratedReport.PENDING, GeneratedReport.PROCESSING]),
+                'cancelled': Q(status=GeneratedReport.CANCELLED),
+            },
+            total_generated=Count('pk'),
+            avg_time=Avg(
+                'generation_duration',
+                filter=Q(generation_duration__isnull=False, status=GeneratedReport.COMPLETED)
+            ),
+        )
+        status_counts = report_stats['counts']
+        
+        total_generated = report_stats['total_generated']
+        completed_reports = status_counts['completed']
         success_rate = (completed_reports / total_generated * 100) if total_generated > 0 else 0
         
-        avg_generation_time = reports.filter(
-            generation_duration__isnull=False,
-            status=GeneratedReport.COMPLETED
-        ).aggregate(
-            avg_time=Avg('generation_duration')
-        )['avg_time'] or timedelta(0)
+        avg_generation_time = report_stats['avg_time'] or timedelta(0)
         
         # Recent reports
         recent_reports = reports.order_by('-generated_at')[:10]
@@ -1154,12 +1167,7 @@ class ReportStatisticsAPIView(APIView):
             'avg_generation_time_seconds': avg_generation_time.total_seconds(),
             'recent_reports': recent_serializer.data,
             'top_templates': list(top_templates),
-            'generation_status': {
-                'completed': completed_reports,
-                'failed': reports.filter(status=GeneratedReport.FAILED).count(),
-                'pending': reports.filter(status__in=[GeneratedReport.PENDING, GeneratedReport.PROCESSING]).count(),
-                'cancelled': reports.filter(status=GeneratedReport.CANCELLED).count(),
-            }
+            'generation_status': status_counts
         }
         
         return Response(data)
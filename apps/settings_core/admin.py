@@ -10,7 +10,8 @@ from .models import (
     SystemSetting, BranchSetting, ClinicConfiguration,
     Holiday, TaxConfiguration, SMSConfiguration,
     EmailConfiguration, NotificationTemplate,
-    RolePermission, BackupConfiguration, AuditLogConfiguration
+    RolePermission, BackupConfiguration, AuditLogConfiguration,
+    DocumentSequence
 )
 
 
@@ -564,4 +565,17 @@ class AuditLogConfigurationAdmin(admin.ModelAdmin):
         # Filter by user's branch
         if hasattr(request.user, 'branch'):
             return qs.filter(branch=request.user.branch)
-        return qs.none()
\ No newline at end of file
+        return qs.none()
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ('key', 'last_value', 'updated_at')
+    search_fields = ('key',)
+    readonly_fields = ('key', 'last_value', 'created_at', 'updated_at')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -6,4 +6,10 @@ class SettingsCoreConfig(AppConfig):
     verbose_name = 'System Settings'
     
     def ready(self):
-        import apps.settings_core.signals
\ No newline at end of file
+        import apps.settings_core.signals
+        
+        from django.conf import settings
+        if getattr(settings, 'SETTINGS_PRELOAD', False):
+            from django.core.signals import request_started
+            from .bundles import preload_on_first_request
+            request_started.connect(preload_on_first_request, dispatch_uid='settings_core_preload')
\ No newline at end of file
@@ -0,0 +1,233 @@
+# apps/settings_core/bundles.py
+"""
+Two-level cache of settings bundles.
+
+A bundle holds everything SettingsService reads for one scope:
+
+- system scope: all SystemSetting values
+- branch scope: overriding BranchSetting values, the
+  ClinicConfiguration, active TaxConfigurations (by code), active
+  NotificationTemplates (by trigger) and the compiled HolidayCalendar
+
+Level 1 is a process-local LRU, level 2 the shared Django cache. Each
+scope has a version stamp in the shared cache; save / delete signals
+replace it (see signals.py), which retires the bundle everywhere. A
+process trusts its local copy for SETTINGS_LOCAL_TTL seconds and then
+revalidates the stamp with one cache read.
+
+The shared level needs a cache shared by all processes
+(core.cache.shared_cache). With a per-process cache a stamp replaced by
+one worker would never reach the others, so only level 1 is used and
+bundles are rebuilt once their local copy is SETTINGS_LOCAL_TTL old.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import shared_cache
+
+
+SYSTEM_SCOPE = "system"
+
+VERSION_KEY = "settings:version:{scope}"
+BUNDLE_KEY = "settings:bundle:{scope}:{version}"
+
+DEFAULT_LOCAL_TTL = 5
+DEFAULT_LOCAL_SIZE = 256
+DEFAULT_SHARED_TIMEOUT = 60 * 60
+
+
+def scope_for(branch) -> str:
+    if branch is None:
+        return SYSTEM_SCOPE
+    return f"branch:{getattr(branch, 'pk', branch)}"
+
+
+# ======================================================
+# VERSION STAMPS
+# ======================================================
+
+def _new_version() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def _current_version(scope: str) -> str:
+    key = VERSION_KEY.format(scope=scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_settings(branch_id=None):
+    """
+    Retire the bundle of one branch, or the system bundle if None.
+    """
+    scope = scope_for(branch_id)
+    cache.set(VERSION_KEY.format(scope=scope), _new_version(), None)
+    local_bundles.discard(scope)
+
+
+# ======================================================
+# BUNDLE BUILDERS
+# ======================================================
+
+def build_system_bundle() -> Dict[str, Any]:
+    from .models import SystemSetting
+
+    return {
+        "settings": {
+            setting.key: setting.get_value()
+            for setting in SystemSetting.objects.all()
+        },
+    }
+
+
+def build_branch_bundle(branch_id) -> Dict[str, Any]:
+    from .holidays import HolidayCalendar
+    from .models import BranchSetting, ClinicConfiguration, Holiday, NotificationTemplate, TaxConfiguration
+
+    templates = {}
+    for template in NotificationTemplate.objects.filter(branch_id=branch_id, is_active=True):
+        templates.setdefault(template.trigger, template)
+
+    return {
+        "settings": {
+            setting.key: setting.get_value()
+            for setting in BranchSetting.objects.filter(branch_id=branch_id, override_system=True)
+        },
+        "clinic_configuration": ClinicConfiguration.objects.filter(branch_id=branch_id).first(),
+        "taxes": {
+            tax.code: tax
+            for tax in TaxConfiguration.objects.filter(branch_id=branch_id, is_active=True)
+        },
+        "templates": templates,
+        "holidays": HolidayCalendar(
+            Holiday.objects.filter(branch_id=branch_id).only("date", "is_recurring")
+        ),
+    }
+
+
+def _build(scope: str) -> Dict[str, Any]:
+    if scope == SYSTEM_SCOPE:
+        return build_system_bundle()
+    return build_branch_bundle(scope.split(":", 1)[1])
+
+
+# ======================================================
+# LEVEL 1: PROCESS-LOCAL LRU
+# ======================================================
+
+class LocalBundleCache:
+    """Thread-safe LRU of scope -> (version, checked_at, bundle)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, scope: str):
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry is not None:
+                self._entries.move_to_end(scope)
+            return entry
+
+    def put(self, scope: str, version: str, bundle: Dict[str, Any]):
+        max_size = getattr(settings, "SETTINGS_LOCAL_SIZE", DEFAULT_LOCAL_SIZE)
+        with self._lock:
+            self._entries[scope] = (version, time.monotonic(), bundle)
+            self._entries.move_to_end(scope)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, scope: str):
+        with self._lock:
+            self._entries.pop(scope, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_bundles = LocalBundleCache()
+
+
+# ======================================================
+# READ
+# ======================================================
+
+def get_bundle(branch=None) -> Dict[str, Any]:
+    """
+    Settings bundle for branch (system bundle if None).
+    """
+    scope = scope_for(branch)
+    local_ttl = getattr(settings, "SETTINGS_LOCAL_TTL", DEFAULT_LOCAL_TTL)
+
+    entry = local_bundles.get(scope)
+    if entry is not None and time.monotonic() - entry[1] < local_ttl:
+        return entry[2]
+
+    if not shared_cache():
+        bundle = _build(scope)
+        local_bundles.put(scope, None, bundle)
+        return bundle
+
+    version = _current_version(scope)
+    if entry is not None and entry[0] == version:
+        local_bundles.put(scope, version, entry[2])
+        return entry[2]
+
+    key = BUNDLE_KEY.format(scope=scope, version=version)
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = _build(scope)
+        cache.set(
+            key,
+            bundle,
+            getattr(settings, "SETTINGS_SHARED_TIMEOUT", DEFAULT_SHARED_TIMEOUT),
+        )
+
+    local_bundles.put(scope, version, bundle)
+    return bundle
+
+
+def preload_settings(branches=None) -> int:
+    """
+    Warm both levels for the system scope and every active branch
+    (or the given branches). Returns the number of bundles loaded.
+    """
+    if branches is None:
+        from apps.clinics.models import Branch
+        branches = Branch.objects.filter(is_active=True).values_list("pk", flat=True)
+
+    get_bundle(None)
+    count = 1
+    for branch in branches:
+        get_bundle(branch)
+        count += 1
+    return count
+
+
+_preload_lock = threading.Lock()
+_preloaded = False
+
+
+def preload_on_first_request(sender=None, **kwargs):
+    """
+    request_started receiver used when SETTINGS_PRELOAD is enabled:
+    warms the caches once per process, before the first request runs.
+    """
+    global _preloaded
+    if _preloaded:
+        return
+    with _preload_lock:
+        if not _preloaded:
+            _preloaded = True
+            preload_settings()
@@ -0,0 +1,87 @@
+# apps/settings_core/holidays.py
+"""
+Per-branch holiday calendar index.
+
+Holiday rows are compiled once into:
+
+- sorted, merged [start, end] ordinal intervals for one-off holidays
+- a sorted list of month * 100 + day codes for recurring holidays
+
+so a date check is two binary searches instead of a scan over every
+Holiday row. The compiled calendar lives in the branch settings bundle
+(see bundles.py) and is rebuilt when a Holiday changes.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Iterable, List
+
+
+# date.weekday() -> ClinicConfiguration day code
+WEEKDAY_CODES = ('MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN')
+
+
+class HolidayCalendar:
+    """Compact, picklable holiday index for one branch"""
+
+    __slots__ = ('starts', 'ends', 'recurring')
+
+    def __init__(self, holidays: Iterable):
+        ordinals = []
+        recurring = set()
+        for holiday in holidays:
+            if holiday.is_recurring:
+                recurring.add(holiday.date.month * 100 + holiday.date.day)
+            else:
+                ordinals.append(holiday.date.toordinal())
+
+        # Merge consecutive days into intervals
+        starts: List[int] = []
+        ends: List[int] = []
+        for ordinal in sorted(set(ordinals)):
+            if ends and ordinal == ends[-1] + 1:
+                ends[-1] = ordinal
+            else:
+                starts.append(ordinal)
+                ends.append(ordinal)
+
+        self.starts = starts
+        self.ends = ends
+        self.recurring = sorted(recurring)
+
+    def __getstate__(self):
+        return (self.starts, self.ends, self.recurring)
+
+    def __setstate__(self, state):
+        self.starts, self.ends, self.recurring = state
+
+    def is_holiday(self, check_date: date) -> bool:
+        code = check_date.month * 100 + check_date.day
+        index = bisect_left(self.recurring, code)
+        if index < len(self.recurring) and self.recurring[index] == code:
+            return True
+
+        ordinal = check_date.toordinal()
+        index = bisect_right(self.starts, ordinal) - 1
+        return index >= 0 and ordinal <= self.ends[index]
+
+
+def is_working_day(calendar: HolidayCalendar, working_days: Iterable[str], check_date: date) -> bool:
+    return (
+        WEEKDAY_CODES[check_date.weekday()] in working_days
+        and not calendar.is_holiday(check_date)
+    )
+
+
+def working_days_between(calendar: HolidayCalendar, working_days: Iterable[str], start: date, end: date) -> List[date]:
+    """
+    Working dates from start to end (inclusive), in order.
+    """
+    working_days = set(working_days)
+    days = []
+    current = start
+    while current <= end:
+        if is_working_day(calendar, working_days, current):
+            days.append(current)
+        current += timedelta(days=1)
+    return days
@@ -1005,4 +1005,21 @@ class AuditLogConfiguration(BaseAppModel):
         ]
     
     def __str__(self):
-        return f"Audit Log Config - {self.branch}"
\ No newline at end of file
+        return f"Audit Log Config - {self.branch}"
+
+class DocumentSequence(BaseModel):
+    """
+    Counter row behind one document number series (e.g. INV-202601).
+
+    Rows are locked while a number is allocated, so concurrent inserts
+    queue on the counter instead of racing on the unique column.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "Document Sequence"
+        verbose_name_plural = "Document Sequences"
+    
+    def __str__(self):
+        return f"{self.key}: {self.last_value}"
@@ -4,6 +4,10 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+import copy
+
+from .bundles import get_bundle
+from .holidays import is_working_day, working_days_between
 from .models import (
     SystemSetting, BranchSetting, ClinicConfiguration,
     Holiday, TaxConfiguration, NotificationTemplate
@@ -18,15 +22,28 @@ class SettingsService:
     def get_setting(key, branch=None, default=None):
         """
         Get a setting value with branch override support
+        (served from the cached settings bundles)
         """
-        if branch:
-            # Try branch setting first
-            value = BranchSetting.get_branch_setting(branch, key, None)
-            if value is not None:
-                return value
+        return SettingsService.get_settings([key], branch, {key: default})[key]
+    
+    @staticmethod
+    def get_settings(keys, branch=None, defaults=None):
+        """
+        Get several setting values at once: {key: value}.
+        Branch overrides win over system values; defaults is an
+        optional {key: default} mapping.
+        """
+        defaults = defaults or {}
+        system_values = get_bundle(None)['settings']
+        branch_values = get_bundle(branch)['settings'] if branch else {}
         
-        # Fall back to system setting
-        return SystemSetting.get_setting(key, default)
+        values = {}
+        for key in keys:
+            value = branch_values.get(key)
+            if value is None:
+                value = system_values.get(key)
+            values[key] = value if value is not None else defaults.get(key)
+        return values
     
     @staticmethod
     def set_setting(key, value, branch=None, user=None, override_system=True):
@@ -46,21 +63,22 @@ class SettingsService:
     @staticmethod
     def get_clinic_configuration(branch):
         """
-        Get clinic configuration for a branch
+        Get clinic configuration for a branch.
+        Branches without one get an unsaved default configuration;
+        reads never write.
         """
-        try:
-            return ClinicConfiguration.objects.get(branch=branch)
-        except ClinicConfiguration.DoesNotExist:
-            # Create default configuration
-            return ClinicConfiguration.objects.create(
-                branch=branch,
-                clinic_name=f"{branch.name} Dental Clinic",
-                clinic_address=branch.address if hasattr(branch, 'address') else "",
-                clinic_phone=branch.phone if hasattr(branch, 'phone') else "",
-                clinic_email=branch.email if hasattr(branch, 'email') else "",
-                created_by=None,  # Will be set by system
-                updated_by=None
-            )
+        config = get_bundle(branch)['clinic_configuration']
+        if config is not None:
+            # Callers may modify it; keep the cached instance intact
+            return copy.copy(config)
+        
+        return ClinicConfiguration(
+            branch=branch,
+            clinic_name=f"{branch.name} Dental Clinic",
+            clinic_address=branch.address if hasattr(branch, 'address') else "",
+            clinic_phone=branch.phone if hasattr(branch, 'phone') else "",
+            clinic_email=branch.email if hasattr(branch, 'email') else "",
+        )
     
     @staticmethod
     def is_working_day(branch, date):
@@ -69,14 +87,16 @@ class SettingsService:
         """
         config = SettingsService.get_clinic_configuration(branch)
         
-        # Check if it's a holiday
-        holidays = Holiday.objects.filter(branch=branch)
-        for holiday in holidays:
-            if holiday.is_holiday(date):
-                return False
-        
-        # Check if it's a working day
-        return config.is_working_day(date)
+        # Holiday index lookup, O(log n)
+        return is_working_day(get_bundle(branch)['holidays'], config.working_days, date)
+    
+    @staticmethod
+    def working_days(branch, start, end):
+        """
+        Working dates of a branch from start to end (inclusive)
+        """
+        config = SettingsService.get_clinic_configuration(branch)
+        return working_days_between(get_bundle(branch)['holidays'], config.working_days, start, end)
     
     @staticmethod
     def get_working_hours(branch, date=None):
@@ -96,13 +116,15 @@ class SettingsService:
                 config = SettingsService.get_clinic_configuration(branch)
                 tax_rate = config.default_tax_rate
             else:
-                tax_config = TaxConfiguration.objects.get(
-                    branch=branch,
-                    code=tax_type,
-                    is_active=True,
-                    applicable_from__lte=timezone.now().date(),
-                    applicable_to__gte=timezone.now().date()
-                )
+                today = timezone.now().date()
+                tax_config = get_bundle(branch)['taxes'].get(tax_type)
+                if (
+                    tax_config is None
+                    or tax_config.applicable_from > today
+                    or tax_config.applicable_to is None
+                    or tax_config.applicable_to < today
+                ):
+                    raise TaxConfiguration.DoesNotExist
                 tax_rate = tax_config.rate
             
             return (amount * tax_rate) / Decimal('100.00')
@@ -115,23 +137,9 @@ class SettingsService:
         """
         Get notification template for a trigger
         """
-        try:
-            # Try branch-specific template
-            return NotificationTemplate.objects.get(
-                branch=branch,
-                trigger=trigger,
-                is_active=True
-            )
-        except NotificationTemplate.DoesNotExist:
-            # Try system-wide template (branch=None)
-            try:
-                return NotificationTemplate.objects.get(
-                    branch=None,
-                    trigger=trigger,
-                    is_active=True
-                )
-            except NotificationTemplate.DoesNotExist:
-                return None
+        # Branch-specific template; system-wide templates (branch=None)
+        # cannot be stored, branch being required on NotificationTemplate
+        return get_bundle(branch)['templates'].get(trigger) if branch else None
     
     @staticmethod
     def render_notification(template, context, notification_type=None):
@@ -147,9 +155,13 @@ class SettingsService:
     def get_available_time_slots(branch, date, doctor=None, duration=30):
         """
         Get available time slots for appointments
+        (one bookings query, overlap counts by interval sweep)
         """
+        from apps.clinics.services.slot_engine import (
+            BOOKED_STATUSES, count_bookings_per_slot, lay_out_slots,
+            subtract_intervals, to_minutes, to_time,
+        )
         from apps.visits.models import Appointment
-        from datetime import datetime, time
         
         config = SettingsService.get_clinic_configuration(branch)
         
@@ -158,38 +170,30 @@ class SettingsService:
         
         working_hours = SettingsService.get_working_hours(branch, date)
         
-        # Convert times to datetime objects for calculation
-        start_dt = datetime.combine(date, working_hours['opening_time'])
-        end_dt = datetime.combine(date, working_hours['closing_time'])
+        # Working hours minus lunch break, in minutes since midnight
+        windows = subtract_intervals(
+            [(to_minutes(working_hours['opening_time']), to_minutes(working_hours['closing_time']))],
+            [(to_minutes(config.lunch_start), to_minutes(config.lunch_end))],
+        )
+        slots = lay_out_slots(windows, duration, step=config.buffer_time + duration)
         
-        # Generate time slots
-        slots = []
-        current = start_dt
+        appointments = Appointment.objects.filter(
+            branch=branch,
+            appointment_date=date,
+            status__in=BOOKED_STATUSES
+        )
+        if doctor:
+            appointments = appointments.filter(doctor=doctor)
         
-        while current + timedelta(minutes=duration) <= end_dt:
-            # Check lunch break
-            lunch_start = datetime.combine(date, config.lunch_start)
-            lunch_end = datetime.combine(date, config.lunch_end)
-            
-            if not (lunch_start <= current < lunch_end):
-                # Check if slot is available
-                appointments = Appointment.objects.filter(
-                    branch=branch,
-                    appointment_date=date,
-                    start_time__lt=current.time(),
-                    end_time__gt=current.time(),
-                    status__in=['SCHEDULED', 'CONFIRMED']
-                )
-                
-                if doctor:
-                    appointments = appointments.filter(doctor=doctor)
-                
-                if appointments.count() < config.max_appointments_per_slot:
-                    slots.append(current.time())
-            
-            current += timedelta(minutes=config.buffer_time + duration)
+        booked = count_bookings_per_slot(
+            appointments.values_list('start_time', 'end_time'), slots
+        )
         
-        return slots
+        return [
+            to_time(start)
+            for (start, _), count in zip(slots, booked)
+            if count < config.max_appointments_per_slot
+        ]
     
     @staticmethod
     def initialize_default_settings():
@@ -1,12 +1,13 @@
 # apps/settings_core/signals.py
 
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
-from django.core.cache import cache
 import logging
 
 from apps.audit.models import AuditLog
+from .bundles import invalidate_settings
 from .models import (
     SystemSetting, BranchSetting, ClinicConfiguration,
     Holiday, TaxConfiguration, NotificationTemplate,
@@ -15,22 +16,14 @@ from .models import (
 
 logger = logging.getLogger(__name__)
 
-# Cache keys
-SETTINGS_CACHE_PREFIX = 'settings:'
-SYSTEM_SETTINGS_CACHE_KEY = 'system_settings_all'
-BRANCH_SETTINGS_CACHE_PREFIX = 'branch_settings:'
-
 
 def clear_settings_cache(branch_id=None):
-    """Clear settings cache"""
-    cache.delete(SYSTEM_SETTINGS_CACHE_KEY)
-    
-    if branch_id:
-        cache_key = f"{BRANCH_SETTINGS_CACHE_PREFIX}{branch_id}"
-        cache.delete(cache_key)
-    else:
-        # Clear all branch settings cache
-        cache.delete_pattern(f"{BRANCH_SETTINGS_CACHE_PREFIX}*")
+    """
+    Clear settings cache (retires the cached settings bundle). Done
+    after commit, so no process rebuilds the old rows under the new
+    version.
+    """
+    transaction.on_commit(lambda: invalidate_settings(branch_id))
 
 
 @receiver(post_save, sender=SystemSetting)
@@ -297,4 +290,14 @@ def branch_setting_deleted(sender, instance, **kwargs):
         },
         ip_address=None,
         user_agent=None
-    )
\ No newline at end of file
+    )
+
+
+@receiver(post_save, sender=NotificationTemplate)
+@receiver(post_delete, sender=ClinicConfiguration)
+@receiver(post_delete, sender=Holiday)
+@receiver(post_delete, sender=TaxConfiguration)
+@receiver(post_delete, sender=NotificationTemplate)
+def branch_bundle_changed(sender, instance, **kwargs):
+    """Retire the branch settings bundle"""
+    clear_settings_cache(instance.branch_id)
@@ -292,7 +292,7 @@
 
 
 # apps/treatments/models.py
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from core.mixins.audit_fields import AuditFieldsMixin
 from core.mixins.soft_delete import SoftDeleteMixin
@@ -694,6 +694,7 @@ class TreatmentPlan(AuditFieldsMixin, SoftDeleteMixin, models.Model):
     def __str__(self):
         return f"Plan {self.plan_id}: {self.name} ({self.get_status_display()})"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if not self.plan_id:
             self.plan_id = self._generate_plan_id()
@@ -707,21 +708,14 @@ class TreatmentPlan(AuditFieldsMixin, SoftDeleteMixin, models.Model):
     def _generate_plan_id(self):
         """Generate TP-YYYYMM-XXXX format ID"""
         from datetime import datetime
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
-        today = datetime.now()
-        year_month = today.strftime('%Y%m')
+        year_month = datetime.now().strftime('%Y%m')
         
-        last_plan = TreatmentPlan.objects.filter(
-            plan_id__startswith=f'TP-{year_month}-'
-        ).order_by('plan_id').last()
-        
-        if last_plan:
-            last_num = int(last_plan.plan_id.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        
-        return f'TP-{year_month}-{new_num:04d}'
+        return next_document_number(
+            'TP', year_month,
+            seed=lambda: last_used_number(TreatmentPlan.objects, 'plan_id', f'TP-{year_month}-'),
+        )
     
     @property
     def balance_amount(self):
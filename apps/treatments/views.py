@@ -19,6 +19,8 @@ import json
 from core.permissions import *
 from core.constants import UserRoles
 from core.utils.excel_export import export_to_excel
+from core.counters import counter_value, hot_counters
+from apps.patients.search import search_patients
 from .models import (
     TreatmentCategory, Treatment, ToothChart,
     TreatmentPlan, TreatmentPlanItem, TreatmentNote,
@@ -88,11 +90,7 @@ class TreatmentPlanFilter(django_filters.FilterSet):
         ]
     
     def filter_patient_name(self, queryset, name, value):
-        return queryset.filter(
-            Q(patient__user__first_name__icontains=value) |
-            Q(patient__user__last_name__icontains=value) |
-            Q(patient__user__full_name__icontains=value)
-        )
+        return search_patients(queryset, value, prefix='patient__')
     
     def filter_doctor_name(self, queryset, name, value):
         return queryset.filter(
@@ -280,12 +278,11 @@ class TreatmentViewSet(viewsets.ModelViewSet):
     def increment_popularity(self, request, pk=None):
         """Increment treatment popularity score"""
         treatment = self.get_object()
-        treatment.popularity_score += 1
-        treatment.save()
+        hot_counters.add(Treatment, treatment.pk, popularity_score=1)
         
         return Response({
             'message': 'Popularity score updated',
-            'popularity_score': treatment.popularity_score
+            'popularity_score': counter_value(treatment, 'popularity_score')
         })
 
 
@@ -0,0 +1,128 @@
+# apps/visits/management/commands/benchmark_wait_estimator.py
+
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.visits.models import Visit
+from apps.visits.wait_estimator import (
+    DEFAULT_MINUTES, MIN_REMAINING_MINUTES, DurationStats, WaitEstimator,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Backtest the queue wait estimator over completed visits: each visit is "
+        "predicted at check-in from the visits completed before it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="Completed visits of the last N days.")
+        parser.add_argument("--branch", type=int, default=None, help="Only visits of this branch.")
+        parser.add_argument("--queue", type=int, default=100, help="Queue length for the timing run.")
+
+    def handle(self, *args, **options):
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1")
+
+        visits = Visit.objects.filter(
+            actual_checkout__gte=timezone.now() - timedelta(days=options["days"]),
+            actual_checkin__isnull=False,
+            consultation_duration__isnull=False,
+            doctor__isnull=False,
+        )
+        if options["branch"]:
+            visits = visits.filter(branch_id=options["branch"])
+
+        rows = []
+        for doctor_id, checkin, checkout, duration in visits.values_list(
+            'doctor_id', 'actual_checkin', 'actual_checkout', 'consultation_duration'
+        ).iterator():
+            minutes = duration.total_seconds() / 60
+            if minutes > 0 and checkout - duration >= checkin:
+                rows.append((doctor_id, timezone.localtime(checkin), checkout, minutes))
+        if not rows:
+            raise CommandError("No completed visits with check-in and consultation times")
+
+        by_checkin = sorted(rows, key=lambda row: row[1])
+        by_checkout = sorted(rows, key=lambda row: row[2])
+
+        stats = DurationStats()
+        trained = 0
+        active = {}  # doctor -> visits checked in and not checked out
+        duration_errors = {"static": 0.0, "estimator": 0.0}
+        wait_errors = {"static": 0.0, "position": 0.0, "estimator": 0.0}
+
+        for row in by_checkin:
+            doctor_id, checkin, checkout, minutes = row
+            while trained < len(by_checkout) and by_checkout[trained][2] <= checkin:
+                done = by_checkout[trained]
+                stats.add(done[0], done[1], done[3])
+                trained += 1
+
+            predicted = stats.expected(doctor_id, checkin)
+            duration_errors["static"] += abs(minutes - DEFAULT_MINUTES)
+            duration_errors["estimator"] += abs(minutes - predicted)
+
+            # Line ahead of this patient at check-in
+            line = [
+                visit for visit in active.get(doctor_id, [])
+                if visit[2] > checkin
+            ]
+            active[doctor_id] = line + [row]
+
+            eta = 0.0
+            for ahead in line:
+                started = ahead[2] - timedelta(minutes=ahead[3])
+                expected = stats.expected(ahead[0], ahead[1])
+                if started <= checkin:
+                    eta += max(expected - (checkin - started).total_seconds() / 60, MIN_REMAINING_MINUTES)
+                else:
+                    eta += expected
+
+            actual_wait = ((checkout - timedelta(minutes=minutes)) - checkin).total_seconds() / 60
+            wait_errors["static"] += abs(actual_wait - DEFAULT_MINUTES)
+            wait_errors["position"] += abs(actual_wait - DEFAULT_MINUTES * len(line))
+            wait_errors["estimator"] += abs(actual_wait - eta)
+
+        count = len(rows)
+        self.stdout.write(f"Backtested {count} visits of {len(active)} doctors")
+        self.stdout.write(
+            "Consultation minutes MAE: static {static:.1f}, estimator {estimator:.1f}".format(
+                **{name: total / count for name, total in duration_errors.items()}
+            )
+        )
+        self.stdout.write(
+            "Wait minutes MAE: static {static:.1f}, {default} min x position {position:.1f}, "
+            "estimator {estimator:.1f}".format(
+                default=DEFAULT_MINUTES,
+                **{name: total / count for name, total in wait_errors.items()}
+            )
+        )
+
+        # Estimate cost for one queue change
+        estimator = WaitEstimator()
+        estimator.stats = stats
+        estimator._checked_at = float("inf")
+        doctors = list(active) or [None]
+        entries = [
+            SimpleNamespace(
+                pk=number,
+                doctor_id=doctors[number % len(doctors)],
+                status='IN_PROGRESS' if number < len(doctors) else 'WAITING',
+                called_at=timezone.now(),
+                started_at=None,
+            )
+            for number in range(options["queue"])
+        ]
+        runs = 200
+        started = time.perf_counter()
+        for _ in range(runs):
+            estimator.estimate_queue(entries)
+        elapsed = (time.perf_counter() - started) / runs * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f"Estimated a {options['queue']}-entry queue in {elapsed:.3f} ms"
+        ))
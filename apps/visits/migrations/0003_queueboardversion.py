@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-17 08:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinics', '0003_counter_created_at_counter_created_by_and_more'),
+        ('visits', '0002_queue_visitdocument_visitvitalsign_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueueBoardVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='queue_board_version', to='clinics.branch')),
+            ],
+            options={
+                'db_table': 'queue_board_versions',
+            },
+        ),
+    ]
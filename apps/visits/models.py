@@ -309,13 +309,14 @@
 
 
 # apps/visits/models.py
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from core.mixins.audit_fields import AuditFieldsMixin
 from core.mixins.soft_delete import SoftDeleteMixin
+from core.mixins.tracked_state import TrackedStateMixin
 from core.constants import VisitStatus
 
-class Visit(AuditFieldsMixin, SoftDeleteMixin, models.Model):
+class Visit(AuditFieldsMixin, SoftDeleteMixin, TrackedStateMixin, models.Model):
     """Patient visit to clinic"""
     
     APPOINTMENT_SOURCE = [
@@ -459,6 +460,7 @@ class Visit(AuditFieldsMixin, SoftDeleteMixin, models.Model):
     def __str__(self):
         return f"Visit {self.visit_id}: {self.patient} ({self.get_status_display()})"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if not self.visit_id:
             self.visit_id = self._generate_visit_id()
@@ -479,21 +481,14 @@ class Visit(AuditFieldsMixin, SoftDeleteMixin, models.Model):
     
     def _generate_visit_id(self):
         """Generate V-YYYYMMDD-XXXX format ID"""
-        from datetime import datetime
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
         date_str = self.scheduled_date.strftime('%Y%m%d')
         
-        last_visit = Visit.objects.filter(
-            visit_id__startswith=f'V-{date_str}-'
-        ).order_by('visit_id').last()
-        
-        if last_visit:
-            last_num = int(last_visit.visit_id.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        
-        return f'V-{date_str}-{new_num:04d}'
+        return next_document_number(
+            'V', date_str,
+            seed=lambda: last_used_number(Visit.objects, 'visit_id', f'V-{date_str}-'),
+        )
     
     def _get_next_queue_number(self):
         """Get next queue number for the day"""
@@ -692,6 +687,7 @@ class Appointment(models.Model):
     def __str__(self):
         return f"Appt {self.appointment_id}: {self.patient} with {self.doctor}"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if not self.appointment_id:
             self.appointment_id = self._generate_appointment_id()
@@ -707,21 +703,14 @@ class Appointment(models.Model):
     
     def _generate_appointment_id(self):
         """Generate APPT-YYYYMMDD-XXXX format ID"""
-        from datetime import datetime
+        from apps.settings_core.sequences import last_used_number, next_document_number
         
         date_str = self.appointment_date.strftime('%Y%m%d')
         
-        last_appt = Appointment.objects.filter(
-            appointment_id__startswith=f'APPT-{date_str}-'
-        ).order_by('appointment_id').last()
-        
-        if last_appt:
-            last_num = int(last_appt.appointment_id.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        
-        return f'APPT-{date_str}-{new_num:04d}'
+        return next_document_number(
+            'APPT', date_str,
+            seed=lambda: last_used_number(Appointment.objects, 'appointment_id', f'APPT-{date_str}-'),
+        )
     
     @property
     def is_upcoming(self):
@@ -883,6 +872,24 @@ class Queue(models.Model):
         return None
 
 
+class QueueBoardVersion(models.Model):
+    """Queue board version of a branch when the cache is not shared (see queue_board.py)"""
+    
+    branch = models.OneToOneField(
+        'clinics.Branch',
+        on_delete=models.CASCADE,
+        related_name='queue_board_version'
+    )
+    version = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'queue_board_versions'
+    
+    def __str__(self):
+        return f"{self.branch} - version {self.version}"
+
+
 class VisitDocument(models.Model):
     """Documents related to visit (prescriptions, reports, etc.)"""
     
@@ -0,0 +1,244 @@
+# apps/visits/queue_board.py
+"""
+Queue board change feed.
+
+Every branch has a queue version number in the cache, bumped (after
+commit) whenever one of its Queue entries is created, called,
+started, completed, skipped or deleted, or the visit behind an entry
+changes. Each bump stores one event under its version:
+
+    {'version': 42, 'type': 'upsert', 'id': 7, 'entry': {...QueueSerializer},
+     'estimates': {'7': 12, '9': 25}}
+    {'version': 43, 'type': 'remove', 'id': 5, 'estimates': {...}}
+
+'estimates' carries the predicted wait minutes of every waiting entry
+of the branch after the change (wait_estimator.py).
+'remove' means the entry left the board (no longer WAITING /
+IN_PROGRESS). Displays load the board once (current_queue, which also
+returns the version and an ETag) and then ask for the events after
+that version, by long poll or server-sent events (QueueViewSet
+.queue_events). When the events are no longer available (expired,
+more than QUEUE_BOARD_MAX_EVENTS behind, cache restarted) the feed
+answers with a reset and the display reloads the board.
+
+With a shared cache (Redis, Memcached) the version counter is a cache
+key bumped with atomic incr. With a per-process cache (LocMem) it is
+the branch's QueueBoardVersion row, bumped with F() so every worker
+sees it; events stored by another worker are then missing and the
+feed answers with a reset, so displays reload instead of going stale.
+Long polls and streams hold a worker for
+up to QUEUE_BOARD_LONG_POLL_TIMEOUT / QUEUE_BOARD_STREAM_SECONDS.
+"""
+
+import json
+import logging
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.cache import shared_cache
+
+from .models import Queue, QueueBoardVersion
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "visits:queue:version:{branch}"
+EVENT_KEY = "visits:queue:event:{branch}:{version}"
+
+BOARD_STATUSES = ['WAITING', 'IN_PROGRESS']
+BOARD_RELATED = (
+    'branch', 'doctor', 'doctor__user',
+    'visit', 'visit__patient', 'visit__patient__user',
+    'counter',
+)
+
+DEFAULT_EVENT_TIMEOUT = 10 * 60
+DEFAULT_MAX_EVENTS = 200
+DEFAULT_LONG_POLL_TIMEOUT = 25
+DEFAULT_POLL_INTERVAL = 0.5
+DEFAULT_STREAM_SECONDS = 5 * 60
+DEFAULT_HEARTBEAT = 15
+
+
+# ======================================================
+# VERSIONS
+# ======================================================
+
+def _initial_version() -> int:
+    # Milliseconds, so a version recreated after a cache flush is
+    # ahead of every version handed out before it
+    return int(time.time() * 1000)
+
+
+def _stored_version(branch_id) -> int:
+    row, _ = QueueBoardVersion.objects.get_or_create(
+        branch_id=branch_id, defaults={'version': _initial_version()}
+    )
+    return row.version
+
+
+def current_version(branch_id) -> int:
+    if not shared_cache():
+        return _stored_version(branch_id)
+
+    key = VERSION_KEY.format(branch=branch_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(branch_id) -> int:
+    if not shared_cache():
+        with transaction.atomic():
+            _stored_version(branch_id)
+            versions = QueueBoardVersion.objects.filter(branch_id=branch_id)
+            versions.update(version=F('version') + 1)
+            return versions.values_list('version', flat=True).get()
+
+    key = VERSION_KEY.format(branch=branch_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+        return cache.incr(key)
+
+
+def etag_for(branch_id, version=None) -> str:
+    if version is None:
+        version = current_version(branch_id)
+    return f'"queue-{branch_id}-{version}"'
+
+
+# ======================================================
+# PUBLISHING
+# ======================================================
+
+def publish_queue_change(queue_id, branch_id, removed=False):
+    """
+    Record the current state of one queue entry as the next event of
+    its branch.
+    """
+    from .serializers import QueueSerializer
+    from .wait_estimator import branch_estimates
+
+    entry = None if removed else Queue.objects.select_related(*BOARD_RELATED).filter(pk=queue_id).first()
+    if entry is None or entry.status not in BOARD_STATUSES:
+        event = {'type': 'remove', 'id': queue_id}
+    else:
+        event = {'type': 'upsert', 'id': queue_id, 'entry': QueueSerializer(entry).data}
+
+    version = _bump(branch_id)
+    event['version'] = version
+    event['estimates'] = branch_estimates(branch_id, version)
+    if event['type'] == 'upsert' and str(queue_id) in event['estimates']:
+        event['entry']['estimated_wait_minutes'] = event['estimates'][str(queue_id)]
+    cache.set(
+        EVENT_KEY.format(branch=branch_id, version=version),
+        json.loads(json.dumps(event, cls=JSONEncoder)),
+        getattr(settings, "QUEUE_BOARD_EVENT_TIMEOUT", DEFAULT_EVENT_TIMEOUT),
+    )
+    return version
+
+
+def _publish_or_skip(queue_id, branch_id, removed):
+    try:
+        publish_queue_change(queue_id, branch_id, removed)
+    except Exception as e:
+        # A version without its event makes displays reload the board
+        logger.error(f"Failed to publish queue change #{queue_id}: {str(e)}")
+        try:
+            _bump(branch_id)
+        except Exception:
+            pass
+
+
+def schedule_queue_change(queue_id, branch_id, removed=False):
+    """
+    Publish a queue entry change once the current transaction commits.
+    """
+    transaction.on_commit(lambda: _publish_or_skip(queue_id, branch_id, removed))
+
+
+# ======================================================
+# READING
+# ======================================================
+
+def changes_since(branch_id, since: int) -> Tuple[int, Optional[List[dict]]]:
+    """
+    (version, events after since). events is None when the display
+    must reload the board instead.
+    """
+    version = current_version(branch_id)
+    if since == version:
+        return version, []
+    if since > version or version - since > getattr(settings, "QUEUE_BOARD_MAX_EVENTS", DEFAULT_MAX_EVENTS):
+        return version, None
+
+    keys = [EVENT_KEY.format(branch=branch_id, version=number) for number in range(since + 1, version + 1)]
+    found = cache.get_many(keys)
+
+    events = []
+    for key in keys:
+        if key not in found:
+            break
+        events.append(found[key])
+
+    # Only the newest event may be missing (bumped, not stored yet);
+    # without a shared cache it may be stored by another worker
+    if len(keys) - len(events) > (1 if shared_cache() else 0):
+        return version, None
+    return since + len(events), events
+
+
+def wait_for_changes(branch_id, since: int, timeout: Optional[float] = None) -> Tuple[int, Optional[List[dict]]]:
+    """
+    Long poll: changes_since(), waiting up to timeout seconds for the
+    first event.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "QUEUE_BOARD_LONG_POLL_TIMEOUT", DEFAULT_LONG_POLL_TIMEOUT)
+    interval = getattr(settings, "QUEUE_BOARD_POLL_INTERVAL", DEFAULT_POLL_INTERVAL)
+    deadline = time.monotonic() + timeout
+
+    while True:
+        version, events = changes_since(branch_id, since)
+        if events is None or events or time.monotonic() >= deadline:
+            return version, events
+        time.sleep(interval)
+
+
+def stream_changes(branch_id, since: int) -> Iterator[str]:
+    """
+    Server-sent events after since. Ends with a reset event when the
+    display must reload the board, or after QUEUE_BOARD_STREAM_SECONDS
+    (EventSource reconnects with Last-Event-ID).
+    """
+    interval = getattr(settings, "QUEUE_BOARD_POLL_INTERVAL", DEFAULT_POLL_INTERVAL)
+    heartbeat = getattr(settings, "QUEUE_BOARD_HEARTBEAT", DEFAULT_HEARTBEAT)
+    deadline = time.monotonic() + getattr(settings, "QUEUE_BOARD_STREAM_SECONDS", DEFAULT_STREAM_SECONDS)
+    last_sent = time.monotonic()
+
+    yield f"retry: {int(interval * 1000)}\n\n"
+    while time.monotonic() < deadline:
+        version, events = changes_since(branch_id, since)
+        if events is None:
+            yield f"id: {version}\nevent: reset\ndata: {json.dumps({'version': version})}\n\n"
+            return
+
+        for event in events:
+            yield f"id: {event['version']}\nevent: queue\ndata: {json.dumps(event)}\n\n"
+        if events:
+            since = version
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= heartbeat:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+
+        time.sleep(interval)
@@ -7,6 +7,7 @@ import logging
 
 from ..notifications.services import NotificationService 
 from .models import Visit, Appointment, Queue
+from .queue_board import BOARD_STATUSES, schedule_queue_change
 from apps.doctors.models import Doctor
 
 logger = logging.getLogger(__name__)
@@ -40,6 +41,12 @@ def visit_post_save(sender, instance, created, **kwargs):
         except Exception as e:
             logger.error(f"Failed to send visit confirmation: {e}")
     
+    # Queue boards show the visit of each entry
+    if not created and instance.queue_number:
+        entry = Queue.objects.filter(visit_id=instance.pk).values_list('pk', 'branch_id').first()
+        if entry:
+            schedule_queue_change(*entry)
+    
     # Update associated appointment if exists
     if hasattr(instance, 'appointment') and instance.appointment:
         appointment = instance.appointment
@@ -132,6 +139,9 @@ def appointment_pre_save(sender, instance, **kwargs):
 def queue_post_save(sender, instance, created, **kwargs):
     """Handle post-save operations for Queue"""
     
+    # Push the change to queue boards
+    schedule_queue_change(instance.pk, instance.branch_id)
+    
     if created:
         logger.info(f"New queue entry created: #{instance.queue_number} for visit {instance.visit.visit_id}")
     
@@ -150,6 +160,13 @@ def queue_post_save(sender, instance, created, **kwargs):
                         logger.error(f"Failed to send queue update: {e}")
 
 
+@receiver(post_delete, sender=Queue)
+def queue_post_delete(sender, instance, **kwargs):
+    """Remove deleted queue entries from queue boards"""
+    if instance.status in BOARD_STATUSES:
+        schedule_queue_change(instance.pk, instance.branch_id, removed=True)
+
+
 # ===========================================
 # DOCTOR AVAILABILITY SIGNALS
 # ===========================================
@@ -4,13 +4,15 @@ from datetime import datetime, timedelta, date
 from django.db.models import Q, Count, Avg, DurationField, ExpressionWrapper, F, Sum
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import viewsets, mixins, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 import pandas as pd
 import json
@@ -24,6 +26,8 @@ from ..notifications.services import NotificationService
 from .models import (
     Visit, Appointment, Queue, VisitDocument, VisitVitalSign
 )
+from .queue_board import current_version, etag_for, stream_changes, wait_for_changes
+from .wait_estimator import branch_estimates
 from .serializers import (
     VisitSerializer, VisitStatusUpdateSerializer,
     AppointmentSerializer, AppointmentStatusUpdateSerializer,
@@ -33,7 +37,9 @@ from .serializers import (
 )
 from apps.doctors.models import Doctor
 from apps.patients.models import Patient
+from apps.patients.search import search_patients
 from apps.clinics.models import Branch
+from apps.clinics.services.slot_engine import get_availability_grid, get_doctor_slots
 
 
 # ===========================================
@@ -51,6 +57,16 @@ class LargePagination(PageNumberPagination):
     max_page_size = 200
 
 
+class EventStreamRenderer(BaseRenderer):
+    """Lets views answer Accept: text/event-stream with a StreamingHttpResponse"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only errors get here (the stream itself bypasses rendering)
+        return json.dumps(data).encode()
+
+
 # ===========================================
 # FILTER SETS
 # ===========================================
@@ -75,11 +91,7 @@ class VisitFilter(django_filters.FilterSet):
         ]
     
     def filter_patient_name(self, queryset, name, value):
-        return queryset.filter(
-            Q(patient__user__first_name__icontains=value) |
-            Q(patient__user__last_name__icontains=value) |
-            Q(patient__user__full_name__icontains=value)
-        )
+        return search_patients(queryset, value, prefix='patient__')
     
     def filter_doctor_name(self, queryset, name, value):
         return queryset.filter(
@@ -125,11 +137,7 @@ class AppointmentFilter(django_filters.FilterSet):
         return queryset
     
     def filter_patient_name(self, queryset, name, value):
-        return queryset.filter(
-            Q(patient__user__first_name__icontains=value) |
-            Q(patient__user__last_name__icontains=value) |
-            Q(patient__user__full_name__icontains=value)
-        )
+        return search_patients(queryset, value, prefix='patient__')
 
 
 # ===========================================
@@ -715,42 +723,20 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             doctor = Doctor.objects.get(id=doctor_id)
             date_obj = datetime.strptime(date, '%Y-%m-%d').date() if isinstance(date, str) else date
             
-            # Get doctor's schedule for that day
-            slots = doctor.get_available_slots(date_obj, branch_id)
-            
-            # Get existing appointments for that day
-            existing_appointments = Appointment.objects.filter(
-                doctor=doctor,
-                appointment_date=date_obj,
-                status__in=['SCHEDULED', 'CONFIRMED']
-            )
-            
-            # Mark slots as booked
-            available_slots = []
-            for slot in slots:
-                slot_start = datetime.combine(date_obj, slot['start_time'])
-                slot_end = datetime.combine(date_obj, slot['end_time'])
-                
-                # Check if slot is booked
-                is_booked = False
-                for appointment in existing_appointments:
-                    appt_start = datetime.combine(date_obj, appointment.start_time)
-                    appt_end = datetime.combine(date_obj, appointment.end_time)
-                    
-                    if not (slot_end <= appt_start or slot_start >= appt_end):
-                        is_booked = True
-                        break
-                
-                if not is_booked:
-                    available_slots.append({
-                        'start_time': slot['start_time'],
-                        'end_time': slot['end_time'],
-                        'duration': slot['duration'],
-                        'is_available': True
-                    })
+            # Free slots (schedule, breaks, leaves, holidays and bookings)
+            available_slots = [
+                {
+                    'start_time': slot['start_time'],
+                    'end_time': slot['end_time'],
+                    'duration': slot['duration'],
+                    'remaining': slot['remaining'],
+                    'is_available': True
+                }
+                for slot in get_doctor_slots(doctor, date_obj, branch_id)
+            ]
             
             return Response({
-                'doctor': doctor.user.get_full_name(),
+                'doctor': doctor.full_name,
                 'date': date_obj,
                 'available_slots': available_slots,
                 'total_slots': len(available_slots)
@@ -898,13 +884,8 @@ class QueueViewSet(viewsets.ModelViewSet):
             'status': queue.status
         })
     
-    @action(detail=False, methods=['get'])
-    def current_queue(self, request):
-        """Get current queue for branch"""
-        branch_id = request.query_params.get('branch')
-        if not branch_id:
-            return Response({'error': 'branch is required'}, status=status.HTTP_400_BAD_REQUEST)
-        
+    def _queue_board(self, branch_id):
+        """Waiting and in-progress entries of a branch"""
         waiting = self.get_queryset().filter(
             branch_id=branch_id,
             status='WAITING'
@@ -915,16 +896,102 @@ class QueueViewSet(viewsets.ModelViewSet):
             status='IN_PROGRESS'
         ).order_by('called_at')
         
-        waiting_serializer = self.get_serializer(waiting, many=True)
-        in_progress_serializer = self.get_serializer(in_progress, many=True)
+        waiting_data = self.get_serializer(waiting, many=True).data
+        in_progress_data = self.get_serializer(in_progress, many=True).data
+        
+        # Predicted waits replace the static estimate
+        estimates = branch_estimates(branch_id)
+        for item in waiting_data:
+            item['estimated_wait_minutes'] = estimates.get(str(item['id']), item['estimated_wait_minutes'])
         
+        return {
+            'waiting': waiting_data,
+            'in_progress': in_progress_data,
+            'total_waiting': len(waiting_data),
+            'total_in_progress': len(in_progress_data)
+        }
+    
+    @action(detail=False, methods=['get'])
+    def current_queue(self, request):
+        """
+        Get current queue for branch.
+        
+        Returns 304 when If-None-Match carries the ETag of the current
+        queue version (no queries); see queue_events for deltas.
+        """
+        branch_id = request.query_params.get('branch')
+        if not branch_id:
+            return Response({'error': 'branch is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Read the version first: changes made while loading show up as events
+        version = current_version(branch_id)
+        etag = etag_for(branch_id, version)
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        return Response(
+            {'version': version, **self._queue_board(branch_id)},
+            headers={'ETag': etag}
+        )
+    
+    @action(detail=False, methods=['get'])
+    def wait_estimates(self, request):
+        """Predicted wait minutes of the waiting entries of a branch"""
+        branch_id = request.query_params.get('branch')
+        if not branch_id:
+            return Response({'error': 'branch is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        version = current_version(branch_id)
         return Response({
-            'waiting': waiting_serializer.data,
-            'in_progress': in_progress_serializer.data,
-            'total_waiting': waiting.count(),
-            'total_in_progress': in_progress.count()
+            'version': version,
+            'estimates': branch_estimates(branch_id, version)
         })
     
+    @action(
+        detail=False,
+        methods=['get'],
+        renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+    )
+    def queue_events(self, request):
+        """
+        Queue board changes after ?since=<version> (or Last-Event-ID).
+        
+        - Accept: text/event-stream: server-sent events
+        - otherwise a long poll: {'version', 'events'} as soon as there
+          are changes, 304 if none arrive before the timeout, or
+          {'version', 'reset': True, ...board} when the display must
+          reload the board
+        """
+        branch_id = request.query_params.get('branch')
+        if not branch_id:
+            return Response({'error': 'branch is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            since = int(request.query_params.get('since') or request.headers.get('Last-Event-ID') or 0)
+        except ValueError:
+            return Response({'error': 'since must be a queue version'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if isinstance(request.accepted_renderer, EventStreamRenderer):
+            response = StreamingHttpResponse(
+                stream_changes(branch_id, since),
+                content_type='text/event-stream'
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+        
+        version, events = wait_for_changes(branch_id, since)
+        if events is None:
+            version = current_version(branch_id)
+            return Response(
+                {'version': version, 'reset': True, **self._queue_board(branch_id)},
+                headers={'ETag': etag_for(branch_id, version)}
+            )
+        if not events:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag_for(branch_id, version)})
+        
+        return Response({'version': version, 'events': events}, headers={'ETag': etag_for(branch_id, version)})
+    
     @action(detail=False, methods=['post'])
     def reset_daily_queue(self, request):
         """Reset daily queue numbers"""
@@ -1152,8 +1219,8 @@ class DoctorScheduleView(APIView):
             doctor = Doctor.objects.get(id=doctor_id)
             date = datetime.strptime(date_str, '%Y-%m-%d').date()
             
-            # Get doctor's available slots
-            slots = doctor.get_available_slots(date, branch_id)
+            # Get doctor's slots, booked ones included
+            slots = get_doctor_slots(doctor, date, branch_id, include_full=True)
             
             # Get appointments for that day
             appointments = Appointment.objects.filter(
@@ -1172,8 +1239,8 @@ class DoctorScheduleView(APIView):
             data = {
                 'doctor': {
                     'id': doctor.id,
-                    'name': doctor.user.get_full_name(),
-                    'specialization': doctor.specialization.name if doctor.specialization else None,
+                    'name': doctor.full_name,
+                    'specialization': doctor.get_specialization_display(),
                 },
                 'date': date,
                 'slots': slots,
@@ -1262,51 +1329,28 @@ class PublicAppointmentView(APIView):
         try:
             date_obj = datetime.strptime(date, '%Y-%m-%d').date() if isinstance(date, str) else date
             
-            # Get doctors available at the branch on that date
-            doctors = Doctor.objects.filter(
-                doctor_branches__branch_id=branch_id,
-                doctor_branches__is_active=True,
-                is_active=True
-            ).select_related('user', 'specialization')
+            # One grid for every doctor scheduled at the branch on that date
+            grid = get_availability_grid(branch_id, date_obj)
+            doctors = Doctor.objects.in_bulk([entry['doctor_id'] for entry in grid])
             
             available_slots = []
-            for doctor in doctors:
-                slots = doctor.get_available_slots(date_obj, branch_id)
-                
-                # Get existing appointments
-                existing_appointments = Appointment.objects.filter(
-                    doctor=doctor,
-                    appointment_date=date_obj,
-                    status__in=['SCHEDULED', 'CONFIRMED']
-                )
-                
-                # Filter available slots
-                doctor_slots = []
-                for slot in slots:
-                    slot_start = datetime.combine(date_obj, slot['start_time'])
-                    slot_end = datetime.combine(date_obj, slot['end_time'])
-                    
-                    is_available = True
-                    for appointment in existing_appointments:
-                        appt_start = datetime.combine(date_obj, appointment.start_time)
-                        appt_end = datetime.combine(date_obj, appointment.end_time)
-                        
-                        if not (slot_end <= appt_start or slot_start >= appt_end):
-                            is_available = False
-                            break
-                    
-                    if is_available:
-                        doctor_slots.append({
-                            'start_time': slot['start_time'].strftime('%H:%M'),
-                            'end_time': slot['end_time'].strftime('%H:%M'),
-                            'duration': slot['duration']
-                        })
+            for entry in grid:
+                doctor_slots = [
+                    {
+                        'start_time': slot['start_time'].strftime('%H:%M'),
+                        'end_time': slot['end_time'].strftime('%H:%M'),
+                        'duration': slot['duration']
+                    }
+                    for day in entry['days']
+                    for slot in day['slots']
+                ]
                 
                 if doctor_slots:
+                    doctor = doctors[entry['doctor_id']]
                     available_slots.append({
-                        'doctor_id': doctor.id,
-                        'doctor_name': doctor.user.get_full_name(),
-                        'specialization': doctor.specialization.name if doctor.specialization else 'General',
+                        'doctor_id': entry['doctor_id'],
+                        'doctor_name': entry['doctor_name'],
+                        'specialization': doctor.get_specialization_display() or 'General',
                         'slots': doctor_slots
                     })
             
@@ -0,0 +1,219 @@
+# apps/visits/wait_estimator.py
+"""
+Queue wait-time estimator.
+
+Keeps rolling consultation-duration statistics from completed visits
+(Visit.consultation_duration) in process:
+
+- per doctor, weekday and hour of check-in
+- per doctor
+- overall
+
+Each cell is [samples, mean] and acts as a moving average over the
+last WAIT_ESTIMATOR_WINDOW visits. A sparse cell is shrunk toward its
+parent, doctor/weekday/hour toward doctor toward overall, with
+WAIT_ESTIMATOR_PRIOR_WEIGHT pseudo-samples, so new doctors and quiet
+hours fall back gracefully.
+
+The statistics load WAIT_ESTIMATOR_HISTORY_DAYS of history once and
+then sync incrementally by actual_checkout every WAIT_ESTIMATOR_REFRESH
+seconds. estimate_queue() walks each doctor's line once: the entry in
+progress counts its remaining expected time, and every waiting patient
+waits for the expected durations of everyone ahead (taken at the hour
+their turn is projected to start). branch_estimates() caches the
+result of a branch per queue version (queue_board.py).
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Queue, Visit
+from .queue_board import BOARD_STATUSES, current_version
+
+
+ESTIMATES_KEY = "visits:queue:eta:{branch}:{version}"
+
+DEFAULT_MINUTES = 15
+DEFAULT_WINDOW = 200
+DEFAULT_PRIOR_WEIGHT = 5
+DEFAULT_HISTORY_DAYS = 90
+DEFAULT_REFRESH = 60
+DEFAULT_SYNC_SKEW = 5 * 60
+DEFAULT_ESTIMATES_TIMEOUT = 60
+MAX_CONSULTATION_MINUTES = 240
+MIN_REMAINING_MINUTES = 1
+
+
+def _minutes(duration: timedelta) -> float:
+    return duration.total_seconds() / 60
+
+
+class DurationStats:
+    """
+    Rolling mean consultation minutes per doctor / weekday / hour.
+    """
+
+    def __init__(self, window: Optional[int] = None, prior_weight: Optional[int] = None):
+        self.window = window or getattr(settings, "WAIT_ESTIMATOR_WINDOW", DEFAULT_WINDOW)
+        self.prior_weight = (
+            prior_weight if prior_weight is not None
+            else getattr(settings, "WAIT_ESTIMATOR_PRIOR_WEIGHT", DEFAULT_PRIOR_WEIGHT)
+        )
+        self.cells: Dict[tuple, List[float]] = {}
+
+    def _update(self, key, minutes: float):
+        cell = self.cells.get(key)
+        if cell is None:
+            self.cells[key] = [1, minutes]
+            return
+        cell[0] = min(cell[0] + 1, self.window)
+        cell[1] += (minutes - cell[1]) / cell[0]
+
+    def add(self, doctor_id, at: datetime, minutes: float):
+        """
+        Count one consultation of doctor that started at `at` (local time).
+        """
+        if not 0 < minutes <= MAX_CONSULTATION_MINUTES:
+            return
+        self._update(('ALL',), minutes)
+        self._update(('DOCTOR', doctor_id), minutes)
+        self._update(('SLOT', doctor_id, at.weekday(), at.hour), minutes)
+
+    def _blend(self, key, prior: float) -> float:
+        cell = self.cells.get(key)
+        if cell is None:
+            return prior
+        samples, mean = cell
+        return (samples * mean + self.prior_weight * prior) / (samples + self.prior_weight)
+
+    def expected(self, doctor_id, at: datetime) -> float:
+        """
+        Expected consultation minutes of doctor starting at `at`.
+        """
+        overall = self._blend(('ALL',), getattr(settings, "WAIT_ESTIMATOR_DEFAULT_MINUTES", DEFAULT_MINUTES))
+        doctor = self._blend(('DOCTOR', doctor_id), overall)
+        return self._blend(('SLOT', doctor_id, at.weekday(), at.hour), doctor)
+
+
+class WaitEstimator:
+    """
+    Process-local DurationStats kept in sync with completed visits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = DurationStats()
+        self._synced_at = None
+        self._seen: Dict[object, datetime] = {}
+        self._checked_at = float("-inf")
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._checked_at < getattr(settings, "WAIT_ESTIMATOR_REFRESH", DEFAULT_REFRESH):
+            return
+        self._checked_at = now
+
+        since = self._synced_at or timezone.now() - timedelta(
+            days=getattr(settings, "WAIT_ESTIMATOR_HISTORY_DAYS", DEFAULT_HISTORY_DAYS)
+        )
+        # Re-read a margin so visits committed late are not missed
+        mark = timezone.now() - timedelta(
+            seconds=getattr(settings, "WAIT_ESTIMATOR_SYNC_SKEW", DEFAULT_SYNC_SKEW)
+        )
+
+        rows = (
+            Visit.objects
+            .filter(
+                actual_checkout__gte=since,
+                actual_checkin__isnull=False,
+                consultation_duration__isnull=False,
+                doctor__isnull=False,
+            )
+            .order_by('actual_checkout')
+            .values_list('pk', 'doctor_id', 'actual_checkin', 'actual_checkout', 'consultation_duration')
+        )
+        for pk, doctor_id, checkin, checkout, duration in rows.iterator():
+            if pk in self._seen:
+                continue
+            self._seen[pk] = checkout
+            self.stats.add(doctor_id, timezone.localtime(checkin), _minutes(duration))
+
+        self._seen = {pk: checkout for pk, checkout in self._seen.items() if checkout >= mark}
+        self._synced_at = mark
+
+    def expected(self, doctor_id, at: datetime) -> float:
+        with self._lock:
+            self._sync()
+            return self.stats.expected(doctor_id, at)
+
+    def estimate_queue(self, entries: Iterable, now: Optional[datetime] = None) -> Dict[object, int]:
+        """
+        Minutes until each waiting entry is seen ({queue id: minutes}).
+        entries are Queue rows (or objects with pk, doctor_id, status,
+        called_at, started_at) in queue order.
+        """
+        now = timezone.localtime(now or timezone.now())
+        with self._lock:
+            self._sync()
+            stats = self.stats
+
+            # Time each doctor becomes free, then the waiting line
+            free_at: Dict[object, datetime] = {}
+            waiting = []
+            for entry in entries:
+                if entry.status == 'IN_PROGRESS':
+                    started = timezone.localtime(entry.started_at or entry.called_at or now)
+                    remaining = max(
+                        stats.expected(entry.doctor_id, started) - _minutes(now - started),
+                        MIN_REMAINING_MINUTES,
+                    )
+                    free_at[entry.doctor_id] = free_at.get(entry.doctor_id, now) + timedelta(minutes=remaining)
+                elif entry.status == 'WAITING':
+                    waiting.append(entry)
+
+            estimates = {}
+            for entry in waiting:
+                turn = free_at.get(entry.doctor_id, now)
+                estimates[entry.pk] = round(_minutes(turn - now))
+                free_at[entry.doctor_id] = turn + timedelta(minutes=stats.expected(entry.doctor_id, turn))
+            return estimates
+
+    def clear(self):
+        with self._lock:
+            self.stats = DurationStats()
+            self._synced_at = None
+            self._seen.clear()
+            self._checked_at = float("-inf")
+
+
+wait_estimator = WaitEstimator()
+
+
+def branch_estimates(branch_id, version=None) -> Dict[str, int]:
+    """
+    {queue id (str): minutes} for the waiting entries of a branch,
+    computed once per queue version.
+    """
+    if version is None:
+        version = current_version(branch_id)
+    key = ESTIMATES_KEY.format(branch=branch_id, version=version)
+    estimates = cache.get(key)
+    if estimates is None:
+        entries = (
+            Queue.objects
+            .filter(branch_id=branch_id, status__in=BOARD_STATUSES)
+            .only('id', 'doctor', 'status', 'queue_number', 'called_at', 'started_at')
+            .order_by('queue_number')
+        )
+        estimates = {
+            str(queue_id): minutes
+            for queue_id, minutes in wait_estimator.estimate_queue(entries).items()
+        }
+        cache.set(key, estimates, getattr(settings, "WAIT_ESTIMATOR_ESTIMATES_TIMEOUT", DEFAULT_ESTIMATES_TIMEOUT))
+    return estimates
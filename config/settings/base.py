@@ -105,6 +105,20 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared by every worker: access snapshots, settings bundles, JWT users,
+# OTP rate limits and queue board feeds depend on it (core/cache.py)
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        },
+        'KEY_PREFIX': 'clinic',
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
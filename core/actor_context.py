@@ -0,0 +1,79 @@
+# core/actor_context.py
+"""
+Request / task scoped actor context.
+
+The acting user (plus device and IP) lives in a ContextVar, so model
+code can read it in O(1) without access to the request:
+
+- AuditContextMiddleware binds it for every HTTP request
+- Management commands and background jobs use `with acting_as(user):`
+- AuditFieldsMixin fills created_by / updated_by from it
+
+ContextVars are isolated per thread and per asyncio task.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Optional
+
+
+class ActorContext:
+    """
+    Who is acting. For requests the user is resolved lazily from
+    request.user, since DRF authenticates after the middleware runs.
+    """
+
+    __slots__ = ("request", "user", "device_id", "ip_address")
+
+    def __init__(self, user=None, request=None, device_id=None, ip_address=None):
+        self.request = request
+        self.user = user
+        self.device_id = device_id
+        self.ip_address = ip_address
+
+
+_actor: ContextVar[Optional[ActorContext]] = ContextVar("actor", default=None)
+
+
+def bind_actor(user=None, *, request=None, device_id=None, ip_address=None) -> Token:
+    """
+    Set the current actor; pass the returned token to unbind_actor().
+    """
+    return _actor.set(ActorContext(user, request, device_id, ip_address))
+
+
+def unbind_actor(token: Token):
+    _actor.reset(token)
+
+
+@contextmanager
+def acting_as(user=None, *, device_id=None, ip_address=None):
+    """
+    Run a block (management command, job) on behalf of user.
+    """
+    token = bind_actor(user, device_id=device_id, ip_address=ip_address)
+    try:
+        yield
+    finally:
+        unbind_actor(token)
+
+
+def get_actor() -> Optional[ActorContext]:
+    return _actor.get()
+
+
+def get_current_user() -> Optional[Any]:
+    """
+    The authenticated acting user, or None (anonymous / no context).
+    """
+    context = _actor.get()
+    if context is None:
+        return None
+
+    user = context.user
+    if user is None and context.request is not None:
+        user = getattr(context.request, "user", None)
+
+    if user is None or not getattr(user, "is_authenticated", False):
+        return None
+    return user
@@ -0,0 +1,29 @@
+# core/cache.py
+"""
+Shared cache detection.
+
+Version stamps, counters and snapshots kept in the Django cache
+(access snapshots, settings bundles, JWT users, OTP rate limits,
+queue board feeds) are only correct when every process sees the same
+cache. The per-process backends (LocMem, dummy) don't: an invalidation
+reaches only the process that made it. Code that relies on
+cross-process invalidation checks shared_cache() and falls back to the
+database otherwise.
+"""
+
+from django.conf import settings
+
+
+PROCESS_LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def shared_cache(alias: str = "default") -> bool:
+    """
+    Whether cache alias is shared by all processes (Redis, Memcached,
+    database, file). Django's default, LocMem, is not.
+    """
+    backend = settings.CACHES.get(alias, {}).get("BACKEND", PROCESS_LOCAL_BACKENDS[0])
+    return backend not in PROCESS_LOCAL_BACKENDS
@@ -0,0 +1,175 @@
+# core/counters.py
+"""
+Hot counters.
+
+Integer columns bumped by many requests at once (OTP config totals,
+discount usage, treatment popularity) must not be incremented with
+`obj.count += 1; obj.save()`: concurrent requests overwrite each
+other's increments and every writer queues on the same row.
+
+- increment(): one atomic UPDATE ... SET field = field + n
+- increment_bounded(): the same, only while the counter stays within
+  a limit column; returns False once the limit is reached
+- hot_counters: increments buffered in process and folded into their
+  rows by a background thread every HOT_COUNTER_FLUSH_INTERVAL seconds
+  (one UPDATE per row), for counters that may lag a few seconds
+- counter_value(): stored value plus this process's pending increments
+- BackgroundFlushBuffer: the flush thread behind hot_counters, shared
+  with other buffered counters (apps.otp.ratelimit)
+
+Rows are addressed by primary key or by a dict of unique lookups
+(e.g. {'branch_id': 3}), so callers need not load the row first.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_FLUSH_INTERVAL = 5
+
+
+def _lookup(lookup) -> Tuple:
+    if isinstance(lookup, dict):
+        return tuple(sorted(lookup.items()))
+    return (('pk', lookup),)
+
+
+def increment(model, lookup, **deltas) -> int:
+    """
+    Atomically add deltas ({field: amount}) to the row. Returns rows updated.
+    """
+    return model._default_manager.filter(**dict(_lookup(lookup))).update(
+        **{field: F(field) + amount for field, amount in deltas.items()}
+    )
+
+
+def increment_bounded(model, lookup, field: str, limit_field: str, amount: int = 1) -> bool:
+    """
+    Atomically add amount to field unless that would pass the row's
+    limit_field (null or 0: unlimited). False when the limit is reached.
+    """
+    within_limit = (
+        Q(**{f"{limit_field}__isnull": True})
+        | Q(**{limit_field: 0})
+        | Q(**{f"{field}__lte": F(limit_field) - amount})
+    )
+    rows = model._default_manager.filter(**dict(_lookup(lookup))).filter(within_limit)
+    return rows.update(**{field: F(field) + amount}) > 0
+
+
+class BackgroundFlushBuffer:
+    """
+    Pending increments held in process and written by a daemon thread
+    every interval_setting seconds, and once more at exit.
+
+    Subclasses merge into self._deltas under self._lock (then call
+    self._start()) and write a drained batch in write().
+    """
+
+    thread_name = "counter-flush"
+    interval_setting = "HOT_COUNTER_FLUSH_INTERVAL"
+    default_interval = DEFAULT_FLUSH_INTERVAL
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._deltas: Dict = {}
+        self._thread = None
+        atexit.register(self._flush_at_exit)
+
+    def drain(self) -> Dict:
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        return deltas
+
+    def write(self, deltas: Dict) -> int:
+        raise NotImplementedError
+
+    def flush(self) -> int:
+        """
+        Write pending increments. Returns rows written.
+        """
+        with self._flush_lock:
+            return self.write(self.drain())
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        interval = getattr(settings, self.interval_setting, self.default_interval)
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing {self.thread_name} counters: {str(e)}")
+            finally:
+                close_old_connections()
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing {self.thread_name} counters at exit: {str(e)}")
+
+
+class HotCounterBuffer(BackgroundFlushBuffer):
+    """
+    Pending increments per (model, row), flushed in the background.
+    """
+
+    thread_name = "hot-counter-flush"
+
+    def add(self, model, lookup, **deltas):
+        key = (model, _lookup(lookup))
+        with self._lock:
+            pending = self._deltas.setdefault(key, {})
+            for field, amount in deltas.items():
+                pending[field] = pending.get(field, 0) + amount
+            self._start()
+
+    def pending(self, model, lookup, field: str) -> int:
+        with self._lock:
+            return self._deltas.get((model, _lookup(lookup)), {}).get(field, 0)
+
+    def discard(self, model, lookup):
+        """
+        Drop pending increments of a row (e.g. after its counters are reset).
+        """
+        with self._lock:
+            self._deltas.pop((model, _lookup(lookup)), None)
+
+    def write(self, deltas):
+        updated = 0
+        for (model, lookup), fields in deltas.items():
+            try:
+                updated += increment(model, dict(lookup), **fields)
+            except Exception as e:
+                logger.error(f"Error flushing {model.__name__} counters {fields}: {str(e)}")
+        return updated
+
+
+hot_counters = HotCounterBuffer()
+
+
+def counter_value(instance, field: str, lookup=None) -> int:
+    """
+    Counter of a loaded instance including increments this process
+    has not flushed yet. lookup must match the one used with
+    hot_counters.add() (default: the primary key).
+    """
+    return getattr(instance, field) + hot_counters.pending(
+        type(instance), instance.pk if lookup is None else lookup, field
+    )
+
@@ -2,6 +2,8 @@
 
 from django.utils import timezone
 
+from core.actor_context import bind_actor, unbind_actor
+
 
 class AuditContextMiddleware:
     """
@@ -19,7 +21,16 @@ class AuditContextMiddleware:
         request._audit_ip = self._get_client_ip(request)
         request._audit_start_time = timezone.now()
 
-        response = self.get_response(request)
+        # Request-scoped actor for model code (AuditFieldsMixin, ...)
+        token = bind_actor(
+            request=request,
+            device_id=request._audit_device,
+            ip_address=request._audit_ip,
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            unbind_actor(token)
 
         # Attach duration (optional)
         request._audit_duration = timezone.now() - request._audit_start_time
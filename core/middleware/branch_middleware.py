@@ -18,9 +18,11 @@
 # core/middleware/branch_middleware.py
 
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
 from django.http import JsonResponse
 
-from apps.accounts.models import UserBranch, UserBranchRole
+from apps.accounts.access import get_access_snapshot
+from apps.accounts.models import UserBranchRole
 
 
 class BranchContextMiddleware(MiddlewareMixin):
@@ -28,17 +30,24 @@ class BranchContextMiddleware(MiddlewareMixin):
     Resolves branch context and user roles per request.
 
     Attaches:
-    - request.branch
-    - request.branch_roles
+    - request.branch (loaded lazily, on first use)
+    - request.branch_id
+    - request.branch_roles (lazy queryset)
     - request.role_codes
+    - request.access (cached snapshot, see apps.accounts.access)
+
+    Membership and roles come from the cached access snapshot, so
+    a cache hit costs no queries.
     """
 
     BRANCH_HEADER = "HTTP_X_BRANCH_ID"
 
     def process_request(self, request):
         request.branch = None
-        request.branch_roles = []
+        request.branch_id = None
+        request.branch_roles = UserBranchRole.objects.none()
         request.role_codes = set()
+        request.access = None
 
         # Skip if unauthenticated
         user = getattr(request, "user", None)
@@ -58,35 +67,29 @@ class BranchContextMiddleware(MiddlewareMixin):
             )
 
         # Verify user is assigned to this branch
-        user_branch = (
-            UserBranch.objects
-            .select_related("branch")
-            .filter(
-                user=user,
-                branch_id=branch_id,
-                is_active=True
-            )
-            .first()
-        )
-
-        if not user_branch:
+        access = get_access_snapshot(user)
+        if not access.has_branch(branch_id):
             return JsonResponse(
                 {"detail": "User not assigned to this branch"},
                 status=403
             )
 
-        request.branch = user_branch.branch
+        request.access = access
+        request.branch_id = branch_id
+        request.branch = SimpleLazyObject(lambda: self._load_branch(branch_id))
 
-        # Fetch active roles for this branch
-        roles = (
+        request.branch_roles = (
             UserBranchRole.objects
             .select_related("role")
             .filter(
                 user=user,
-                branch=user_branch.branch,
+                branch_id=branch_id,
                 is_active=True
             )
         )
+        request.role_codes = access.role_codes(branch_id)
 
-        request.branch_roles = roles
-        request.role_codes = {r.role.code for r in roles}
+    @staticmethod
+    def _load_branch(branch_id):
+        from apps.clinics.models import Branch
+        return Branch.objects.get(pk=branch_id)
@@ -1,6 +1,8 @@
 # clinic/Backend/core/mixins/audit_fields.py
 from django.db import models
 
+from core.actor_context import get_current_user
+
 class AuditFieldsMixin(models.Model):
     """Adds created/updated audit fields to models"""
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
@@ -23,3 +25,14 @@ class AuditFieldsMixin(models.Model):
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        # Acting user from the request / task context (see core.actor_context);
+        # partial saves (update_fields) are left untouched
+        if kwargs.get('update_fields') is None:
+            user = get_current_user()
+            if user is not None:
+                if self._state.adding and self.created_by_id is None:
+                    self.created_by = user
+                self.updated_by = user
+        super().save(*args, **kwargs)
+
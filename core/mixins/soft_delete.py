@@ -3,6 +3,8 @@
 from django.db import models
 from django.utils import timezone
 
+from core.actor_context import get_current_user
+
 class SoftDeleteMixin(models.Model):
     """Soft delete instead of actual deletion"""
     is_active = models.BooleanField(default=True)
@@ -25,6 +27,8 @@ class SoftDeleteMixin(models.Model):
             self.deleted_at = timezone.now()
             if hasattr(self, '_request_user'):
                 self.deleted_by = self._request_user
+            else:
+                self.deleted_by = get_current_user()
             self.save()
     
     class Meta:
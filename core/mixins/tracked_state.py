@@ -0,0 +1,51 @@
+# clinic/Backend/core/mixins/tracked_state.py
+
+import copy
+
+from django.db import models
+
+
+class TrackedStateMixin(models.Model):
+    """
+    Remembers field values as loaded from (or last saved to) the database.
+
+    Lets the audit layer build BEFORE snapshots in memory instead of
+    re-fetching the row on every pre_save.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+            for name, value in zip(field_names, values)
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        current = self._current_field_values()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and hasattr(self, "_loaded_values"):
+            # Only the updated columns reached the database
+            saved = {self._meta.get_field(name).attname for name in update_fields}
+            current = {
+                **self._loaded_values,
+                **{name: value for name, value in current.items() if name in saved},
+            }
+        self._loaded_values = current
+
+    def _current_field_values(self):
+        # Deferred fields are missing from __dict__ and stay untracked
+        values = {}
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__:
+                value = self.__dict__[field.attname]
+                values[field.attname] = (
+                    copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+                )
+        return values
+
+    class Meta:
+        abstract = True
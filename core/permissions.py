@@ -297,6 +297,61 @@ from rest_framework.permissions import BasePermission
 from rest_framework import permissions
 from .constants import UserRoles
 
+from apps.accounts.access import get_access_snapshot
+
+
+# Role.code values carrying each UserRoles role
+ROLE_CODES = {
+    UserRoles.SUPER_ADMIN: {'SUPER_ADMIN', 'ADMIN'},
+    UserRoles.CLINIC_MANAGER: {'CLINIC_MANAGER', 'MANAGER'},
+    UserRoles.DOCTOR: {'DOCTOR'},
+    UserRoles.RECEPTIONIST: {'RECEPTIONIST', 'FRONT_DESK'},
+    UserRoles.CASHIER: {'CASHIER'},
+    UserRoles.LAB_TECHNICIAN: {'LAB_TECHNICIAN'},
+    UserRoles.INVENTORY_MANAGER: {'INVENTORY_MANAGER'},
+}
+
+STAFF_ROLES = [
+    UserRoles.RECEPTIONIST,
+    UserRoles.DOCTOR,
+    UserRoles.CASHIER,
+    UserRoles.CLINIC_MANAGER,
+    UserRoles.LAB_TECHNICIAN,
+    UserRoles.INVENTORY_MANAGER,
+    UserRoles.SUPER_ADMIN
+]
+
+
+def get_request_access(request):
+    """
+    Access snapshot of the request user (set by BranchContextMiddleware,
+    else loaded from the cache). None for anonymous users.
+    """
+    access = getattr(request, 'access', None)
+    if access is None:
+        access = get_access_snapshot(getattr(request, 'user', None))
+    return access
+
+
+def has_role(request, *roles):
+    """
+    Whether the request user holds any of roles (UserRoles) in the
+    request branch, or in any branch when no branch is selected.
+    Answered from the cached snapshot; superusers count as SUPER_ADMIN.
+    """
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return False
+    if user.is_superuser and UserRoles.SUPER_ADMIN in roles:
+        return True
+
+    codes = set()
+    for role in roles:
+        codes |= ROLE_CODES.get(role, {role.upper()})
+
+    access = get_request_access(request)
+    return access.has_any_role(codes, getattr(request, 'branch_id', None))
+
 class IsAuthenticatedAndActive(BasePermission):
     """Ensure user is authenticated and active"""
     def has_permission(self, request, view):
@@ -326,11 +381,11 @@ class HasPermission(permissions.BasePermission):
 class IsAdmin(permissions.BasePermission):
     """Alias for IsSuperAdmin - matches accounts/views.py import"""
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.SUPER_ADMIN
+        return has_role(request, UserRoles.SUPER_ADMIN)
     
 class IsManager(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.MANAGER
+        return has_role(request, UserRoles.CLINIC_MANAGER)
     
 class IsAuditor(permissions.BasePermission):
     pass
@@ -338,47 +393,47 @@ class IsAuditor(permissions.BasePermission):
 class IsSuperAdmin(permissions.BasePermission):
     """Check if user is super admin (SUPER_ADMIN)"""
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.SUPER_ADMIN
+        return has_role(request, UserRoles.SUPER_ADMIN)
 
 class IsAdminUser(permissions.BasePermission):
     """Alias for IsSuperAdmin - matches views.py import"""
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.SUPER_ADMIN
+        return has_role(request, UserRoles.SUPER_ADMIN)
 
 class IsClinicManager(permissions.BasePermission):
     """Check if user is clinic manager"""
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.CLINIC_MANAGER
+        return has_role(request, UserRoles.CLINIC_MANAGER)
 
 class IsBranchManager(permissions.BasePermission):
     """Check if user is clinic manager (for branch settings)"""
     def has_permission(self, request, view):
-        return request.user.role in [UserRoles.CLINIC_MANAGER, UserRoles.SUPER_ADMIN]
+        return has_role(request, UserRoles.CLINIC_MANAGER, UserRoles.SUPER_ADMIN)
 
 class IsDoctor(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.DOCTOR
+        return has_role(request, UserRoles.DOCTOR)
 
 class IsReceptionist(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.RECEPTIONIST
+        return has_role(request, UserRoles.RECEPTIONIST)
 
 class IsFrontDesk(permissions.BasePermission):
     """Alias for IsReceptionist (backward compatibility)"""
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.RECEPTIONIST
+        return has_role(request, UserRoles.RECEPTIONIST)
 
 class IsCashier(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.CASHIER
+        return has_role(request, UserRoles.CASHIER)
 
 class IsLabTechnician(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.LAB_TECHNICIAN
+        return has_role(request, UserRoles.LAB_TECHNICIAN)
 
 class IsInventoryManager(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.INVENTORY_MANAGER
+        return has_role(request, UserRoles.INVENTORY_MANAGER)
 
 # ===========================================
 # COMPOSITE PERMISSION CLASSES
@@ -387,31 +442,24 @@ class IsInventoryManager(permissions.BasePermission):
 class IsStaff(permissions.BasePermission):
     """Check if user is any staff member (not patient)"""
     def has_permission(self, request, view):
-        return request.user.role in [
-            UserRoles.RECEPTIONIST,
-            UserRoles.DOCTOR,
-            UserRoles.CASHIER,
-            UserRoles.CLINIC_MANAGER,
-            UserRoles.LAB_TECHNICIAN,
-            UserRoles.INVENTORY_MANAGER,
-            UserRoles.SUPER_ADMIN
-        ]
+        return has_role(request, *STAFF_ROLES)
 
 class IsMedicalStaff(permissions.BasePermission):
     """Check if user is medical staff"""
     def has_permission(self, request, view):
-        return request.user.role in [UserRoles.DOCTOR, UserRoles.LAB_TECHNICIAN]
+        return has_role(request, UserRoles.DOCTOR, UserRoles.LAB_TECHNICIAN)
 
 class IsAdministrativeStaff(permissions.BasePermission):
     """Check if user is administrative staff"""
     def has_permission(self, request, view):
-        return request.user.role in [
+        return has_role(
+            request,
             UserRoles.RECEPTIONIST,
             UserRoles.CASHIER,
             UserRoles.CLINIC_MANAGER,
             UserRoles.INVENTORY_MANAGER,
             UserRoles.SUPER_ADMIN
-        ]
+        )
 
 # ===========================================
 # BUSINESS LOGIC PERMISSIONS
@@ -421,7 +469,7 @@ class CanOverride(permissions.BasePermission):
     """For actions requiring manager override (refunds, waivers)"""
     def has_permission(self, request, view):
         # Only clinic managers and super admins can override
-        if request.user.role not in [UserRoles.CLINIC_MANAGER, UserRoles.SUPER_ADMIN]:
+        if not has_role(request, UserRoles.CLINIC_MANAGER, UserRoles.SUPER_ADMIN):
             return False
         
         # Check if override reason is provided
@@ -434,31 +482,20 @@ class HasBranchAccess(permissions.BasePermission):
         # Get branch from request (set by BranchMiddleware)
         branch_id = getattr(request, 'branch_id', None)
         
-        # Super admins can access all branches
-        if request.user.role == UserRoles.SUPER_ADMIN:
+        # Super admins and clinic managers can access all branches
+        if has_role(request, UserRoles.SUPER_ADMIN, UserRoles.CLINIC_MANAGER):
             return True
         
-        # Clinic managers can access all branches
-        if request.user.role == UserRoles.CLINIC_MANAGER:
-            return True
-        
-        # Check if user is assigned to this branch
-        if hasattr(request.user, 'user_branches'):
-            if branch_id:
-                return request.user.user_branches.filter(
-                    branch_id=branch_id, is_active=True
-                ).exists()
-            else:
-                # If no branch specified, allow if user has any branch access
-                return request.user.user_branches.filter(is_active=True).exists()
-        
-        return False
+        # Check if user is assigned to this branch; if no branch is
+        # specified, allow if user has any branch access
+        access = get_request_access(request)
+        return bool(access) and access.has_branch(branch_id)
 
 class IsOwnerOrStaff(permissions.BasePermission):
     """Check if user owns the record or is staff"""
     def has_object_permission(self, request, view, obj):
         # Staff can access
-        if request.user.role != UserRoles.PATIENT:
+        if has_role(request, *STAFF_ROLES):
             return True
         
         # Check if user owns the object
@@ -482,24 +519,26 @@ class IsReadOnly(permissions.BasePermission):
 class CanPerformEOD(permissions.BasePermission):
     """Check if user can perform EOD operations"""
     def has_permission(self, request, view):
-        return request.user.role in [
+        return has_role(
+            request,
             UserRoles.CLINIC_MANAGER, 
             UserRoles.SUPER_ADMIN,
             UserRoles.CASHIER  # Cashiers can prepare, but managers approve
-        ]
+        )
 
 class CanApproveEOD(permissions.BasePermission):
     """Check if user can approve/lock EOD"""
     def has_permission(self, request, view):
-        return request.user.role in [
+        return has_role(
+            request,
             UserRoles.CLINIC_MANAGER, 
             UserRoles.SUPER_ADMIN
-        ]
+        )
 
 class CanReverseEOD(permissions.BasePermission):
     """Check if user can reverse locked EOD (strict control)"""
     def has_permission(self, request, view):
-        return request.user.role == UserRoles.SUPER_ADMIN  # Only super admin
+        return has_role(request, UserRoles.SUPER_ADMIN)  # Only super admin
 
 # ===========================================
 # QUICK PERMISSION MIXINS (for views)